@@ -4,6 +4,7 @@ from flask import Flask
 
 from .blueprints import register_blueprints
 from .extensions import db
+from .services import change_feed_service  # noqa: F401  (registers session listeners)
 
 
 def create_app(config_name=None):
@@ -20,6 +21,18 @@ def create_app(config_name=None):
     app.config.setdefault("ADMIN_KEY", os.environ.get("ADMIN_KEY", "dev-admin-key"))
     app.config.setdefault("LIVE_API_KEY", os.environ.get("LIVE_API_KEY", "dev-live-key"))
     app.config.setdefault("RESULTS_API_KEY", os.environ.get("RESULTS_API_KEY", "dev-results-key"))
+    app.config.setdefault(
+        "EXCHANGE_EXPORT_DIR",
+        os.environ.get("EXCHANGE_EXPORT_DIR", os.path.join(app.instance_path, "exports")),
+    )
+    app.config.setdefault(
+        "BLOB_STORAGE_DIR",
+        os.environ.get("BLOB_STORAGE_DIR", os.path.join(app.instance_path, "blobs")),
+    )
+    app.config.setdefault("EXCHANGE_EXPORT_WORKERS", int(os.environ.get("EXCHANGE_EXPORT_WORKERS", "4")))
+    app.config.setdefault(
+        "TKA_ISSUE_RETRY_HOURS", int(os.environ.get("TKA_ISSUE_RETRY_HOURS", "24"))
+    )
 
     db.init_app(app)
     register_blueprints(app)
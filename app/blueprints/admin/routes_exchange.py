@@ -1,10 +1,25 @@
+from datetime import datetime
 from functools import wraps
 
-from flask import Blueprint, Response, abort, current_app, request
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    jsonify,
+    request,
+    send_file,
+    stream_with_context,
+)
 
-from app.extensions import db
-from app.models import ExchangeExportLog
-from app.services.exchange_service import EVENT_EXPORT_SCHEMA, build_event_export_zip
+from app.models import Event
+from app.services.exchange_service import (
+    build_bulk_event_export,
+    event_export_filename,
+    get_cached_event_export,
+    normalize_export_filter,
+    stream_event_export,
+)
 
 
 exchange_admin_bp = Blueprint("exchange_admin", __name__)
@@ -22,20 +37,68 @@ def _require_admin_key(func):
     return wrapper
 
 
+def _requested_event_ids():
+    """Event ids from a JSON ``event_ids`` list or ``event_id`` form fields; None if malformed."""
+    payload = request.get_json(silent=True)
+    if payload is None:
+        event_ids = request.form.getlist("event_id", type=int)
+    elif isinstance(payload, dict):
+        event_ids = payload.get("event_ids")
+    else:
+        return None
+    if not isinstance(event_ids, list) or not event_ids:
+        return None
+    if not all(isinstance(event_id, int) and not isinstance(event_id, bool) for event_id in event_ids):
+        return None
+    return event_ids
+
+
 @exchange_admin_bp.get("/admin/exchange/events/<int:event_id>/export")
 @_require_admin_key
 def export_event_exchange(event_id):
-    zip_bytes, filename, sha256 = build_event_export_zip(event_id)
-    export_log = ExchangeExportLog(
-        event_id=event_id,
-        export_type="EVENT_EXPORT",
-        schema=EVENT_EXPORT_SCHEMA,
-        file_path=filename,
-        sha256=sha256,
+    event = Event.query.get_or_404(event_id)
+    export_filter = normalize_export_filter(
+        {
+            "ring": request.args.get("ring"),
+            "category_code": request.args.get("category_code"),
+            "class_level": request.args.get("class_level", type=int),
+        }
     )
-    db.session.add(export_log)
-    db.session.commit()
+    canonical = request.args.get("canonical") in {"1", "true"}
+    export_log = get_cached_event_export(event_id, export_filter, canonical=canonical)
+    if export_log:
+        response = send_file(
+            export_log.file_path,
+            mimetype="application/zip",
+            as_attachment=True,
+            download_name=event_export_filename(event, export_filter),
+            etag=export_log.sha256,
+            conditional=True,
+        )
+        response.headers["X-Export-Generated-At"] = export_log.created_at.isoformat()
+        return response
 
-    response = Response(zip_bytes, mimetype="application/zip")
+    chunks, filename = stream_event_export(event_id, export_filter=export_filter, canonical=canonical)
+    response = Response(stream_with_context(chunks), mimetype="application/zip")
     response.headers["Content-Disposition"] = f"attachment; filename={filename}"
+    response.headers["X-Export-Generated-At"] = datetime.utcnow().isoformat()
     return response
+
+
+@exchange_admin_bp.post("/admin/exchange/events/export")
+@_require_admin_key
+def export_events_bulk():
+    event_ids = _requested_event_ids()
+    if event_ids is None:
+        return jsonify({"error": "event_ids must be a non-empty list of integers"}), 400
+    try:
+        file_path, filename, sha256 = build_bulk_event_export(event_ids)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 404
+    return send_file(
+        file_path,
+        mimetype="application/zip",
+        as_attachment=True,
+        download_name=filename,
+        etag=sha256,
+    )
@@ -1,19 +1,27 @@
+import json
 from datetime import datetime
 from functools import wraps
 
-from flask import Blueprint, abort, current_app, redirect, render_template, request, url_for
+from flask import Blueprint, abort, current_app, jsonify, redirect, render_template, request, url_for
 
+from app.extensions import db
 from app.models import Event
+from app.services.schedule_conflict_service import find_handler_conflicts
 from app.services.schedule_service import (
     add_block,
     auto_generate_blocks_from_registrations,
+    balance_rings,
     delete_block,
     list_blocks,
     lock_schedule,
     move_block,
+    move_block_after,
+    refresh_schedule,
+    reorder_blocks,
     unlock_schedule,
     update_block,
 )
+from app.services.schedule_timing_service import load_timing_rules, set_timing_rules
 
 
 schedule_admin_bp = Blueprint("schedule_admin", __name__)
@@ -49,10 +57,21 @@ def schedule_home(event_id):
         "admin/schedule.html",
         event=event,
         blocks=blocks,
+        timing_rules=json.dumps(load_timing_rules(event), indent=2, ensure_ascii=False),
+        conflicts=find_handler_conflicts(event_id),
         admin_key=request.args.get("key", ""),
     )
 
 
+@schedule_admin_bp.get("/admin/events/<int:event_id>/schedule/conflicts")
+@_require_admin_key
+def schedule_conflicts(event_id):
+    Event.query.get_or_404(event_id)
+    buffer_minutes = request.args.get("buffer", default=0, type=int)
+    conflicts = find_handler_conflicts(event_id, buffer_minutes=buffer_minutes)
+    return jsonify({"event_id": event_id, "buffer_minutes": buffer_minutes, "conflicts": conflicts})
+
+
 @schedule_admin_bp.post("/admin/events/<int:event_id>/schedule/add")
 @_require_admin_key
 def schedule_add(event_id):
@@ -101,10 +120,63 @@ def schedule_move(event_id):
     return redirect(url_for("schedule_admin.schedule_home", event_id=event_id, key=request.args.get("key")))
 
 
+@schedule_admin_bp.post("/admin/events/<int:event_id>/schedule/move-after")
+@_require_admin_key
+def schedule_move_after(event_id):
+    block_id = request.form.get("block_id", type=int)
+    after_block_id = request.form.get("after_block_id", type=int)
+    try:
+        move_block_after(block_id, after_block_id)
+    except ValueError as exc:
+        abort(400, description=str(exc))
+    return redirect(url_for("schedule_admin.schedule_home", event_id=event_id, key=request.args.get("key")))
+
+
+@schedule_admin_bp.post("/admin/events/<int:event_id>/schedule/reorder")
+@_require_admin_key
+def schedule_reorder(event_id):
+    Event.query.get_or_404(event_id)
+    payload = request.get_json(silent=True) or {}
+    block_ids = payload.get("block_ids")
+    if not isinstance(block_ids, list) or not block_ids:
+        return jsonify({"error": "block_ids required"}), 400
+    try:
+        result = reorder_blocks(event_id, [int(block_id) for block_id in block_ids])
+    except (TypeError, ValueError) as exc:
+        db.session.rollback()
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(result)
+
+
 @schedule_admin_bp.post("/admin/events/<int:event_id>/schedule/auto")
 @_require_admin_key
 def schedule_auto(event_id):
-    auto_generate_blocks_from_registrations(event_id)
+    ring_count = request.form.get("ring_count", type=int)
+    try:
+        auto_generate_blocks_from_registrations(event_id, ring_count=ring_count)
+    except ValueError as exc:
+        abort(400, description=str(exc))
+    return redirect(url_for("schedule_admin.schedule_home", event_id=event_id, key=request.args.get("key")))
+
+
+@schedule_admin_bp.post("/admin/events/<int:event_id>/schedule/balance")
+@_require_admin_key
+def schedule_balance(event_id):
+    ring_count = request.form.get("ring_count", type=int)
+    try:
+        balance_rings(event_id, ring_count)
+    except ValueError as exc:
+        abort(400, description=str(exc))
+    return redirect(url_for("schedule_admin.schedule_home", event_id=event_id, key=request.args.get("key")))
+
+
+@schedule_admin_bp.post("/admin/events/<int:event_id>/schedule/refresh")
+@_require_admin_key
+def schedule_refresh(event_id):
+    try:
+        refresh_schedule(event_id)
+    except ValueError as exc:
+        abort(400, description=str(exc))
     return redirect(url_for("schedule_admin.schedule_home", event_id=event_id, key=request.args.get("key")))
 
 
@@ -120,3 +192,15 @@ def schedule_lock(event_id):
 def schedule_unlock(event_id):
     unlock_schedule(event_id)
     return redirect(url_for("schedule_admin.schedule_home", event_id=event_id, key=request.args.get("key")))
+
+
+@schedule_admin_bp.post("/admin/events/<int:event_id>/schedule/timing")
+@_require_admin_key
+def schedule_timing(event_id):
+    Event.query.get_or_404(event_id)
+    try:
+        rules = json.loads(request.form.get("timing_rules") or "{}")
+        set_timing_rules(event_id, rules)
+    except ValueError as exc:
+        abort(400, description=str(exc))
+    return redirect(url_for("schedule_admin.schedule_home", event_id=event_id, key=request.args.get("key")))
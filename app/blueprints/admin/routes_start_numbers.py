@@ -1,13 +1,15 @@
 import json
 from functools import wraps
 
-from flask import Blueprint, abort, current_app, redirect, render_template, request, url_for
+from flask import Blueprint, abort, current_app, jsonify, redirect, render_template, request, url_for
 
 from app.extensions import db
 from app.models import Event, Registration, StartNumber
 from app.services.start_number_service import (
     generate_start_numbers,
     lock_start_numbers,
+    regenerate_start_numbers,
+    reorder_start_numbers,
     set_start_number_manual,
     unlock_start_numbers,
 )
@@ -71,6 +73,28 @@ def start_numbers_home(event_id):
     )
 
 
+def _parse_ranges(value):
+    """Parse ranges like "Large 1=100, Small=500" into start number range dicts."""
+    ranges = []
+    for part in (value or "").replace("\n", ",").split(","):
+        if not part.strip():
+            continue
+        target, _, start = part.partition("=")
+        fields = target.split()
+        if not fields or not start.strip().isdigit() or len(fields) > 2:
+            abort(400, description=f"Invalid start number range: {part.strip()}")
+        if len(fields) == 2 and not fields[1].isdigit():
+            abort(400, description=f"Invalid start number range: {part.strip()}")
+        ranges.append(
+            {
+                "category_code": fields[0],
+                "class_level": int(fields[1]) if len(fields) == 2 else None,
+                "start": int(start),
+            }
+        )
+    return ranges
+
+
 @start_numbers_admin_bp.post("/admin/events/<int:event_id>/startnumbers/generate")
 @_require_admin_key
 def start_numbers_generate(event_id):
@@ -84,12 +108,28 @@ def start_numbers_generate(event_id):
             club_prio = {"mode": "random_club_first"}
         else:
             club_prio = {"mode": "club_first", "club_name": club_name}
-    generate_start_numbers(
-        event_id=event_id,
-        mode=mode,
-        club_prio=club_prio,
-        seed=int(seed) if seed else None,
-    )
+    ranges = _parse_ranges(request.form.get("ranges"))
+    try:
+        generate_start_numbers(
+            event_id=event_id,
+            mode=mode,
+            club_prio=club_prio,
+            seed=int(seed) if seed else None,
+            min_gap=request.form.get("min_gap", type=int),
+            ranges=ranges,
+        )
+    except ValueError as exc:
+        abort(400, description=str(exc))
+    return redirect(url_for("start_numbers_admin.start_numbers_home", event_id=event_id, key=request.args.get("key")))
+
+
+@start_numbers_admin_bp.post("/admin/events/<int:event_id>/startnumbers/regenerate")
+@_require_admin_key
+def start_numbers_regenerate(event_id):
+    try:
+        regenerate_start_numbers(event_id)
+    except ValueError as exc:
+        abort(400, description=str(exc))
     return redirect(url_for("start_numbers_admin.start_numbers_home", event_id=event_id, key=request.args.get("key")))
 
 
@@ -114,3 +154,20 @@ def start_numbers_set(event_id):
     new_start_no = request.form.get("new_start_no", type=int)
     set_start_number_manual(event_id=event_id, registration_id=registration_id, new_start_no=new_start_no)
     return redirect(url_for("start_numbers_admin.start_numbers_home", event_id=event_id, key=request.args.get("key")))
+
+
+@start_numbers_admin_bp.post("/admin/events/<int:event_id>/startnumbers/reorder")
+@_require_admin_key
+def start_numbers_reorder(event_id):
+    Event.query.get_or_404(event_id)
+    payload = request.get_json(silent=True) or {}
+    numbers = payload.get("numbers")
+    if not isinstance(numbers, dict) or not numbers:
+        return jsonify({"error": "numbers required"}), 400
+    try:
+        mapping = {int(registration_id): start_no for registration_id, start_no in numbers.items()}
+        result = reorder_start_numbers(event_id, mapping)
+    except ValueError as exc:
+        db.session.rollback()
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(result)
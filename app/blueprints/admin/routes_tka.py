@@ -1,6 +1,6 @@
 from functools import wraps
 
-from flask import Blueprint, Response, abort, current_app, jsonify, render_template, request
+from flask import Blueprint, Response, abort, current_app, jsonify, render_template, request, stream_with_context
 
 from app.extensions import db
 from app.models import Dog, Event, LicenseKind, Registration, RegistrationStatus, TkaExportBatch, TkaExportType
@@ -8,7 +8,9 @@ from app.services.tka_service import (
     apply_tka_import,
     build_event_check_batch,
     build_master_check_batch,
-    render_batch_to_csv,
+    build_multi_event_check_batch,
+    describe_tka_import,
+    iter_batch_csv,
 )
 
 
@@ -45,15 +47,16 @@ def _latest_batch_id(export_type, event_id=None):
 @tka_admin_bp.get("/admin/tka")
 @_require_admin_key
 def tka_home():
-    return render_template("admin/tka_home.html", admin_key=request.args.get("key", ""))
+    events = Event.query.order_by(Event.starts_at, Event.id).all()
+    return render_template("admin/tka_home.html", admin_key=request.args.get("key", ""), events=events)
 
 
 @tka_admin_bp.get("/admin/tka/master/export")
 @_require_admin_key
 def export_master_check():
     batch = build_master_check_batch(created_by_user_id=None)
-    csv_data = render_batch_to_csv(batch.id)
-    response = Response(csv_data, mimetype="text/csv")
+    db.session.commit()
+    response = Response(stream_with_context(iter_batch_csv(batch.id)), mimetype="text/csv")
     response.headers["Content-Disposition"] = "attachment; filename=master_check.csv"
     response.headers["X-Tka-Batch-Id"] = str(batch.id)
     return response
@@ -66,8 +69,11 @@ def import_master_check():
     raw_text = _get_raw_text()
     if not batch_id:
         return jsonify({"error": "batch_id required"}), 400
-    tka_import = apply_tka_import(batch_id=batch_id, raw_text=raw_text, imported_by_user_id=None)
-    return jsonify({"import_id": tka_import.id, "batch_id": batch_id})
+    metrics = {}
+    tka_import = apply_tka_import(
+        batch_id=batch_id, raw_text=raw_text, imported_by_user_id=None, metrics=metrics
+    )
+    return jsonify({"import_id": tka_import.id, "batch_id": batch_id, "metrics": metrics})
 
 
 @tka_admin_bp.get("/admin/tka/events/<int:event_id>")
@@ -82,8 +88,8 @@ def tka_event(event_id):
 @_require_admin_key
 def export_event_check(event_id):
     batch = build_event_check_batch(event_id=event_id, created_by_user_id=None)
-    csv_data = render_batch_to_csv(batch.id)
-    response = Response(csv_data, mimetype="text/csv")
+    db.session.commit()
+    response = Response(stream_with_context(iter_batch_csv(batch.id)), mimetype="text/csv")
     response.headers["Content-Disposition"] = "attachment; filename=event_check.csv"
     response.headers["X-Tka-Batch-Id"] = str(batch.id)
     return response
@@ -98,8 +104,67 @@ def import_event_check(event_id):
     raw_text = _get_raw_text()
     if not batch_id:
         return jsonify({"error": "batch_id required"}), 400
-    tka_import = apply_tka_import(batch_id=batch_id, raw_text=raw_text, imported_by_user_id=None)
-    return jsonify({"import_id": tka_import.id, "batch_id": batch_id})
+    metrics = {}
+    tka_import = apply_tka_import(
+        batch_id=batch_id, raw_text=raw_text, imported_by_user_id=None, metrics=metrics
+    )
+    return jsonify({"import_id": tka_import.id, "batch_id": batch_id, "metrics": metrics})
+
+
+def _requested_event_ids():
+    """Event ids from a JSON ``event_ids`` list or ``event_id`` form fields; None if malformed."""
+    payload = request.get_json(silent=True)
+    if payload is None:
+        event_ids = request.form.getlist("event_id", type=int)
+    elif isinstance(payload, dict):
+        event_ids = payload.get("event_ids")
+    else:
+        return None
+    if not isinstance(event_ids, list) or not event_ids:
+        return None
+    if not all(isinstance(event_id, int) and not isinstance(event_id, bool) for event_id in event_ids):
+        return None
+    return event_ids
+
+
+@tka_admin_bp.post("/admin/tka/events/export")
+@_require_admin_key
+def export_multi_event_check():
+    event_ids = _requested_event_ids()
+    if event_ids is None:
+        return jsonify({"error": "event_ids must be a non-empty list of integers"}), 400
+    try:
+        batch = build_multi_event_check_batch(event_ids)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 404
+    db.session.commit()
+    response = Response(stream_with_context(iter_batch_csv(batch.id)), mimetype="text/csv")
+    response.headers["Content-Disposition"] = "attachment; filename=multi_event_check.csv"
+    response.headers["X-Tka-Batch-Id"] = str(batch.id)
+    return response
+
+
+@tka_admin_bp.post("/admin/tka/events/import")
+@_require_admin_key
+def import_multi_event_check():
+    batch_id = request.form.get("batch_id", type=int) or _latest_batch_id(TkaExportType.MULTI_EVENT_CHECK)
+    raw_text = _get_raw_text()
+    if not batch_id:
+        return jsonify({"error": "batch_id required"}), 400
+    metrics = {}
+    tka_import = apply_tka_import(
+        batch_id=batch_id, raw_text=raw_text, imported_by_user_id=None, metrics=metrics
+    )
+    return jsonify({"import_id": tka_import.id, "batch_id": batch_id, "metrics": metrics})
+
+
+@tka_admin_bp.get("/admin/tka/imports/<int:import_id>")
+@_require_admin_key
+def show_tka_import(import_id):
+    try:
+        return jsonify(describe_tka_import(import_id))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 404
 
 
 @tka_admin_bp.get("/admin/tka/dev/seed")
@@ -0,0 +1,24 @@
+from flask import Blueprint, current_app, jsonify, request
+
+from app.services.change_feed_service import CHANGE_FEED_PAGE_SIZE, list_event_changes
+
+
+changes_api_bp = Blueprint("changes_api", __name__)
+
+
+def _require_api_key(expected_key):
+    provided = request.headers.get("X-Api-Key")
+    return provided == expected_key
+
+
+@changes_api_bp.get("/api/events/<event_external_id>/changes")
+def event_changes(event_external_id):
+    if not _require_api_key(current_app.config.get("LIVE_API_KEY")):
+        return jsonify({"error": "unauthorized"}), 403
+    since = request.args.get("since", default=0, type=int)
+    limit = min(request.args.get("limit", default=CHANGE_FEED_PAGE_SIZE, type=int), CHANGE_FEED_PAGE_SIZE)
+    try:
+        payload = list_event_changes(event_external_id, since=since, limit=limit)
+    except ValueError:
+        return jsonify({"error": "event not found"}), 404
+    return jsonify(payload)
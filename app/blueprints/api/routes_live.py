@@ -1,6 +1,9 @@
 from flask import Blueprint, current_app, jsonify, request
 
+from app.extensions import db
+from app.models import Event
 from app.services.exchange_service import store_live_update
+from app.services.live_schedule_service import apply_live_progress, validate_live_context
 
 
 live_api_bp = Blueprint("live_api", __name__)
@@ -18,5 +21,17 @@ def live_update():
     payload = request.get_json(silent=True)
     if not payload:
         return jsonify({"error": "invalid payload"}), 400
+    event = Event.query.filter_by(external_id=payload.get("event_external_id")).first()
+    try:
+        validate_live_context(event.id if event else None, payload.get("context") or {})
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
     created, record = store_live_update(payload)
-    return jsonify({"status": "ok", "stored": created, "id": record.id})
+    response = {"status": "ok", "stored": created, "id": record.id}
+    if created:
+        try:
+            response["projected_blocks"] = len(apply_live_progress(record))
+        except ValueError as exc:
+            db.session.rollback()
+            response["projection_error"] = str(exc)
+    return jsonify(response)
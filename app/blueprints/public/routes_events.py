@@ -1,6 +1,8 @@
-from flask import Blueprint, abort, current_app, render_template, request
+from flask import Blueprint, abort, current_app, jsonify, render_template, request
 
-from app.models import Event, Registration, ScheduleBlock, StartNumber
+from app.models import Dog, Event, Person, Registration, StartNumber
+from app.services.live_schedule_service import schedule_projection
+from app.services.start_time_service import estimate_start_times
 
 
 public_events_bp = Blueprint("public_events", __name__)
@@ -20,12 +22,17 @@ def public_schedule(event_id):
     if not event.schedule_public and not _has_admin_key():
         abort(403)
 
-    blocks = (
-        ScheduleBlock.query.filter_by(event_id=event_id)
-        .order_by(ScheduleBlock.sort_index, ScheduleBlock.start_at)
-        .all()
-    )
-    return render_template("public/schedule.html", event=event, blocks=blocks)
+    return render_template("public/schedule.html", event=event, blocks=schedule_projection(event_id))
+
+
+@public_events_bp.get("/events/<int:event_id>/schedule.json")
+def public_schedule_json(event_id):
+    event = Event.query.get_or_404(event_id)
+    if not event.is_published and not _has_admin_key():
+        abort(404)
+    if not event.schedule_public and not _has_admin_key():
+        abort(403)
+    return jsonify({"event_id": event_id, "blocks": schedule_projection(event_id)})
 
 
 @public_events_bp.get("/events/<int:event_id>/startlist")
@@ -64,3 +71,28 @@ def public_startlist(event_id):
         rows=rows,
         has_numbers=bool(numbers),
     )
+
+
+@public_events_bp.get("/events/<int:event_id>/start-times")
+def public_start_times(event_id):
+    event = Event.query.get_or_404(event_id)
+    if not event.is_published and not _has_admin_key():
+        abort(404)
+    if not event.startlist_public and not _has_admin_key():
+        abort(403)
+
+    handler_external_id = request.args.get("handler")
+    dog_external_id = request.args.get("dog")
+    if not handler_external_id and not dog_external_id:
+        return jsonify({"error": "handler or dog required"}), 400
+    handler = Person.query.filter_by(external_id=handler_external_id).first() if handler_external_id else None
+    dog = Dog.query.filter_by(external_id=dog_external_id).first() if dog_external_id else None
+    if (handler_external_id and not handler) or (dog_external_id and not dog):
+        abort(404)
+
+    entries = estimate_start_times(
+        event_id,
+        handler_id=handler.id if handler else None,
+        dog_id=dog.id if dog else None,
+    )
+    return jsonify({"event_id": event_id, "entries": entries})
@@ -2,8 +2,8 @@ import enum
 import re
 from datetime import datetime
 
-from sqlalchemy import CheckConstraint, event
-from sqlalchemy.orm import validates
+from sqlalchemy import CheckConstraint, event, func, inspect, or_
+from sqlalchemy.orm import Session, validates
 
 from .extensions import db
 
@@ -43,6 +43,7 @@ class TkaMasterStatus(enum.Enum):
 class TkaExportType(enum.Enum):
     MASTER_CHECK = "MASTER_CHECK"
     EVENT_CHECK = "EVENT_CHECK"
+    MULTI_EVENT_CHECK = "MULTI_EVENT_CHECK"
 
 
 class TkaFindingKind(enum.Enum):
@@ -111,6 +112,9 @@ class Dog(db.Model):
     tka_category_confirmed = db.Column(db.String(20))
     tka_master_checked_at = db.Column(db.DateTime)
     tka_issue_message = db.Column(db.Text)
+    tka_checked_fingerprint = db.Column(db.String(64))
+    tka_exported_fingerprint = db.Column(db.String(64))
+    tka_exported_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
     owners = db.relationship("DogOwner", back_populates="dog", cascade="all, delete-orphan")
@@ -204,6 +208,10 @@ class Event(db.Model):
     start_numbers_generated_at = db.Column(db.DateTime)
     start_numbers_rule_set = db.Column(db.Text)
     schedule_locked = db.Column(db.Boolean, default=False, nullable=False)
+    schedule_timing_rules = db.Column(db.Text)
+    export_content_version = db.Column(db.Integer, default=0, nullable=False)
+    start_order_version = db.Column(db.Integer)
+    change_feed_version = db.Column(db.Integer, default=0, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
 
@@ -213,7 +221,7 @@ class Registration(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     event_id = db.Column(db.Integer, db.ForeignKey("events.id"), nullable=False)
     dog_id = db.Column(db.Integer, db.ForeignKey("dogs.id"), nullable=False)
-    handler_id = db.Column(db.Integer, db.ForeignKey("people.id"))
+    handler_id = db.Column(db.Integer, db.ForeignKey("people.id"), index=True)
     external_id = db.Column(db.String(64), unique=True)
     club_name = db.Column(db.String(200))
     status = db.Column(
@@ -264,6 +272,23 @@ class TkaExportBatch(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
     rows = db.relationship("TkaExportRow", back_populates="batch", cascade="all, delete-orphan")
+    event_links = db.relationship(
+        "TkaExportBatchEvent", back_populates="batch", cascade="all, delete-orphan"
+    )
+
+
+class TkaExportBatchEvent(db.Model):
+    __tablename__ = "tka_export_batch_events"
+    __table_args__ = (
+        db.UniqueConstraint("batch_id", "event_id", name="uq_tka_export_batch_events_batch_event"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    batch_id = db.Column(db.Integer, db.ForeignKey("tka_export_batches.id"), nullable=False)
+    event_id = db.Column(db.Integer, db.ForeignKey("events.id"), nullable=False)
+
+    batch = db.relationship("TkaExportBatch", back_populates="event_links")
+    event = db.relationship("Event")
 
 
 class TkaExportRow(db.Model):
@@ -292,6 +317,7 @@ class TkaImport(db.Model):
     imported_by_user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
     imported_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     raw_text = db.Column(db.Text)
+    raw_blob_sha256 = db.Column(db.String(64))
     source = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
@@ -314,6 +340,8 @@ class TkaFinding(db.Model):
     system_class_level = db.Column(db.Integer)
     raw_message = db.Column(db.Text)
     message = db.Column(db.Text)
+    raw_offset = db.Column(db.Integer)
+    raw_length = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
     tka_import = db.relationship("TkaImport", back_populates="findings")
@@ -330,6 +358,9 @@ class ExchangeExportLog(db.Model):
     schema = db.Column(db.String(100), nullable=False)
     file_path = db.Column(db.String(255))
     sha256 = db.Column(db.String(64))
+    content_sha256 = db.Column(db.String(64))
+    content_version = db.Column(db.Integer)
+    slice_key = db.Column(db.String(255))
     created_by_user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
@@ -429,11 +460,14 @@ class ScheduleBlock(db.Model):
     event_id = db.Column(db.Integer, db.ForeignKey("events.id"), nullable=False, index=True)
     ring = db.Column(db.String(50), default="Ring 1", nullable=False)
     start_at = db.Column(db.DateTime, index=True)
+    end_at = db.Column(db.DateTime)
+    fixed_start_at = db.Column(db.DateTime)
     discipline = db.Column(db.String(20), nullable=False)
     category_code = db.Column(db.String(20), nullable=False)
     class_level = db.Column(db.Integer, nullable=False)
+    starter_count = db.Column(db.Integer)
     notes = db.Column(db.Text)
-    sort_index = db.Column(db.Integer, index=True, nullable=False, default=0)
+    sort_index = db.Column(db.Float, index=True, nullable=False, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -445,6 +479,49 @@ class ScheduleBlock(db.Model):
         ),
     )
 
+    progress = db.relationship(
+        "ScheduleBlockProgress",
+        back_populates="block",
+        uselist=False,
+        cascade="all, delete-orphan",
+    )
+
+
+class ScheduleBlockProgress(db.Model):
+    __tablename__ = "schedule_block_progress"
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey("events.id"), nullable=False, index=True)
+    block_id = db.Column(db.Integer, db.ForeignKey("schedule_blocks.id"), nullable=False, unique=True)
+    started_at = db.Column(db.DateTime)
+    completed_runs = db.Column(db.Integer)
+    reported_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    projected_start_at = db.Column(db.DateTime)
+    projected_end_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    block = db.relationship("ScheduleBlock", back_populates="progress")
+
+
+class StartOrderEntry(db.Model):
+    __tablename__ = "start_order_entries"
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey("events.id"), nullable=False)
+    registration_id = db.Column(db.Integer, db.ForeignKey("registrations.id", ondelete="CASCADE"), nullable=False)
+    block_id = db.Column(db.Integer, db.ForeignKey("schedule_blocks.id", ondelete="CASCADE"), nullable=False)
+    handler_id = db.Column(db.Integer, db.ForeignKey("people.id"))
+    dog_id = db.Column(db.Integer, db.ForeignKey("dogs.id"))
+    start_no = db.Column(db.Integer)
+    position = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint("event_id", "registration_id", "block_id", name="uq_start_order_entries_reg_block"),
+        db.Index("ix_start_order_entries_event_handler", "event_id", "handler_id"),
+        db.Index("ix_start_order_entries_event_dog", "event_id", "dog_id"),
+    )
+
 
 @event.listens_for(Dog, "before_insert")
 @event.listens_for(Dog, "before_update")
@@ -452,3 +529,91 @@ def _apply_dog_license_kind_defaults(mapper, connection, target):
     if target.license_kind and target.license_no:
         Dog._validate_license_format(target.license_kind, target.license_no)
     target.apply_license_kind_defaults()
+
+
+class ChangeLogEntry(db.Model):
+    __tablename__ = "change_log"
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey("events.id"), nullable=False)
+    # Per-event sequence, assigned under the event row's lock, so versions follow commit order.
+    version = db.Column(db.Integer, nullable=False)
+    entity_type = db.Column(db.String(30), nullable=False)
+    entity_key = db.Column(db.String(64))
+    operation = db.Column(db.String(10), nullable=False)  # "upsert" or "delete"
+    payload_json = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint("event_id", "version", name="uq_change_log_event_version"),
+        {"sqlite_autoincrement": True},
+    )
+
+
+EXPORT_EVENT_FIELDS = (
+    "name",
+    "location",
+    "starts_at",
+    "ends_at",
+    "external_id",
+    "billing_mode",
+    "start_numbers_locked",
+    "start_numbers_generated_at",
+    "start_numbers_rule_set",
+    "schedule_locked",
+)
+EXPORT_DOG_FIELDS = ("name", "license_no", "license_kind", "external_id")
+EXPORT_PERSON_FIELDS = ("first_name", "last_name", "email", "external_id")
+
+
+def _has_changes(target, fields):
+    state = inspect(target)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_export_content_versions(session, flush_context, instances):
+    events = set()
+    event_ids = set()
+    dog_ids = set()
+    person_ids = set()
+
+    for target in [*session.new, *session.dirty, *session.deleted]:
+        if target in session.dirty and not session.is_modified(target):
+            continue
+        if isinstance(target, Event):
+            if target not in session.new and _has_changes(target, EXPORT_EVENT_FIELDS):
+                events.add(target)
+        elif isinstance(target, Registration):
+            if target.event is not None:
+                events.add(target.event)
+            elif target.event_id:
+                event_ids.add(target.event_id)
+        elif isinstance(target, (StartNumber, ScheduleBlock)):
+            if target.event_id:
+                event_ids.add(target.event_id)
+        elif isinstance(target, Dog):
+            if target.id and _has_changes(target, EXPORT_DOG_FIELDS):
+                dog_ids.add(target.id)
+        elif isinstance(target, Person):
+            if target.id and _has_changes(target, EXPORT_PERSON_FIELDS):
+                person_ids.add(target.id)
+
+    if dog_ids or person_ids:
+        query = session.query(Registration.event_id).filter(
+            or_(Registration.dog_id.in_(dog_ids), Registration.handler_id.in_(person_ids))
+        )
+        event_ids.update(event_id for (event_id,) in query.distinct())
+
+    for event_id in event_ids:
+        target = session.get(Event, event_id)
+        if target is not None:
+            events.add(target)
+
+    # Bumped in SQL so concurrent writers never hand out the same version;
+    # the attribute is expired by the flush and reloaded on next access.
+    for target in events:
+        if target in session.new:
+            target.export_content_version = (target.export_content_version or 0) + 1
+        else:
+            target.export_content_version = func.coalesce(Event.export_content_version, 0) + 1
@@ -0,0 +1,43 @@
+import gzip
+import hashlib
+import os
+import re
+from uuid import uuid4
+
+from flask import current_app
+
+BLOB_DIGEST_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+def store_blob(data: bytes) -> str:
+    """Store ``data`` gzip-compressed under its SHA-256 and return the digest."""
+    sha256 = hashlib.sha256(data).hexdigest()
+    file_path = _blob_path(sha256)
+    if os.path.exists(file_path):
+        return sha256
+
+    base_dir = os.path.dirname(file_path)
+    os.makedirs(base_dir, exist_ok=True)
+    tmp_path = os.path.join(base_dir, f"{uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, "wb") as handle:
+            handle.write(gzip.compress(data, mtime=0))
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return sha256
+
+
+def load_blob(sha256: str) -> bytes:
+    file_path = _blob_path(sha256)
+    if not os.path.exists(file_path):
+        raise ValueError("Blob not found")
+    with gzip.open(file_path, "rb") as handle:
+        return handle.read()
+
+
+def _blob_path(sha256: str) -> str:
+    if not sha256 or not BLOB_DIGEST_PATTERN.fullmatch(sha256):
+        raise ValueError("Invalid blob digest")
+    return os.path.join(current_app.config["BLOB_STORAGE_DIR"], sha256[:2], f"{sha256}.gz")
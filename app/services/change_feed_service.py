@@ -0,0 +1,309 @@
+import json
+from collections import defaultdict
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+
+from app.models import (
+    ChangeLogEntry,
+    Dog,
+    Event,
+    Person,
+    Registration,
+    ScheduleBlock,
+    StartNumber,
+    _has_changes,
+)
+from app.services.exchange_service import _format_schedule_datetime
+
+CHANGE_FEED_PAGE_SIZE = 1000
+
+REGISTRATION_FIELDS = (
+    "external_id",
+    "dog_id",
+    "handler_id",
+    "category_code",
+    "class_level",
+    "status",
+    "tka_event_check_status",
+)
+START_NUMBER_FIELDS = ("registration_id", "start_no")
+SCHEDULE_BLOCK_FIELDS = (
+    "ring",
+    "start_at",
+    "discipline",
+    "category_code",
+    "class_level",
+    "notes",
+    "sort_index",
+)
+DOG_FIELDS = ("external_id", "name", "license_no", "license_kind")
+PERSON_FIELDS = ("external_id", "first_name", "last_name", "email")
+
+
+def list_event_changes(event_external_id: str, since: int = 0, limit: int = CHANGE_FEED_PAGE_SIZE):
+    event_row = Event.query.filter_by(external_id=event_external_id).first()
+    if not event_row:
+        raise ValueError("Event not found")
+
+    entries = (
+        ChangeLogEntry.query.filter(
+            ChangeLogEntry.event_id == event_row.id,
+            ChangeLogEntry.version > since,
+        )
+        .order_by(ChangeLogEntry.version)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    return {
+        "event_external_id": event_external_id,
+        "since": since,
+        "version": entries[-1].version if entries else since,
+        "has_more": has_more,
+        "changes": [
+            {
+                "version": entry.version,
+                "entity": entry.entity_type,
+                "op": entry.operation,
+                "key": entry.entity_key,
+                "data": json.loads(entry.payload_json) if entry.payload_json else None,
+            }
+            for entry in entries
+        ],
+    }
+
+
+def _external_id(session, model, row_id, external_ids):
+    if not row_id:
+        return None
+    if (model, row_id) in external_ids:
+        return external_ids[(model, row_id)]
+    row = session.get(model, row_id)
+    return row.external_id if row else None
+
+
+def _registration_payload(session, target, external_ids):
+    return target.external_id, {
+        "external_id": target.external_id,
+        "dog_external_id": _external_id(session, Dog, target.dog_id, external_ids),
+        "handler_person_external_id": _external_id(session, Person, target.handler_id, external_ids),
+        "category_code": target.category_code,
+        "class_level": target.class_level,
+        "status": target.status.value if target.status else None,
+        "tka_event_check_status": target.tka_event_check_status.value
+        if target.tka_event_check_status
+        else None,
+    }
+
+
+def _start_number_payload(session, target, external_ids):
+    registration_external_id = _external_id(session, Registration, target.registration_id, external_ids)
+    return registration_external_id, {
+        "registration_external_id": registration_external_id,
+        "start_no": target.start_no,
+    }
+
+
+def _schedule_block_payload(session, target, external_ids):
+    return str(target.id), {
+        "id": target.id,
+        "ring": target.ring,
+        "start_at": _format_schedule_datetime(target.start_at),
+        "discipline": target.discipline,
+        "category_code": target.category_code,
+        "class_level": target.class_level,
+        "notes": target.notes or "",
+        "sort_index": target.sort_index,
+    }
+
+
+def _dog_payload(session, target, external_ids):
+    return target.external_id, {
+        "external_id": target.external_id,
+        "name": target.name,
+        "license_no": target.license_no,
+        "license_kind": target.license_kind.value if target.license_kind else None,
+    }
+
+
+def _person_payload(session, target, external_ids):
+    return target.external_id, {
+        "external_id": target.external_id,
+        "first_name": target.first_name,
+        "last_name": target.last_name,
+        "email": target.email,
+    }
+
+
+CHANGE_FEED_ENTITIES = {
+    Registration: ("registration", REGISTRATION_FIELDS, _registration_payload),
+    StartNumber: ("start_number", START_NUMBER_FIELDS, _start_number_payload),
+    ScheduleBlock: ("schedule_block", SCHEDULE_BLOCK_FIELDS, _schedule_block_payload),
+    Dog: ("dog", DOG_FIELDS, _dog_payload),
+    Person: ("person", PERSON_FIELDS, _person_payload),
+}
+
+
+def _event_ids_for(session, target):
+    if isinstance(target, (Registration, StartNumber, ScheduleBlock)):
+        return [target.event_id] if target.event_id else []
+    column = Registration.dog_id if isinstance(target, Dog) else Registration.handler_id
+    query = session.query(Registration.event_id).filter(column == target.id).distinct()
+    return [event_id for (event_id,) in query]
+
+
+def record_bulk_changes(session, model, ids):
+    """Record upserts for rows changed by bulk UPDATEs, which bypass the flush listeners.
+
+    Also bumps the export content version of every affected event.
+    """
+    ids = list(ids)
+    if not ids:
+        return
+    builder = _ChangeRowBuilder(session)
+    event_ids = set()
+    for start in range(0, len(ids), CHANGE_FEED_PAGE_SIZE):
+        chunk = ids[start : start + CHANGE_FEED_PAGE_SIZE]
+        targets = session.query(model).filter(model.id.in_(chunk)).populate_existing().all()
+        builder.preload_external_ids(targets)
+        for target in targets:
+            target_event_ids = _event_ids_for(session, target)
+            event_ids.update(target_event_ids)
+            builder.append(target_event_ids, target, "upsert")
+    builder.execute()
+    if event_ids:
+        session.execute(
+            update(Event)
+            .where(Event.id.in_(event_ids))
+            .values(export_content_version=func.coalesce(Event.export_content_version, 0) + 1)
+            .execution_options(synchronize_session=False)
+        )
+        for event_id in event_ids:
+            target = session.identity_map.get(session.identity_key(Event, event_id))
+            if target is not None:
+                session.expire(target, ["export_content_version"])
+
+
+class _ChangeRowBuilder:
+    def __init__(self, session):
+        self.session = session
+        self.rows = []
+        self.seen = set()
+        self.now = datetime.utcnow()
+        self.external_ids = {}
+
+    def preload_external_ids(self, targets):
+        """Load the related external ids the payloads of ``targets`` need in one query."""
+        registration_ids = [target.id for target in targets if isinstance(target, Registration)]
+        if registration_ids:
+            rows = (
+                self.session.query(
+                    Registration.dog_id, Dog.external_id, Registration.handler_id, Person.external_id
+                )
+                .outerjoin(Dog, Dog.id == Registration.dog_id)
+                .outerjoin(Person, Person.id == Registration.handler_id)
+                .filter(Registration.id.in_(registration_ids))
+            )
+            for dog_id, dog_external_id, handler_id, handler_external_id in rows:
+                self.external_ids[(Dog, dog_id)] = dog_external_id
+                self.external_ids[(Person, handler_id)] = handler_external_id
+        start_number_registration_ids = [
+            target.registration_id for target in targets if isinstance(target, StartNumber)
+        ]
+        if start_number_registration_ids:
+            rows = self.session.query(Registration.id, Registration.external_id).filter(
+                Registration.id.in_(start_number_registration_ids)
+            )
+            for registration_id, external_id in rows:
+                self.external_ids[(Registration, registration_id)] = external_id
+
+    def append(self, event_ids, target, operation):
+        entity_type, _, build_payload = CHANGE_FEED_ENTITIES[type(target)]
+        key, payload = build_payload(self.session, target, self.external_ids)
+        payload_json = None
+        if operation != "delete":
+            payload_json = json.dumps(payload, ensure_ascii=False)
+        for event_id in event_ids:
+            if (event_id, entity_type, key) in self.seen:
+                continue
+            self.seen.add((event_id, entity_type, key))
+            self.rows.append(
+                {
+                    "event_id": event_id,
+                    "entity_type": entity_type,
+                    "entity_key": key,
+                    "operation": operation,
+                    "payload_json": payload_json,
+                    "created_at": self.now,
+                }
+            )
+
+    def execute(self):
+        if not self.rows:
+            return
+        connection = self.session.connection()
+        rows_by_event = defaultdict(list)
+        for row in self.rows:
+            rows_by_event[row["event_id"]].append(row)
+        # The UPDATE locks the event row until commit, so a concurrent writer
+        # gets the next versions only after this transaction is visible.
+        versioned = []
+        for event_id in sorted(rows_by_event):
+            rows = rows_by_event[event_id]
+            connection.execute(
+                update(Event.__table__)
+                .where(Event.__table__.c.id == event_id)
+                .values(change_feed_version=Event.__table__.c.change_feed_version + len(rows))
+            )
+            last_version = connection.execute(
+                select(Event.__table__.c.change_feed_version).where(Event.__table__.c.id == event_id)
+            ).scalar()
+            if last_version is None:
+                continue
+            for version, row in enumerate(rows, start=last_version - len(rows) + 1):
+                row["version"] = version
+            versioned.extend(rows)
+        if versioned:
+            connection.execute(ChangeLogEntry.__table__.insert(), versioned)
+
+
+@event.listens_for(Session, "before_flush")
+def _assign_change_feed_external_ids(session, flush_context, instances):
+    for target in session.new:
+        if isinstance(target, (Registration, Dog, Person)) and not target.external_id:
+            target.external_id = uuid4().hex
+
+
+@event.listens_for(Session, "after_flush")
+def _record_change_log(session, flush_context):
+    builder = _ChangeRowBuilder(session)
+
+    for target in session.new:
+        if type(target) not in CHANGE_FEED_ENTITIES:
+            continue
+        event_ids = _event_ids_for(session, target)
+        if isinstance(target, Registration):
+            for related_id, model in ((target.dog_id, Dog), (target.handler_id, Person)):
+                related = session.get(model, related_id) if related_id else None
+                if related is not None:
+                    builder.append(event_ids, related, "upsert")
+        builder.append(event_ids, target, "upsert")
+
+    for target in session.dirty:
+        if type(target) not in CHANGE_FEED_ENTITIES:
+            continue
+        _, fields, _ = CHANGE_FEED_ENTITIES[type(target)]
+        if not _has_changes(target, fields):
+            continue
+        builder.append(_event_ids_for(session, target), target, "upsert")
+
+    for target in session.deleted:
+        if type(target) not in CHANGE_FEED_ENTITIES:
+            continue
+        builder.append(_event_ids_for(session, target), target, "delete")
+
+    builder.execute()
@@ -2,12 +2,16 @@ import hashlib
 import io
 import json
 import os
+import re
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from urllib.parse import urlencode
 from uuid import uuid4
 from zoneinfo import ZoneInfo
 
 from flask import current_app
+from sqlalchemy import and_, false, or_, update
 
 from app.extensions import db
 from app.models import (
@@ -15,7 +19,9 @@ from app.models import (
     BillingMode,
     Dog,
     Event,
+    ExchangeExportLog,
     LiveUpdate,
+    Person,
     Registration,
     Result,
     ResultImport,
@@ -26,6 +32,12 @@ from app.models import (
 EVENT_EXPORT_SCHEMA = "agility.exchange.eventexport.v1"
 LIVE_UPDATE_SCHEMA = "agility.exchange.liveupdate.v1"
 RESULT_EXPORT_SCHEMA = "agility.exchange.resultexport.v1"
+BULK_EXPORT_SCHEMA = "agility.exchange.bulkexport.v1"
+EVENT_EXPORT_TYPE = "EVENT_EXPORT"
+BULK_EXPORT_TYPE = "BULK_EVENT_EXPORT"
+EXPORT_CHUNK_SIZE = 64 * 1024
+EXPORT_FILTER_FIELDS = ("ring", "category_code", "class_level")
+CANONICAL_ZIP_TIMESTAMP = (1980, 1, 1, 0, 0, 0)
 
 
 def _utc_now():
@@ -36,7 +48,52 @@ def _ensure_external_id(value):
     return value or uuid4().hex
 
 
-def build_event_export_zip(event_id: int):
+def build_event_export_zip(event_id: int, export_filter=None, canonical=False):
+    chunks, filename, digest = stream_event_export_zip(
+        event_id, export_filter=export_filter, canonical=canonical
+    )
+    zip_bytes = b"".join(chunks)
+    return zip_bytes, filename, digest.hexdigest()
+
+
+def stream_event_export_zip(event_id: int, export_filter=None, canonical=False):
+    """Collect the export payloads and return a lazy ZIP byte stream.
+
+    The returned ``digest`` is a running SHA-256 over the yielded bytes and is
+    only complete once ``chunks`` has been exhausted. In ``canonical`` mode the
+    archive omits ``generated_at``, sorts keys and entities and uses fixed member
+    timestamps, so identical content always yields identical bytes.
+    """
+    export_filter = normalize_export_filter(export_filter)
+    event, members = _collect_event_export(event_id, export_filter, canonical)
+    digest = hashlib.sha256()
+    filename = event_export_filename(event, export_filter)
+    return _iter_zip_stream(members, digest, canonical), filename, digest
+
+
+def normalize_export_filter(export_filter):
+    """Return the ring/category/class slice of an export, or ``None`` for the full event."""
+    if not export_filter:
+        return None
+    normalized = {}
+    for field in EXPORT_FILTER_FIELDS:
+        value = export_filter.get(field)
+        if value in (None, ""):
+            continue
+        normalized[field] = int(value) if field == "class_level" else str(value)
+    return normalized or None
+
+
+def export_slice_key(export_filter, canonical=False):
+    items = sorted((normalize_export_filter(export_filter) or {}).items())
+    if canonical:
+        items.insert(0, ("canonical", 1))
+    if not items:
+        return None
+    return urlencode(items)
+
+
+def _collect_event_export(event_id: int, export_filter=None, canonical=False):
     event = Event.query.get(event_id)
     if not event:
         raise ValueError("Event not found")
@@ -44,41 +101,120 @@ def build_event_export_zip(event_id: int):
     if not event.external_id:
         event.external_id = _ensure_external_id(event.external_id)
 
-    registrations = Registration.query.filter_by(event_id=event_id).all()
+    blocks_query = ScheduleBlock.query.filter_by(event_id=event_id)
+    registration_filters = [Registration.event_id == event_id]
+    if export_filter:
+        block_filters = {
+            field: export_filter[field]
+            for field in ("ring", "category_code", "class_level")
+            if field in export_filter
+        }
+        blocks_query = blocks_query.filter_by(**block_filters)
+        if "category_code" in export_filter:
+            registration_filters.append(Registration.category_code == export_filter["category_code"])
+        if "class_level" in export_filter:
+            registration_filters.append(Registration.class_level == export_filter["class_level"])
+    blocks = blocks_query.order_by(
+        ScheduleBlock.sort_index, ScheduleBlock.start_at, ScheduleBlock.id
+    ).all()
+    if export_filter and "ring" in export_filter:
+        ring_classes = {(block.category_code, block.class_level) for block in blocks}
+        registration_filters.append(
+            or_(
+                false(),
+                *[
+                    and_(Registration.category_code == category_code, Registration.class_level == class_level)
+                    for category_code, class_level in sorted(ring_classes)
+                ],
+            )
+        )
+
+    rows = (
+        db.session.query(
+            Registration.id.label("registration_id"),
+            Registration.external_id.label("registration_external_id"),
+            Registration.category_code,
+            Registration.class_level,
+            Registration.status,
+            Registration.tka_event_check_status,
+            Dog.id.label("dog_id"),
+            Dog.external_id.label("dog_external_id"),
+            Dog.name.label("dog_name"),
+            Dog.license_no,
+            Dog.license_kind,
+            Person.id.label("person_id"),
+            Person.external_id.label("person_external_id"),
+            Person.first_name,
+            Person.last_name,
+            Person.email,
+        )
+        .select_from(Registration)
+        .outerjoin(Dog, Registration.dog_id == Dog.id)
+        .outerjoin(Person, Registration.handler_id == Person.id)
+        .filter(*registration_filters)
+        .order_by(Registration.id)
+        .all()
+    )
+
     persons = {}
     dogs = {}
-
-    for registration in registrations:
-        dog = registration.dog
-        handler = registration.handler
-        if dog:
-            if not dog.external_id:
-                dog.external_id = _ensure_external_id(dog.external_id)
-            dogs[dog.external_id] = {
-                "external_id": dog.external_id,
-                "name": dog.name,
-                "license_no": dog.license_no,
-                "license_kind": dog.license_kind.value,
+    registrations = []
+    registration_external_ids = {}
+    missing_ids = {Registration: {}, Dog: {}, Person: {}}
+
+    for row in rows:
+        dog_external_id = None
+        if row.dog_id is not None:
+            dog_external_id = row.dog_external_id or missing_ids[Dog].get(row.dog_id)
+            if not dog_external_id:
+                dog_external_id = _ensure_external_id(None)
+                missing_ids[Dog][row.dog_id] = dog_external_id
+            dogs[dog_external_id] = {
+                "external_id": dog_external_id,
+                "name": row.dog_name,
+                "license_no": row.license_no,
+                "license_kind": row.license_kind.value,
             }
-        if handler:
-            if not handler.external_id:
-                handler.external_id = _ensure_external_id(handler.external_id)
-            persons[handler.external_id] = {
-                "external_id": handler.external_id,
-                "first_name": handler.first_name,
-                "last_name": handler.last_name,
-                "email": handler.email,
+        person_external_id = None
+        if row.person_id is not None:
+            person_external_id = row.person_external_id or missing_ids[Person].get(row.person_id)
+            if not person_external_id:
+                person_external_id = _ensure_external_id(None)
+                missing_ids[Person][row.person_id] = person_external_id
+            persons[person_external_id] = {
+                "external_id": person_external_id,
+                "first_name": row.first_name,
+                "last_name": row.last_name,
+                "email": row.email,
             }
 
-        if not registration.external_id:
-            registration.external_id = _ensure_external_id(registration.external_id)
-
+        registration_external_id = row.registration_external_id
+        if not registration_external_id:
+            registration_external_id = _ensure_external_id(None)
+            missing_ids[Registration][row.registration_id] = registration_external_id
+        registration_external_ids[row.registration_id] = registration_external_id
+        registrations.append((row, registration_external_id, dog_external_id, person_external_id))
+
+    for model, assigned in missing_ids.items():
+        if assigned:
+            db.session.execute(
+                update(model),
+                [{"id": pk, "external_id": value} for pk, value in assigned.items()],
+            )
     db.session.flush()
 
-    manifest = {
-        "schema": EVENT_EXPORT_SCHEMA,
-        "generated_at": _utc_now().isoformat(),
-    }
+    if canonical:
+        registrations.sort(key=lambda entry: entry[1])
+        persons = dict(sorted(persons.items()))
+        dogs = dict(sorted(dogs.items()))
+        manifest = {"schema": EVENT_EXPORT_SCHEMA, "canonical": True}
+    else:
+        manifest = {
+            "schema": EVENT_EXPORT_SCHEMA,
+            "generated_at": _utc_now().isoformat(),
+        }
+    if export_filter:
+        manifest["filter"] = export_filter
     event_payload = {
         "external_id": event.external_id,
         "name": event.name,
@@ -91,69 +227,388 @@ def build_event_export_zip(event_id: int):
         "persons": list(persons.values()),
         "dogs": list(dogs.values()),
     }
-    start_numbers_payload = _build_start_numbers_payload(event, registrations)
-    schedule_payload = _build_schedule_payload(event)
+    start_numbers_payload = _build_start_numbers_payload(event, registration_external_ids)
+    schedule_payload = _build_schedule_payload(event, blocks)
     registrations_payload = []
     payment_status = "PAID"
     if event.billing_mode != BillingMode.PORTAL:
         payment_status = "NOT_MANAGED"
 
-    for registration in registrations:
+    for row, registration_external_id, dog_external_id, person_external_id in registrations:
         registrations_payload.append(
             {
-                "external_id": registration.external_id,
+                "external_id": registration_external_id,
                 "event_external_id": event.external_id,
-                "dog_external_id": registration.dog.external_id if registration.dog else None,
-                "handler_person_external_id": registration.handler.external_id
-                if registration.handler
-                else None,
-                "category_code": registration.category_code,
-                "class_level": registration.class_level,
-                "status": registration.status.value,
-                "tka_event_check_status": registration.tka_event_check_status.value,
+                "dog_external_id": dog_external_id,
+                "handler_person_external_id": person_external_id,
+                "category_code": row.category_code,
+                "class_level": row.class_level,
+                "status": row.status.value,
+                "tka_event_check_status": row.tka_event_check_status.value,
                 "can_start": True,
                 "eligibility": {"payment_status": payment_status},
             }
         )
 
-    buffer = io.BytesIO()
-    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        zip_file.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False))
-        zip_file.writestr("event.json", json.dumps(event_payload, ensure_ascii=False))
-        zip_file.writestr("entities.json", json.dumps(entities_payload, ensure_ascii=False))
-        zip_file.writestr("registrations.json", json.dumps(registrations_payload, ensure_ascii=False))
-        zip_file.writestr(
-            "start_numbers.json", json.dumps(start_numbers_payload, ensure_ascii=False)
+    members = [
+        ("manifest.json", manifest),
+        ("event.json", event_payload),
+        ("entities.json", entities_payload),
+        ("registrations.json", registrations_payload),
+        ("start_numbers.json", start_numbers_payload),
+        ("schedule.json", schedule_payload),
+    ]
+    return event, members
+
+
+class _ZipStreamSink:
+    """Write-only, non-seekable target that buffers bytes written by ``zipfile``."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _iter_zip_stream(members, digest, canonical=False):
+    sink = _ZipStreamSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for name, payload in members:
+            if canonical:
+                name = zipfile.ZipInfo(name, date_time=CANONICAL_ZIP_TIMESTAMP)
+                name.compress_type = zipfile.ZIP_DEFLATED
+                name.external_attr = 0o644 << 16
+            with zip_file.open(name, "w") as member:
+                for data in _iter_json_chunks(payload, sort_keys=canonical):
+                    member.write(data)
+                    chunk = sink.drain()
+                    if chunk:
+                        digest.update(chunk)
+                        yield chunk
+    chunk = sink.drain()
+    if chunk:
+        digest.update(chunk)
+        yield chunk
+
+
+def _iter_json_chunks(payload, chunk_size=EXPORT_CHUNK_SIZE, sort_keys=False):
+    encoder = json.JSONEncoder(ensure_ascii=False, sort_keys=sort_keys)
+    pending = []
+    pending_size = 0
+    for part in encoder.iterencode(payload):
+        pending.append(part)
+        pending_size += len(part)
+        if pending_size >= chunk_size:
+            yield "".join(pending).encode("utf-8")
+            pending = []
+            pending_size = 0
+    if pending:
+        yield "".join(pending).encode("utf-8")
+
+
+def get_cached_event_export(event_id: int, export_filter=None, canonical=False):
+    """Return the stored artifact for the event's current content version, if any.
+
+    Only the stored ``content_version`` is compared, so a cache hit runs no
+    export queries. A canonical export rebuilt after a change that did not
+    alter its content yields the same bytes and therefore the same file.
+    """
+    event = Event.query.get(event_id)
+    if not event:
+        raise ValueError("Event not found")
+
+    slice_key = export_slice_key(export_filter, canonical)
+    query = ExchangeExportLog.query.filter_by(
+        event_id=event_id,
+        export_type=EVENT_EXPORT_TYPE,
+        slice_key=slice_key,
+    ).order_by(ExchangeExportLog.id.desc())
+    export_log = query.filter_by(content_version=event.export_content_version).first()
+    if export_log and export_log.file_path and os.path.exists(export_log.file_path):
+        return export_log
+    return None
+
+
+def _members_content_sha256(members):
+    digest = hashlib.sha256()
+    for name, payload in members:
+        digest.update(name.encode("utf-8") + b"\0")
+        for data in _iter_json_chunks(payload, sort_keys=True):
+            digest.update(data)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def prepare_event_export(event_id: int, created_by_user_id=None, export_filter=None, canonical=False):
+    export_log = get_cached_event_export(event_id, export_filter, canonical)
+    if export_log:
+        return export_log
+
+    chunks, _ = stream_event_export(
+        event_id,
+        created_by_user_id=created_by_user_id,
+        export_filter=export_filter,
+        canonical=canonical,
+    )
+    for _ in chunks:
+        pass
+    return get_cached_event_export(event_id, export_filter, canonical)
+
+
+def stream_event_export(event_id: int, created_by_user_id=None, export_filter=None, canonical=False):
+    """Stream a fresh export while storing it as the cached artifact.
+
+    The ``ExchangeExportLog`` row is written once the stream has been consumed
+    completely; an aborted download leaves neither a file nor a log entry.
+    """
+    export_filter = normalize_export_filter(export_filter)
+    event, members = _collect_event_export(event_id, export_filter, canonical)
+    digest = hashlib.sha256()
+    chunks = _iter_zip_stream(members, digest, canonical)
+    stream = _store_event_export_stream(
+        event,
+        event.export_content_version,
+        export_slice_key(export_filter, canonical),
+        _members_content_sha256(members) if canonical else None,
+        chunks,
+        digest,
+        created_by_user_id,
+    )
+    return stream, event_export_filename(event, export_filter)
+
+
+def event_export_filename(event, export_filter=None):
+    export_filter = normalize_export_filter(export_filter)
+    if not export_filter:
+        return f"event_export_{event.external_id}.zip"
+    suffix = "_".join(
+        re.sub(r"[^A-Za-z0-9]+", "-", str(export_filter[field])).strip("-").lower()
+        for field in EXPORT_FILTER_FIELDS
+        if field in export_filter
+    )
+    return f"event_export_{event.external_id}_{suffix}.zip"
+
+
+def build_bulk_event_export(event_ids, created_by_user_id=None):
+    """Build the exports of several events in parallel and bundle them into one ZIP.
+
+    Each worker runs in its own app context and therefore its own session. The
+    bundle is stored on disk under a key derived from the member exports, so an
+    unchanged selection reuses it, and one ``ExchangeExportLog`` row is written
+    per event. Bundles holding an older content version of an event are pruned.
+    """
+    event_ids = list(dict.fromkeys(event_ids))
+    if not event_ids:
+        raise ValueError("No events selected")
+
+    app = current_app._get_current_object()
+
+    def _prepare(event_id):
+        with app.app_context():
+            export_log = prepare_event_export(event_id, created_by_user_id=created_by_user_id)
+            event = Event.query.get(event_id)
+            return {
+                "event_id": event_id,
+                "event_external_id": event.external_id,
+                "file": f"events/{event_export_filename(event)}",
+                "file_path": export_log.file_path,
+                "sha256": export_log.sha256,
+                "content_version": export_log.content_version,
+            }
+
+    max_workers = min(app.config.get("EXCHANGE_EXPORT_WORKERS", 4), len(event_ids))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        exports = list(executor.map(_prepare, event_ids))
+
+    bundle_key = hashlib.sha256(
+        json.dumps([[export["event_id"], export["sha256"]] for export in exports]).encode("utf-8")
+    ).hexdigest()
+    base_dir = os.path.join(current_app.config["EXCHANGE_EXPORT_DIR"], "bulk")
+    os.makedirs(base_dir, exist_ok=True)
+    file_path = os.path.join(base_dir, f"{bundle_key}.zip")
+    if os.path.exists(file_path):
+        sha256 = _file_sha256(file_path)
+    else:
+        sha256 = _write_bulk_bundle(exports, base_dir, file_path)
+
+    for export in exports:
+        db.session.add(
+            ExchangeExportLog(
+                event_id=export["event_id"],
+                export_type=BULK_EXPORT_TYPE,
+                schema=BULK_EXPORT_SCHEMA,
+                file_path=file_path,
+                sha256=export["sha256"],
+                content_version=export["content_version"],
+                created_by_user_id=created_by_user_id,
+            )
+        )
+    _prune_bulk_exports(exports)
+    db.session.commit()
+    return file_path, f"event_export_bulk_{sha256[:12]}.zip", sha256
+
+
+def _write_bulk_bundle(exports, base_dir, file_path):
+    tmp_path = os.path.join(base_dir, f"{uuid4().hex}.tmp")
+    manifest = {
+        "schema": BULK_EXPORT_SCHEMA,
+        "generated_at": _utc_now().isoformat(),
+        "events": [],
+    }
+    try:
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_STORED) as bundle:
+            for export in exports:
+                with zipfile.ZipFile(export["file_path"]) as event_zip:
+                    event_manifest = json.loads(event_zip.read("manifest.json"))
+                bundle.write(export["file_path"], arcname=export["file"])
+                manifest["events"].append(
+                    {
+                        "event_external_id": export["event_external_id"],
+                        "file": export["file"],
+                        "sha256": export["sha256"],
+                        "manifest": event_manifest,
+                    }
+                )
+            bundle.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False))
+        sha256 = _file_sha256(tmp_path)
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return sha256
+
+
+def _prune_bulk_exports(exports):
+    """Delete bundles that hold an older content version of one of the exported events."""
+    stale_paths = {
+        file_path
+        for (file_path,) in db.session.query(ExchangeExportLog.file_path).filter(
+            ExchangeExportLog.export_type == BULK_EXPORT_TYPE,
+            ExchangeExportLog.file_path.isnot(None),
+            or_(
+                *(
+                    and_(
+                        ExchangeExportLog.event_id == export["event_id"],
+                        ExchangeExportLog.content_version < export["content_version"],
+                    )
+                    for export in exports
+                )
+            ),
+        )
+    }
+    if stale_paths:
+        _prune_export_files(
+            ExchangeExportLog.query.filter(ExchangeExportLog.file_path.in_(stale_paths)).all()
         )
-        zip_file.writestr("schedule.json", json.dumps(schedule_payload, ensure_ascii=False))
 
-    zip_bytes = buffer.getvalue()
-    sha256 = hashlib.sha256(zip_bytes).hexdigest()
-    filename = f"event_export_{event.external_id}.zip"
 
-    return zip_bytes, filename, sha256
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(EXPORT_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 
-def _build_start_numbers_payload(event, registrations):
-    numbers = []
+def _store_event_export_stream(
+    event, content_version, slice_key, content_sha256, chunks, digest, created_by_user_id
+):
+    base_dir = os.path.join(current_app.config["EXCHANGE_EXPORT_DIR"], event.external_id)
+    os.makedirs(base_dir, exist_ok=True)
+    tmp_path = os.path.join(base_dir, f"{uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, "wb") as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+                yield chunk
+        sha256 = digest.hexdigest()
+        file_path = os.path.join(base_dir, f"{sha256}.zip")
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    export_log = ExchangeExportLog(
+        event_id=event.id,
+        export_type=EVENT_EXPORT_TYPE,
+        schema=EVENT_EXPORT_SCHEMA,
+        file_path=file_path,
+        sha256=sha256,
+        content_sha256=content_sha256,
+        content_version=content_version,
+        slice_key=slice_key,
+        created_by_user_id=created_by_user_id,
+    )
+    db.session.add(export_log)
+    _prune_event_exports(event.id, slice_key, content_version)
+    db.session.commit()
+
+
+def _prune_event_exports(event_id, slice_key, content_version):
+    """Delete the slice's artifact files of older content versions.
+
+    The log rows stay as export history with their ``file_path`` cleared.
+    Files still referenced by another log, such as one re-registered for a
+    newer version, are kept.
+    """
+    stale = ExchangeExportLog.query.filter(
+        ExchangeExportLog.event_id == event_id,
+        ExchangeExportLog.export_type == EVENT_EXPORT_TYPE,
+        ExchangeExportLog.slice_key == slice_key,
+        ExchangeExportLog.content_version < content_version,
+        ExchangeExportLog.file_path.isnot(None),
+    ).all()
+    _prune_export_files(stale)
+
+
+def _prune_export_files(stale):
+    stale_paths = {export_log.file_path for export_log in stale}
+    for export_log in stale:
+        export_log.file_path = None
+    if not stale_paths:
+        return
+    db.session.flush()
+    in_use = {
+        file_path
+        for (file_path,) in db.session.query(ExchangeExportLog.file_path).filter(
+            ExchangeExportLog.file_path.in_(stale_paths)
+        )
+    }
+    for file_path in stale_paths - in_use:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+def _build_start_numbers_payload(event, registration_external_ids):
     start_numbers = (
-        StartNumber.query.filter_by(event_id=event.id)
+        db.session.query(StartNumber.registration_id, StartNumber.start_no)
+        .filter(StartNumber.event_id == event.id)
         .order_by(StartNumber.start_no)
         .all()
     )
-    for entry in start_numbers:
-        registration = next(
-            (reg for reg in registrations if reg.id == entry.registration_id), None
-        )
-        if registration and not registration.external_id:
-            registration.external_id = _ensure_external_id(registration.external_id)
-        numbers.append(
-            {
-                "registration_external_id": registration.external_id if registration else None,
-                "start_no": entry.start_no,
-            }
-        )
-    db.session.flush()
+    numbers = [
+        {
+            "registration_external_id": registration_external_ids[registration_id],
+            "start_no": start_no,
+        }
+        for registration_id, start_no in start_numbers
+        if registration_id in registration_external_ids
+    ]
     rule_set = None
     if event.start_numbers_rule_set:
         try:
@@ -171,12 +626,7 @@ def _build_start_numbers_payload(event, registrations):
     }
 
 
-def _build_schedule_payload(event):
-    blocks = (
-        ScheduleBlock.query.filter_by(event_id=event.id)
-        .order_by(ScheduleBlock.sort_index, ScheduleBlock.start_at)
-        .all()
-    )
+def _build_schedule_payload(event, blocks):
     payload_blocks = []
     for block in blocks:
         payload_blocks.append(
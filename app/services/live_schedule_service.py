@@ -0,0 +1,163 @@
+import json
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from sqlalchemy.orm import joinedload
+
+from app.extensions import db
+from app.models import ScheduleBlock, ScheduleBlockProgress
+from app.services.exchange_service import _format_schedule_datetime
+from app.services.schedule_timing_service import project_ring_times
+
+SCHEDULE_TIMEZONE = ZoneInfo("Europe/Zurich")
+
+
+def apply_live_progress(record):
+    """Update the projected schedule from a stored live update.
+
+    The update's context names the block, either as ``schedule_block_id`` or
+    as ``ring``/``category_code``/``class_level``, and may carry
+    ``completed_runs`` and ``finished``. Updates without a matching block are
+    ignored. Only the ring of the block is re-projected, from the earliest
+    block whose progress changed.
+    """
+    if not record.event_id:
+        return []
+    payload = json.loads(record.payload_json)
+    context = payload.get("context") or {}
+    block = _find_block(record.event_id, context)
+    if block is None:
+        return []
+
+    completed_runs = context.get("completed_runs")
+    if completed_runs is not None:
+        try:
+            completed_runs = int(completed_runs)
+        except (TypeError, ValueError) as exc:
+            raise ValueError("Invalid completed_runs") from exc
+        if completed_runs < 0:
+            raise ValueError("Invalid completed_runs")
+    observed_at = _local_time(record.sent_at) or datetime.now(SCHEDULE_TIMEZONE).replace(tzinfo=None)
+
+    from_sort_index = block.sort_index
+    progress = block.progress
+    if progress is None:
+        progress = ScheduleBlockProgress(event_id=record.event_id, block=block)
+        db.session.add(progress)
+    if progress.started_at is None:
+        progress.started_at = observed_at
+        # The ring has moved on, so blocks still running before this one are done.
+        for earlier in _unfinished_blocks_before(block):
+            earlier.progress.finished_at = observed_at
+            from_sort_index = min(from_sort_index, earlier.sort_index)
+    if progress.reported_at is None or observed_at >= progress.reported_at:
+        progress.reported_at = observed_at
+        if completed_runs is not None:
+            progress.completed_runs = completed_runs
+    if context.get("finished"):
+        progress.finished_at = observed_at
+
+    db.session.flush()
+    projected = project_ring_times(record.event_id, block.ring, from_sort_index=from_sort_index)
+    db.session.commit()
+    return projected
+
+
+def validate_live_context(event_id, context):
+    """Reject a live update context whose ``schedule_block_id`` is not a block of the event."""
+    if not isinstance(context, dict):
+        raise ValueError("Invalid context")
+    block_id = context.get("schedule_block_id")
+    if block_id is None:
+        return
+    if not isinstance(block_id, int) or isinstance(block_id, bool):
+        raise ValueError("Invalid schedule_block_id")
+    block = ScheduleBlock.query.get(block_id)
+    if block is None or block.event_id != event_id:
+        raise ValueError("Unknown schedule_block_id")
+
+
+def schedule_projection(event_id):
+    """Planned and projected times per block, in schedule order."""
+    blocks = (
+        ScheduleBlock.query.options(joinedload(ScheduleBlock.progress))
+        .filter_by(event_id=event_id)
+        .order_by(ScheduleBlock.sort_index, ScheduleBlock.start_at)
+        .all()
+    )
+    rows = []
+    for block in blocks:
+        progress = block.progress
+        projected_start = progress.projected_start_at if progress else None
+        projected_end = progress.projected_end_at if progress else None
+        delay_minutes = None
+        if projected_start and block.start_at:
+            delay_minutes = round((projected_start - block.start_at).total_seconds() / 60)
+        rows.append(
+            {
+                "block_id": block.id,
+                "ring": block.ring,
+                "discipline": block.discipline,
+                "category_code": block.category_code,
+                "class_level": block.class_level,
+                "notes": block.notes or "",
+                "planned_start_at": _format_schedule_datetime(block.start_at),
+                "planned_end_at": _format_schedule_datetime(block.end_at),
+                "projected_start_at": _format_schedule_datetime(projected_start or block.start_at),
+                "projected_end_at": _format_schedule_datetime(projected_end or block.end_at),
+                "delay_minutes": delay_minutes or 0,
+                "status": _block_status(progress),
+            }
+        )
+    return rows
+
+
+def _block_status(progress):
+    if progress is None or not progress.started_at:
+        return "planned"
+    if progress.finished_at:
+        return "finished"
+    return "running"
+
+
+def _find_block(event_id, context):
+    if context.get("schedule_block_id") is not None:
+        block = ScheduleBlock.query.get(context["schedule_block_id"])
+        return block if block and block.event_id == event_id else None
+    if not context.get("ring") or not context.get("category_code") or context.get("class_level") is None:
+        return None
+    query = ScheduleBlock.query.filter_by(
+        event_id=event_id,
+        ring=context["ring"],
+        category_code=context["category_code"],
+        class_level=context["class_level"],
+    )
+    if context.get("discipline"):
+        query = query.filter_by(discipline=context["discipline"])
+    candidates = query.order_by(ScheduleBlock.sort_index, ScheduleBlock.id).all()
+    for candidate in candidates:
+        if candidate.progress is None or candidate.progress.finished_at is None:
+            return candidate
+    return candidates[-1] if candidates else None
+
+
+def _unfinished_blocks_before(block):
+    return (
+        ScheduleBlock.query.join(ScheduleBlockProgress, ScheduleBlockProgress.block_id == ScheduleBlock.id)
+        .filter(
+            ScheduleBlock.event_id == block.event_id,
+            ScheduleBlock.ring == block.ring,
+            ScheduleBlock.sort_index < block.sort_index,
+            ScheduleBlockProgress.started_at.isnot(None),
+            ScheduleBlockProgress.finished_at.is_(None),
+        )
+        .all()
+    )
+
+
+def _local_time(value):
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(SCHEDULE_TIMEZONE).replace(tzinfo=None)
+    return value
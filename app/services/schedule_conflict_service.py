@@ -0,0 +1,94 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from app.models import ScheduleBlock
+from app.services.schedule_timing_service import event_timing, run_duration
+from app.services.start_time_service import ordered_starters
+
+
+def estimate_run_intervals(event_id):
+    """Estimate when each submitted registration runs in each scheduled block.
+
+    Starters run in start number order (registrations without a number
+    last, by id) after the block's course walk. Returns dicts with the
+    registration, handler, block and the run's start and end.
+    """
+    timing = event_timing(event_id)
+    blocks = (
+        ScheduleBlock.query.filter(ScheduleBlock.event_id == event_id, ScheduleBlock.start_at.isnot(None))
+        .order_by(ScheduleBlock.sort_index, ScheduleBlock.id)
+        .all()
+    )
+    blocks_by_combo = defaultdict(list)
+    for block in blocks:
+        blocks_by_combo[(block.category_code, block.class_level)].append(block)
+
+    starters_by_combo = ordered_starters(event_id)
+
+    intervals = []
+    for combo, combo_blocks in blocks_by_combo.items():
+        starters = starters_by_combo.get(combo, [])
+        per_run = run_duration(timing, combo[1])
+        for block in combo_blocks:
+            first_run = block.start_at + (timing["course_walk"] if starters else timedelta())
+            for position, row in enumerate(starters):
+                run_start = first_run + position * per_run
+                intervals.append(
+                    {
+                        "registration_id": row.id,
+                        "handler_id": row.handler_id,
+                        "handler_name": f"{row.first_name} {row.last_name}" if row.handler_id else None,
+                        "dog_name": row.name,
+                        "start_no": row.start_no,
+                        "block_id": block.id,
+                        "ring": block.ring,
+                        "start_at": run_start,
+                        "end_at": run_start + per_run,
+                    }
+                )
+    return intervals
+
+
+def find_handler_conflicts(event_id, buffer_minutes=0):
+    """Find runs of the same handler that overlap in different rings.
+
+    Intervals are grouped per handler and swept in start order, keeping only
+    the runs still active, so the cost is O(n log n) plus the conflicts found.
+    ``buffer_minutes`` is the time a handler needs to change rings.
+    """
+    buffer = timedelta(minutes=buffer_minutes)
+    by_handler = defaultdict(list)
+    for interval in estimate_run_intervals(event_id):
+        if interval["handler_id"] is not None:
+            by_handler[interval["handler_id"]].append(interval)
+
+    conflicts = []
+    for handler_id in sorted(by_handler):
+        active = []
+        for interval in sorted(by_handler[handler_id], key=lambda item: (item["start_at"], item["end_at"])):
+            active = [other for other in active if other["end_at"] + buffer > interval["start_at"]]
+            for other in active:
+                if other["ring"] != interval["ring"]:
+                    conflicts.append(_conflict_payload(other, interval))
+            active.append(interval)
+    return conflicts
+
+
+def _conflict_payload(first, second):
+    return {
+        "handler_id": first["handler_id"],
+        "handler_name": first["handler_name"],
+        "runs": [_run_payload(first), _run_payload(second)],
+    }
+
+
+def _run_payload(interval):
+    return {
+        "registration_id": interval["registration_id"],
+        "dog_name": interval["dog_name"],
+        "start_no": interval["start_no"],
+        "block_id": interval["block_id"],
+        "ring": interval["ring"],
+        "start_at": interval["start_at"].isoformat(timespec="minutes"),
+        "end_at": interval["end_at"].isoformat(timespec="minutes"),
+    }
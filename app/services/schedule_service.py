@@ -1,9 +1,23 @@
-from datetime import datetime, time
+import heapq
+from collections import defaultdict
+from datetime import timedelta
 
-from sqlalchemy import func
+from sqlalchemy import case, func, update
 
 from app.extensions import db
-from app.models import Event, Registration, RegistrationStatus, ScheduleBlock
+from app.models import Event, ScheduleBlock, StartOrderEntry
+from app.services.change_feed_service import record_bulk_changes
+from app.services.exchange_service import prepare_event_export
+from app.services.schedule_timing_service import (
+    estimate_block_durations,
+    recompute_event_schedule,
+    recompute_ring_times,
+    refresh_starter_count,
+    starter_counts,
+)
+from app.services.start_time_service import build_start_order
+
+REORDER_CHUNK_SIZE = 500
 
 
 def list_blocks(event_id):
@@ -30,15 +44,19 @@ def add_block(event_id, data):
     block = ScheduleBlock(
         event_id=event_id,
         ring=data.get("ring") or "Ring 1",
-        start_at=data.get("start_at"),
+        fixed_start_at=data.get("start_at"),
         discipline=data.get("discipline") or "Agility",
         category_code=data.get("category_code"),
         class_level=data.get("class_level"),
         notes=data.get("notes"),
         sort_index=next_sort,
     )
+    refresh_starter_count(block)
     db.session.add(block)
+    db.session.flush()
+    recompute_ring_times(event_id, block.ring, from_sort_index=block.sort_index)
     db.session.commit()
+    build_start_order(event_id)
     return block
 
 
@@ -50,10 +68,20 @@ def update_block(block_id, data):
     if event and event.schedule_locked:
         raise ValueError("Schedule is locked")
 
-    for field in ["ring", "start_at", "discipline", "category_code", "class_level", "notes"]:
+    old_ring = block.ring
+    for field in ["ring", "discipline", "category_code", "class_level", "notes"]:
         if field in data:
             setattr(block, field, data[field])
+    if "category_code" in data or "class_level" in data:
+        refresh_starter_count(block)
+    # An edited start time pins the block: it starts no earlier than that.
+    if "start_at" in data and data["start_at"] != block.start_at:
+        block.fixed_start_at = data["start_at"]
+    db.session.flush()
+    for ring in {old_ring, block.ring}:
+        recompute_ring_times(block.event_id, ring, from_sort_index=block.sort_index)
     db.session.commit()
+    build_start_order(block.event_id)
     return block
 
 
@@ -64,7 +92,11 @@ def delete_block(block_id):
     event = Event.query.get(block.event_id)
     if event and event.schedule_locked:
         raise ValueError("Schedule is locked")
+    event_id, ring, sort_index = block.event_id, block.ring, block.sort_index
+    StartOrderEntry.query.filter_by(block_id=block.id).delete()
     db.session.delete(block)
+    db.session.flush()
+    recompute_ring_times(event_id, ring, from_sort_index=sort_index)
     db.session.commit()
 
 
@@ -91,57 +123,225 @@ def move_block(block_id, direction):
         return
 
     block.sort_index, neighbor.sort_index = neighbor.sort_index, block.sort_index
+    db.session.flush()
+    from_sort_index = min(block.sort_index, neighbor.sort_index)
+    for ring in {block.ring, neighbor.ring}:
+        recompute_ring_times(block.event_id, ring, from_sort_index=from_sort_index)
+    db.session.commit()
+
+
+def move_block_after(block_id, after_block_id=None):
+    """Move a block directly behind ``after_block_id``, or to the front if None.
+
+    The block gets a sort key halfway between its new neighbours, so no other
+    block is renumbered unless the gap between them is exhausted.
+    """
+    block = ScheduleBlock.query.get(block_id)
+    if not block:
+        raise ValueError("Block not found")
+    event = Event.query.get(block.event_id)
+    if event and event.schedule_locked:
+        raise ValueError("Schedule is locked")
+
+    lower = None
+    if after_block_id is not None:
+        after = ScheduleBlock.query.get(after_block_id)
+        if not after or after.event_id != block.event_id:
+            raise ValueError("Block not found")
+        if after.id == block.id:
+            return
+        lower = after.sort_index
+    upper_query = ScheduleBlock.query.filter(
+        ScheduleBlock.event_id == block.event_id, ScheduleBlock.id != block.id
+    )
+    if lower is not None:
+        upper_query = upper_query.filter(ScheduleBlock.sort_index > lower)
+    upper = upper_query.with_entities(func.min(ScheduleBlock.sort_index)).scalar()
+
+    sort_key = _sort_key_between(lower, upper)
+    if sort_key is None:
+        _renumber_blocks(block.event_id)
+        return move_block_after(block_id, after_block_id)
+
+    old_sort_index = block.sort_index
+    block.sort_index = sort_key
+    db.session.flush()
+    recompute_ring_times(block.event_id, block.ring, from_sort_index=min(old_sort_index, sort_key))
     db.session.commit()
 
 
-def auto_generate_blocks_from_registrations(event_id):
+def reorder_blocks(event_id, block_ids):
+    """Apply a complete new block order for the event in one UPDATE per chunk."""
     event = Event.query.get(event_id)
     if not event:
         raise ValueError("Event not found")
     if event.schedule_locked:
         raise ValueError("Schedule is locked")
+    if len(set(block_ids)) != len(block_ids):
+        raise ValueError("Duplicate block in order")
 
-    registrations = Registration.query.filter_by(
-        event_id=event_id, status=RegistrationStatus.SUBMITTED
-    ).all()
+    current = dict(
+        db.session.query(ScheduleBlock.id, ScheduleBlock.sort_index).filter(
+            ScheduleBlock.event_id == event_id
+        )
+    )
+    if set(block_ids) != set(current):
+        raise ValueError("Order must list every block of the event exactly once")
 
-    combos = set()
-    for registration in registrations:
-        combos.add(("Agility", registration.category_code, registration.class_level))
+    new_keys = {block_id: float(position) for position, block_id in enumerate(block_ids, start=1)}
+    changed = [block_id for block_id in block_ids if current[block_id] != new_keys[block_id]]
+    for start in range(0, len(changed), REORDER_CHUNK_SIZE):
+        chunk = changed[start : start + REORDER_CHUNK_SIZE]
+        db.session.execute(
+            update(ScheduleBlock)
+            .where(ScheduleBlock.id.in_(chunk))
+            .values(sort_index=case({block_id: new_keys[block_id] for block_id in chunk}, value=ScheduleBlock.id))
+            .execution_options(synchronize_session=False)
+        )
+    record_bulk_changes(db.session, ScheduleBlock, changed)
+    if changed:
+        recompute_event_schedule(event_id, refresh_counts=False)
+    db.session.commit()
+    return {"event_id": event_id, "updated": len(changed)}
 
-    if event.starts_at:
-        default_start = event.starts_at.replace(hour=8, minute=0, second=0, microsecond=0)
-    else:
-        base_date = datetime.utcnow().date()
-        default_start = datetime.combine(base_date, time(hour=8))
 
-    ScheduleBlock.query.filter_by(event_id=event_id).delete()
+def _sort_key_between(lower, upper):
+    if lower is None and upper is None:
+        return 1.0
+    if lower is None:
+        return upper - 1.0
+    if upper is None:
+        return lower + 1.0
+    key = (lower + upper) / 2
+    if not lower < key < upper:
+        return None
+    return key
 
-    sort_index = 1
-    for discipline, category_code, class_level in sorted(combos):
-        db.session.add(
+
+def _renumber_blocks(event_id):
+    block_ids = [
+        block_id
+        for (block_id,) in db.session.query(ScheduleBlock.id)
+        .filter(ScheduleBlock.event_id == event_id)
+        .order_by(ScheduleBlock.sort_index, ScheduleBlock.id)
+    ]
+    reorder_blocks(event_id, block_ids)
+
+
+def auto_generate_blocks_from_registrations(event_id, ring_count=None):
+    event = Event.query.get(event_id)
+    if not event:
+        raise ValueError("Event not found")
+    if event.schedule_locked:
+        raise ValueError("Schedule is locked")
+
+    counts = starter_counts(event_id)
+
+    StartOrderEntry.query.filter_by(event_id=event_id).delete()
+    # Deleted through the session so the change feed records every removed block.
+    for block in ScheduleBlock.query.filter_by(event_id=event_id):
+        db.session.delete(block)
+    db.session.flush()
+
+    db.session.add_all(
+        [
             ScheduleBlock(
                 event_id=event_id,
                 ring="Ring 1",
-                start_at=default_start,
-                discipline=discipline,
+                discipline="Agility",
                 category_code=category_code,
                 class_level=class_level,
+                starter_count=count,
                 notes="",
                 sort_index=sort_index,
             )
-        )
-        sort_index += 1
+            for sort_index, ((category_code, class_level), count) in enumerate(sorted(counts.items()), start=1)
+        ]
+    )
+    db.session.flush()
+    if ring_count:
+        _layout_rings(event_id, ring_count)
+    recompute_event_schedule(event_id, refresh_counts=False)
+    db.session.commit()
+    build_start_order(event_id)
+
+
+def balance_rings(event_id, ring_count):
+    """Spread the event's blocks over ``ring_count`` rings to finish as early as possible.
+
+    Blocks of one discipline and category stay together in one ring in
+    class order, so class 1 always runs before class 2.
+    """
+    event = Event.query.get(event_id)
+    if not event:
+        raise ValueError("Event not found")
+    if event.schedule_locked:
+        raise ValueError("Schedule is locked")
+    _layout_rings(event_id, ring_count)
+    recompute_event_schedule(event_id, refresh_counts=False)
+    db.session.commit()
 
+
+def _layout_rings(event_id, ring_count):
+    if not isinstance(ring_count, int) or ring_count < 1:
+        raise ValueError("Ring count must be a positive number")
+    blocks = list_blocks(event_id)
+    durations = estimate_block_durations(event_id, blocks)
+
+    chains = defaultdict(list)
+    for block in blocks:
+        chains[(block.discipline or "", block.category_code or "")].append(block)
+    for chain in chains.values():
+        chain.sort(key=lambda block: (block.class_level or 0, block.sort_index or 0, block.id))
+
+    # Longest processing time first: each chain goes to the least loaded ring.
+    ordered = sorted(
+        chains.items(),
+        key=lambda item: (-sum((durations[block.id] for block in item[1]), timedelta()), item[0]),
+    )
+    loads = [(timedelta(), index) for index in range(ring_count)]
+    ring_blocks = [[] for _ in range(ring_count)]
+    for _, chain in ordered:
+        load, index = heapq.heappop(loads)
+        ring_blocks[index].extend(chain)
+        heapq.heappush(loads, (load + sum((durations[block.id] for block in chain), timedelta()), index))
+
+    sort_index = 1
+    for index, assigned in enumerate(ring_blocks):
+        for block in assigned:
+            block.ring = f"Ring {index + 1}"
+            block.sort_index = sort_index
+            sort_index += 1
+    db.session.flush()
+
+
+def refresh_schedule(event_id):
+    """Refresh the blocks' starter counts from the current registrations and recompute all times.
+
+    Block times are a snapshot of the counts at the last schedule change;
+    registrations added or withdrawn later only count after a refresh.
+    """
+    event = Event.query.get(event_id)
+    if not event:
+        raise ValueError("Event not found")
+    if event.schedule_locked:
+        raise ValueError("Schedule is locked")
+    recompute_event_schedule(event_id)
     db.session.commit()
+    build_start_order(event_id)
 
 
 def lock_schedule(event_id):
     event = Event.query.get(event_id)
     if not event:
         raise ValueError("Event not found")
+    if not event.schedule_locked:
+        # The locked schedule is exported, so it must count the current starters.
+        recompute_event_schedule(event_id)
     event.schedule_locked = True
     db.session.commit()
+    build_start_order(event_id)
+    prepare_event_export(event_id)
 
 
 def unlock_schedule(event_id):
@@ -0,0 +1,263 @@
+import json
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import func
+
+from app.extensions import db
+from app.models import Event, Registration, RegistrationStatus, ScheduleBlock, ScheduleBlockProgress
+
+DEFAULT_TIMING_RULES = {
+    "day_start": "08:00",
+    "ring_starts": {},
+    "seconds_per_run": 60,
+    "class_seconds_per_run": {},
+    "course_walk_minutes": 10,
+    "breaks": [],
+}
+
+
+def load_timing_rules(event):
+    """Return the event's timing rules merged over DEFAULT_TIMING_RULES.
+
+    Breaks are ``{"start": "12:00", "minutes": 45}`` with an optional
+    ``"ring"``; a break is taken at the first block boundary at or after its
+    start.
+    """
+    rules = dict(DEFAULT_TIMING_RULES)
+    if event.schedule_timing_rules:
+        try:
+            stored = json.loads(event.schedule_timing_rules)
+        except json.JSONDecodeError as exc:
+            raise ValueError("Invalid schedule timing rules") from exc
+        rules.update(stored)
+    return rules
+
+
+def set_timing_rules(event_id, rules):
+    event = Event.query.get(event_id)
+    if not event:
+        raise ValueError("Event not found")
+    if event.schedule_locked:
+        raise ValueError("Schedule is locked")
+    if not isinstance(rules, dict):
+        raise ValueError("Timing rules must be an object")
+    unknown = set(rules) - set(DEFAULT_TIMING_RULES)
+    if unknown:
+        raise ValueError(f"Unknown timing rules: {', '.join(sorted(unknown))}")
+    event.schedule_timing_rules = json.dumps(rules, ensure_ascii=False, sort_keys=True)
+    _parse_rules(event, load_timing_rules(event))
+    recompute_event_schedule(event_id)
+    db.session.commit()
+
+
+def starter_counts(event_id, category_code=None, class_level=None):
+    """Count submitted registrations per (category, class) in one GROUP BY query."""
+    query = db.session.query(
+        Registration.category_code, Registration.class_level, func.count(Registration.id)
+    ).filter(Registration.event_id == event_id, Registration.status == RegistrationStatus.SUBMITTED)
+    if category_code is not None:
+        query = query.filter(
+            Registration.category_code == category_code, Registration.class_level == class_level
+        )
+    rows = query.group_by(Registration.category_code, Registration.class_level).all()
+    return {(category_code, class_level): count for category_code, class_level, count in rows}
+
+
+def refresh_starter_count(block):
+    counts = starter_counts(block.event_id, block.category_code, block.class_level)
+    block.starter_count = counts.get((block.category_code, block.class_level), 0)
+
+
+def recompute_event_schedule(event_id, refresh_counts=True):
+    """Recompute all rings, refreshing the stored starter counts first if asked to."""
+    counts = starter_counts(event_id) if refresh_counts else None
+    rings = set()
+    for block in ScheduleBlock.query.filter_by(event_id=event_id):
+        if counts is not None:
+            block.starter_count = counts.get((block.category_code, block.class_level), 0)
+        rings.add(block.ring)
+    for ring in sorted(rings):
+        recompute_ring_times(event_id, ring)
+
+
+def recompute_ring_times(event_id, ring, from_sort_index=None):
+    """Recompute start/end times of a ring's blocks from ``from_sort_index`` on.
+
+    Blocks before that position keep their stored times; their end times
+    provide the starting point and tell which breaks were already taken.
+    Durations use the starter counts stored on the blocks.
+    """
+    event = Event.query.get(event_id)
+    timing = _parse_rules(event, load_timing_rules(event))
+    blocks = (
+        ScheduleBlock.query.filter_by(event_id=event_id, ring=ring)
+        .order_by(ScheduleBlock.sort_index, ScheduleBlock.id)
+        .all()
+    )
+    start_index = 0
+    if from_sort_index is not None:
+        start_index = next(
+            (index for index, block in enumerate(blocks) if block.sort_index >= from_sort_index),
+            len(blocks),
+        )
+    upstream = blocks[:start_index]
+    if any(block.end_at is None for block in upstream):
+        start_index, upstream = 0, []
+
+    ring_start = timing["ring_starts"].get(ring, timing["day_start"])
+    breaks = [item for item in timing["breaks"] if item["ring"] in (None, ring)]
+    # Replay which breaks the upstream blocks took; several can fall on one boundary.
+    cursor = ring_start
+    for block in upstream:
+        while breaks and cursor >= breaks[0]["start"]:
+            cursor += breaks.pop(0)["duration"]
+        cursor = block.end_at
+
+    for block in blocks[start_index:]:
+        if block.starter_count is None:
+            refresh_starter_count(block)
+        while breaks and cursor >= breaks[0]["start"]:
+            cursor += breaks.pop(0)["duration"]
+        if block.fixed_start_at and block.fixed_start_at > cursor:
+            cursor = block.fixed_start_at
+        block.start_at = cursor
+        cursor += block_duration(block, timing)
+        block.end_at = cursor
+    _project_blocks(event_id, blocks, start_index, timing)
+    return blocks[start_index:]
+
+
+def project_ring_times(event_id, ring, from_sort_index=None):
+    """Project a ring's start/end times from live progress, from ``from_sort_index`` on.
+
+    Reported blocks end after their remaining runs (or when they were
+    finished); the others start at their planned time or when the block
+    before them is projected to end, whichever is later.
+    """
+    event = Event.query.get(event_id)
+    timing = _parse_rules(event, load_timing_rules(event))
+    blocks = (
+        ScheduleBlock.query.filter_by(event_id=event_id, ring=ring)
+        .order_by(ScheduleBlock.sort_index, ScheduleBlock.id)
+        .all()
+    )
+    start_index = 0
+    if from_sort_index is not None:
+        start_index = next(
+            (index for index, block in enumerate(blocks) if block.sort_index >= from_sort_index),
+            len(blocks),
+        )
+    return _project_blocks(event_id, blocks, start_index, timing)
+
+
+def _project_blocks(event_id, blocks, start_index, timing):
+    progress_by_block = {
+        progress.block_id: progress
+        for progress in ScheduleBlockProgress.query.filter(
+            ScheduleBlockProgress.block_id.in_([block.id for block in blocks])
+        )
+    }
+    if not any(progress.reported_at for progress in progress_by_block.values()):
+        return []
+
+    cursor = None
+    if start_index:
+        previous = blocks[start_index - 1]
+        previous_progress = progress_by_block.get(previous.id)
+        cursor = previous_progress.projected_end_at if previous_progress else previous.end_at
+    projected = []
+    for block in blocks[start_index:]:
+        if block.start_at is None:
+            continue
+        planned = block.end_at - block.start_at if block.end_at else block_duration(block, timing)
+        progress = progress_by_block.get(block.id)
+        if progress is None:
+            progress = ScheduleBlockProgress(event_id=event_id, block=block)
+            db.session.add(progress)
+        if progress.reported_at:
+            start = progress.started_at
+            per_run = run_duration(timing, block.class_level)
+            if progress.completed_runs:
+                # Runs already done when first seen started before the first report.
+                start = min(start, progress.reported_at - timing["course_walk"] - progress.completed_runs * per_run)
+            if progress.finished_at:
+                end = progress.finished_at
+            elif progress.completed_runs:
+                remaining = max((block.starter_count or 0) - progress.completed_runs, 0)
+                end = progress.reported_at + remaining * per_run
+            else:
+                end = max(start + planned, progress.reported_at)
+        else:
+            start = block.start_at if cursor is None else max(block.start_at, cursor)
+            end = start + planned
+        progress.projected_start_at = start
+        progress.projected_end_at = end
+        cursor = end
+        projected.append(progress)
+    return projected
+
+
+def event_timing(event_id):
+    """Return the event's timing rules parsed into datetimes and timedeltas."""
+    event = Event.query.get(event_id)
+    if not event:
+        raise ValueError("Event not found")
+    return _parse_rules(event, load_timing_rules(event))
+
+
+def estimate_block_durations(event_id, blocks):
+    """Return the estimated duration of each block by id under the event's rules."""
+    timing = event_timing(event_id)
+    for block in blocks:
+        if block.starter_count is None:
+            refresh_starter_count(block)
+    return {block.id: block_duration(block, timing) for block in blocks}
+
+
+def block_duration(block, timing):
+    starters = block.starter_count
+    if not starters:
+        return timedelta()
+    return timing["course_walk"] + starters * run_duration(timing, block.class_level)
+
+
+def run_duration(timing, class_level):
+    seconds = timing["class_seconds_per_run"].get(class_level, timing["seconds_per_run"])
+    return timedelta(seconds=seconds)
+
+
+def _parse_rules(event, rules):
+    day = event.starts_at.date() if event.starts_at else datetime.utcnow().date()
+    try:
+        breaks = sorted(
+            (
+                {
+                    "start": datetime.combine(day, _parse_time(item["start"])),
+                    "duration": timedelta(minutes=int(item["minutes"])),
+                    "ring": item.get("ring"),
+                }
+                for item in rules["breaks"]
+            ),
+            key=lambda item: item["start"],
+        )
+        return {
+            "day_start": datetime.combine(day, _parse_time(rules["day_start"])),
+            "ring_starts": {
+                ring: datetime.combine(day, _parse_time(value))
+                for ring, value in rules["ring_starts"].items()
+            },
+            "seconds_per_run": int(rules["seconds_per_run"]),
+            "class_seconds_per_run": {
+                int(level): int(seconds) for level, seconds in rules["class_seconds_per_run"].items()
+            },
+            "course_walk": timedelta(minutes=int(rules["course_walk_minutes"])),
+            "breaks": breaks,
+        }
+    except (AttributeError, KeyError, TypeError, ValueError) as exc:
+        raise ValueError("Invalid schedule timing rules") from exc
+
+
+def _parse_time(value):
+    if isinstance(value, time):
+        return value
+    return time.fromisoformat(value)
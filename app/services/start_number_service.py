@@ -1,27 +1,53 @@
+import heapq
 import json
 import random
+from collections import defaultdict, deque
 from datetime import datetime
 
+from sqlalchemy import case, insert, update
+
 from app.extensions import db
 from app.models import Event, Registration, RegistrationStatus, StartNumber
+from app.services.change_feed_service import record_bulk_changes
+from app.services.exchange_service import prepare_event_export
+from app.services.start_time_service import build_start_order
+
+HANDLER_SPACING_MIN_GAP = 3
+HANDLER_SPACING_REPAIR_ATTEMPTS = 50
+REORDER_CHUNK_SIZE = 500
 
 
-def generate_start_numbers(event_id: int, mode: str, club_prio=None, seed=None) -> None:
+def generate_start_numbers(
+    event_id: int, mode: str, club_prio=None, seed=None, min_gap=None, ranges=None
+):
+    """Assign start numbers and return the handler-spacing violations that could not be resolved.
+
+    ``ranges`` optionally numbers categories or classes from their own start,
+    e.g. ``[{"category_code": "Large", "class_level": 1, "start": 100}]``;
+    everything else is numbered from 1 around them. Without a ``seed`` one is
+    generated, and the full rule set is stored so the numbers can be
+    regenerated with ``regenerate_start_numbers``.
+    """
     event = Event.query.get(event_id)
     if not event:
         raise ValueError("Event not found")
     if event.start_numbers_locked:
         raise ValueError("Start numbers are locked")
+    ranges = normalize_start_number_ranges(ranges)
 
-    registrations = Registration.query.filter_by(
-        event_id=event_id, status=RegistrationStatus.SUBMITTED
-    ).all()
+    registrations = (
+        Registration.query.filter_by(event_id=event_id, status=RegistrationStatus.SUBMITTED)
+        .order_by(Registration.id)
+        .all()
+    )
+    violations = []
 
-    if seed is not None:
-        random.seed(seed)
+    if seed is None:
+        seed = random.SystemRandom().randrange(2**31)
+    rng = random.Random(seed)
 
     if mode == "RANDOM":
-        random.shuffle(registrations)
+        rng.shuffle(registrations)
     elif mode == "CLUB_PRIO":
         if not club_prio:
             raise ValueError("club_prio required")
@@ -29,34 +55,236 @@ def generate_start_numbers(event_id: int, mode: str, club_prio=None, seed=None)
         club_name = club_prio.get("club_name")
         if club_mode == "random_club_first":
             clubs = [reg.club_name for reg in registrations if reg.club_name]
-            club_name = random.choice(clubs) if clubs else None
+            club_name = rng.choice(clubs) if clubs else None
         if not club_name:
-            random.shuffle(registrations)
+            rng.shuffle(registrations)
         else:
             preferred = [reg for reg in registrations if reg.club_name == club_name]
             others = [reg for reg in registrations if reg.club_name != club_name]
-            random.shuffle(preferred)
-            random.shuffle(others)
+            rng.shuffle(preferred)
+            rng.shuffle(others)
             registrations = preferred + others
+    elif mode == "HANDLER_SPACING":
+        min_gap = HANDLER_SPACING_MIN_GAP if min_gap is None else min_gap
+        if min_gap < 1:
+            raise ValueError("min_gap must be at least 1")
+        registrations = order_with_handler_spacing(registrations, min_gap, rng)
     else:
         raise ValueError("Unsupported mode")
 
-    StartNumber.query.filter_by(event_id=event_id).delete()
+    start_nos = _assign_start_nos(registrations, ranges)
+    if mode == "HANDLER_SPACING":
+        violations = find_handler_spacing_violations(registrations, min_gap, start_nos)
 
-    for index, registration in enumerate(registrations, start=1):
-        db.session.add(
-            StartNumber(
-                event_id=event_id,
-                registration_id=registration.id,
-                start_no=index,
-            )
-        )
+    _replace_start_numbers(event_id, registrations, start_nos)
 
     event.start_numbers_generated_at = datetime.utcnow()
-    event.start_numbers_rule_set = json.dumps(
-        {"mode": mode, "club_prio": club_prio, "seed": seed}, ensure_ascii=False
-    )
+    rule_set = {"mode": mode, "club_prio": club_prio, "seed": seed}
+    if ranges:
+        rule_set["ranges"] = ranges
+    if mode == "HANDLER_SPACING":
+        rule_set.update({"min_gap": min_gap, "violations": violations})
+    event.start_numbers_rule_set = json.dumps(rule_set, ensure_ascii=False)
     db.session.commit()
+    build_start_order(event_id)
+    return violations
+
+
+def regenerate_start_numbers(event_id: int):
+    """Regenerate start numbers with the rule set stored by the last generation."""
+    event = Event.query.get(event_id)
+    if not event:
+        raise ValueError("Event not found")
+    if not event.start_numbers_rule_set:
+        raise ValueError("No start number rule set stored")
+    rule_set = json.loads(event.start_numbers_rule_set)
+    return generate_start_numbers(
+        event_id,
+        mode=rule_set["mode"],
+        club_prio=rule_set.get("club_prio"),
+        seed=rule_set.get("seed"),
+        min_gap=rule_set.get("min_gap"),
+        ranges=rule_set.get("ranges"),
+    )
+
+
+def normalize_start_number_ranges(ranges):
+    normalized = []
+    seen = set()
+    for entry in ranges or []:
+        category_code = entry.get("category_code")
+        class_level = entry.get("class_level")
+        start = entry.get("start")
+        if not category_code:
+            raise ValueError("Start number range needs a category_code")
+        if not isinstance(start, int) or start < 1:
+            raise ValueError("Start number range needs a positive start")
+        if class_level is not None and not isinstance(class_level, int):
+            raise ValueError("Start number range class_level must be a number")
+        if (category_code, class_level) in seen:
+            raise ValueError(f"Duplicate start number range for {category_code} {class_level or ''}".strip())
+        seen.add((category_code, class_level))
+        normalized.append({"category_code": category_code, "class_level": class_level, "start": start})
+    return normalized
+
+
+def _assign_start_nos(registrations, ranges):
+    """Return one start number per registration, in order, honouring the configured ranges."""
+    next_in_range = {}
+    for entry in ranges:
+        next_in_range[(entry["category_code"], entry["class_level"])] = entry["start"]
+
+    start_nos = [None] * len(registrations)
+    used = set()
+    for index, registration in enumerate(registrations):
+        key = (registration.category_code, registration.class_level)
+        if key not in next_in_range:
+            key = (registration.category_code, None)
+        if key not in next_in_range:
+            continue
+        start_no = next_in_range[key]
+        if start_no in used:
+            raise ValueError(f"Start number ranges overlap at {start_no}")
+        used.add(start_no)
+        next_in_range[key] = start_no + 1
+        start_nos[index] = start_no
+
+    next_free = 1
+    for index, start_no in enumerate(start_nos):
+        if start_no is not None:
+            continue
+        while next_free in used:
+            next_free += 1
+        start_nos[index] = next_free
+        used.add(next_free)
+    return start_nos
+
+
+def _replace_start_numbers(event_id, registrations, start_nos):
+    registration_ids = [registration.id for registration in registrations]
+    # Numbers of registrations that drop out go through the ORM so the change
+    # feed records their deletion; the rest is replaced in bulk.
+    for entry in StartNumber.query.filter(
+        StartNumber.event_id == event_id, StartNumber.registration_id.notin_(registration_ids)
+    ):
+        db.session.delete(entry)
+    db.session.flush()
+    StartNumber.query.filter_by(event_id=event_id).delete(synchronize_session=False)
+    if not registration_ids:
+        return
+    now = datetime.utcnow()
+    db.session.execute(
+        insert(StartNumber),
+        [
+            {
+                "event_id": event_id,
+                "registration_id": registration_id,
+                "start_no": start_no,
+                "created_at": now,
+            }
+            for registration_id, start_no in zip(registration_ids, start_nos)
+        ],
+    )
+    start_number_ids = [
+        start_number_id
+        for (start_number_id,) in db.session.query(StartNumber.id).filter_by(event_id=event_id)
+    ]
+    record_bulk_changes(db.session, StartNumber, start_number_ids)
+
+
+def order_with_handler_spacing(registrations, min_gap, rng):
+    """Order registrations class block by class block, keeping each handler's dogs ``min_gap`` apart."""
+    blocks = defaultdict(list)
+    for registration in registrations:
+        blocks[(registration.category_code or "", registration.class_level or 0)].append(registration)
+    ordered = []
+    for key in sorted(blocks):
+        block = _space_handlers(blocks[key], min_gap, rng)
+        ordered.extend(_repair_handler_spacing(block, min_gap, rng))
+    return ordered
+
+
+def find_handler_spacing_violations(ordered, min_gap, start_nos=None):
+    """Return handler clashes closer than ``min_gap`` start positions within a class."""
+    last_seen = {}
+    violations = []
+    for position, registration in enumerate(ordered):
+        if registration.handler_id is None:
+            continue
+        key = (registration.category_code, registration.class_level, registration.handler_id)
+        previous = last_seen.get(key)
+        if previous is not None and position - previous < min_gap:
+            violations.append(
+                {
+                    "handler_id": registration.handler_id,
+                    "category_code": registration.category_code,
+                    "class_level": registration.class_level,
+                    "start_nos": [
+                        start_nos[previous] if start_nos else previous + 1,
+                        start_nos[position] if start_nos else position + 1,
+                    ],
+                }
+            )
+        last_seen[key] = position
+    return violations
+
+
+def _handler_key(registration):
+    if registration.handler_id is None:
+        return ("registration", registration.id)
+    return ("handler", registration.handler_id)
+
+
+def _space_handlers(registrations, min_gap, rng):
+    # Greedy: at every position take the handler with the most dogs left among
+    # those whose last dog is at least min_gap back (random tie-break). If every
+    # handler is still cooling down, place the one that frees up first and leave
+    # the clash to the repair pass.
+    by_handler = defaultdict(list)
+    for registration in registrations:
+        by_handler[_handler_key(registration)].append(registration)
+    available = []
+    for index, (handler, items) in enumerate(by_handler.items()):
+        rng.shuffle(items)
+        available.append((-len(items), rng.random(), index, handler))
+    heapq.heapify(available)
+
+    cooling = deque()
+    ordered = []
+    for position in range(len(registrations)):
+        while cooling and cooling[0][0] <= position:
+            heapq.heappush(available, cooling.popleft()[1:])
+        if available:
+            remaining, _, index, handler = heapq.heappop(available)
+        else:
+            _, remaining, _, index, handler = cooling.popleft()
+        ordered.append(by_handler[handler].pop())
+        if remaining + 1 < 0:
+            cooling.append((position + min_gap, remaining + 1, rng.random(), index, handler))
+    return ordered
+
+
+def _repair_handler_spacing(ordered, min_gap, rng):
+    keys = [_handler_key(registration) for registration in ordered]
+
+    def clashes(position):
+        low = max(0, position - min_gap + 1)
+        high = min(len(keys), position + min_gap)
+        return any(keys[other] == keys[position] for other in range(low, high) if other != position)
+
+    for position in range(len(ordered)):
+        if not clashes(position):
+            continue
+        for _ in range(HANDLER_SPACING_REPAIR_ATTEMPTS):
+            other = rng.randrange(len(ordered))
+            if keys[other] == keys[position]:
+                continue
+            keys[position], keys[other] = keys[other], keys[position]
+            if not clashes(position) and not clashes(other):
+                ordered[position], ordered[other] = ordered[other], ordered[position]
+                break
+            keys[position], keys[other] = keys[other], keys[position]
+    return ordered
 
 
 def lock_start_numbers(event_id: int) -> None:
@@ -65,6 +293,8 @@ def lock_start_numbers(event_id: int) -> None:
         raise ValueError("Event not found")
     event.start_numbers_locked = True
     db.session.commit()
+    build_start_order(event_id)
+    prepare_event_export(event_id)
 
 
 def unlock_start_numbers(event_id: int) -> None:
@@ -75,6 +305,105 @@ def unlock_start_numbers(event_id: int) -> None:
     db.session.commit()
 
 
+def reorder_start_numbers(event_id: int, numbers) -> dict:
+    """Apply a registration -> start number mapping atomically.
+
+    The mapping may be partial; registrations it does not mention keep their
+    numbers. Moved rows are first parked on negative numbers and then set with
+    a single CASE update, so swaps never trip the unique constraint.
+    """
+    event = Event.query.get(event_id)
+    if not event:
+        raise ValueError("Event not found")
+    if event.start_numbers_locked:
+        raise ValueError("Start numbers are locked")
+    if not numbers:
+        raise ValueError("numbers required")
+    for registration_id, start_no in numbers.items():
+        if not isinstance(registration_id, int) or not isinstance(start_no, int) or start_no < 1:
+            raise ValueError("Start numbers must be positive integers")
+
+    registration_ids = set(numbers)
+    known_ids = {
+        registration_id
+        for (registration_id,) in db.session.query(Registration.id).filter(
+            Registration.event_id == event_id, Registration.id.in_(registration_ids)
+        )
+    }
+    unknown = sorted(registration_ids - known_ids)
+    if unknown:
+        raise ValueError(f"Registration not in event: {', '.join(str(value) for value in unknown)}")
+
+    current = dict(
+        db.session.query(StartNumber.registration_id, StartNumber.start_no).filter(
+            StartNumber.event_id == event_id
+        )
+    )
+    final = {**current, **numbers}
+    if len(set(final.values())) != len(final):
+        raise ValueError("Start number already in use")
+
+    moved = {
+        registration_id: start_no
+        for registration_id, start_no in numbers.items()
+        if registration_id in current and current[registration_id] != start_no
+    }
+    created = {
+        registration_id: start_no
+        for registration_id, start_no in numbers.items()
+        if registration_id not in current
+    }
+    moved_ids = list(moved)
+    for start in range(0, len(moved_ids), REORDER_CHUNK_SIZE):
+        chunk = moved_ids[start : start + REORDER_CHUNK_SIZE]
+        db.session.execute(
+            update(StartNumber)
+            .where(StartNumber.event_id == event_id, StartNumber.registration_id.in_(chunk))
+            .values(start_no=-StartNumber.start_no)
+            .execution_options(synchronize_session=False)
+        )
+    for start in range(0, len(moved_ids), REORDER_CHUNK_SIZE):
+        chunk = moved_ids[start : start + REORDER_CHUNK_SIZE]
+        db.session.execute(
+            update(StartNumber)
+            .where(StartNumber.event_id == event_id, StartNumber.registration_id.in_(chunk))
+            .values(
+                start_no=case(
+                    {registration_id: moved[registration_id] for registration_id in chunk},
+                    value=StartNumber.registration_id,
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+    if created:
+        now = datetime.utcnow()
+        db.session.execute(
+            insert(StartNumber),
+            [
+                {
+                    "event_id": event_id,
+                    "registration_id": registration_id,
+                    "start_no": start_no,
+                    "created_at": now,
+                }
+                for registration_id, start_no in created.items()
+            ],
+        )
+
+    changed_ids = [*moved, *created]
+    if changed_ids:
+        start_number_ids = [
+            start_number_id
+            for (start_number_id,) in db.session.query(StartNumber.id).filter(
+                StartNumber.event_id == event_id, StartNumber.registration_id.in_(changed_ids)
+            )
+        ]
+        record_bulk_changes(db.session, StartNumber, start_number_ids)
+    db.session.commit()
+    build_start_order(event_id)
+    return {"event_id": event_id, "updated": len(moved), "created": len(created)}
+
+
 def set_start_number_manual(event_id: int, registration_id: int, new_start_no: int) -> None:
     if StartNumber.query.filter_by(event_id=event_id, start_no=new_start_no).first():
         raise ValueError("Start number already in use")
@@ -86,3 +415,4 @@ def set_start_number_manual(event_id: int, registration_id: int, new_start_no: i
     else:
         entry.start_no = new_start_no
     db.session.commit()
+    build_start_order(event_id)
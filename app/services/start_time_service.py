@@ -0,0 +1,172 @@
+from collections import defaultdict
+from types import SimpleNamespace
+
+from sqlalchemy.orm import joinedload
+
+from app.extensions import db
+from app.models import (
+    Dog,
+    Event,
+    Person,
+    Registration,
+    RegistrationStatus,
+    ScheduleBlock,
+    StartNumber,
+    StartOrderEntry,
+)
+from app.services.exchange_service import _format_schedule_datetime
+from app.services.schedule_timing_service import event_timing, run_duration
+
+
+def ordered_starters(event_id):
+    """Submitted registrations per (category, class) in running order.
+
+    Starters run by start number; registrations without a number follow by id.
+    """
+    rows = (
+        db.session.query(
+            Registration.id,
+            Registration.handler_id,
+            Registration.dog_id,
+            Registration.category_code,
+            Registration.class_level,
+            StartNumber.start_no,
+            Dog.name,
+            Person.first_name,
+            Person.last_name,
+        )
+        .outerjoin(
+            StartNumber,
+            (StartNumber.registration_id == Registration.id) & (StartNumber.event_id == event_id),
+        )
+        .outerjoin(Dog, Dog.id == Registration.dog_id)
+        .outerjoin(Person, Person.id == Registration.handler_id)
+        .filter(Registration.event_id == event_id, Registration.status == RegistrationStatus.SUBMITTED)
+        .all()
+    )
+    starters = defaultdict(list)
+    for row in rows:
+        starters[(row.category_code, row.class_level)].append(row)
+    for combo_rows in starters.values():
+        combo_rows.sort(key=lambda row: (row.start_no is None, row.start_no or 0, row.id))
+    return starters
+
+
+def build_start_order(event_id):
+    """Rebuild the event's precomputed start order for its current content version.
+
+    Called by the schedule and start number write paths and when either is
+    locked, so readers never have to rebuild it.
+    """
+    event = Event.query.get(event_id)
+    if not event:
+        raise ValueError("Event not found")
+    rows = _start_order_rows(event_id)
+
+    StartOrderEntry.query.filter_by(event_id=event_id).delete()
+    if rows:
+        db.session.execute(StartOrderEntry.__table__.insert(), rows)
+    event.start_order_version = event.export_content_version
+    db.session.commit()
+    return len(rows)
+
+
+def _start_order_rows(event_id):
+    starters = ordered_starters(event_id)
+    blocks = ScheduleBlock.query.filter_by(event_id=event_id).order_by(ScheduleBlock.sort_index, ScheduleBlock.id)
+    return [
+        {
+            "event_id": event_id,
+            "registration_id": row.id,
+            "block_id": block.id,
+            "handler_id": row.handler_id,
+            "dog_id": row.dog_id,
+            "start_no": row.start_no,
+            "position": position,
+        }
+        for block in blocks
+        for position, row in enumerate(starters.get((block.category_code, block.class_level), []))
+    ]
+
+
+def estimate_start_times(event_id, handler_id=None, dog_id=None):
+    """Estimated start times of one handler's or dog's runs.
+
+    Reads the precomputed start order and applies the current ring progress.
+    If the event's content changed since the order was built, for example a
+    registration was withdrawn, the order is computed in memory instead.
+    Nothing is written.
+    """
+    if handler_id is None and dog_id is None:
+        raise ValueError("Handler or dog required")
+    event = Event.query.get(event_id)
+    if not event:
+        raise ValueError("Event not found")
+
+    if event.start_order_version == event.export_content_version:
+        query = StartOrderEntry.query.filter_by(event_id=event_id)
+        if handler_id is not None:
+            query = query.filter_by(handler_id=handler_id)
+        if dog_id is not None:
+            query = query.filter_by(dog_id=dog_id)
+        entries = query.all()
+    else:
+        entries = [
+            SimpleNamespace(**row)
+            for row in _start_order_rows(event_id)
+            if (handler_id is None or row["handler_id"] == handler_id)
+            and (dog_id is None or row["dog_id"] == dog_id)
+        ]
+    if not entries:
+        return []
+
+    timing = event_timing(event_id)
+    blocks = {
+        block.id: block
+        for block in ScheduleBlock.query.options(joinedload(ScheduleBlock.progress)).filter(
+            ScheduleBlock.id.in_({entry.block_id for entry in entries})
+        )
+    }
+    registrations = {
+        registration.id: registration
+        for registration in Registration.query.options(joinedload(Registration.dog)).filter(
+            Registration.id.in_({entry.registration_id for entry in entries})
+        )
+    }
+    results = []
+    for entry in entries:
+        block = blocks[entry.block_id]
+        registration = registrations[entry.registration_id]
+        estimated_at, status = _estimate_entry(block, entry.position, timing)
+        results.append(
+            {
+                "registration_id": entry.registration_id,
+                "dog_name": registration.dog.name if registration.dog else None,
+                "start_no": entry.start_no,
+                "block_id": block.id,
+                "ring": block.ring,
+                "discipline": block.discipline,
+                "category_code": block.category_code,
+                "class_level": block.class_level,
+                "position": entry.position + 1,
+                "estimated_start_at": _format_schedule_datetime(estimated_at),
+                "status": status,
+            }
+        )
+    results.sort(key=lambda item: (item["estimated_start_at"] or "", item["ring"]))
+    return results
+
+
+def _estimate_entry(block, position, timing):
+    per_run = run_duration(timing, block.class_level)
+    progress = block.progress
+    if progress and progress.finished_at:
+        return None, "finished"
+    if progress and progress.reported_at and progress.completed_runs:
+        if position < progress.completed_runs:
+            return None, "finished"
+        return progress.reported_at + (position - progress.completed_runs) * per_run, "running"
+    block_start = progress.projected_start_at if progress and progress.projected_start_at else block.start_at
+    if block_start is None:
+        return None, "unscheduled"
+    return block_start + timing["course_walk"] + position * per_run, "planned"
@@ -1,16 +1,23 @@
+import csv
+import hashlib
+import io
 import re
+import time
 from collections import defaultdict
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from sqlalchemy import desc
+from flask import current_app
+from sqlalchemy import and_, func, insert, select, update
 
 from app.models import (
     Dog,
+    Event,
     LicenseKind,
     Registration,
     RegistrationStatus,
     TkaEventCheckStatus,
     TkaExportBatch,
+    TkaExportBatchEvent,
     TkaExportRow,
     TkaExportType,
     TkaFinding,
@@ -20,6 +27,19 @@ from app.models import (
     TkaMasterStatus,
 )
 from app.extensions import db
+from app.services.blob_service import load_blob, store_blob
+from app.services.change_feed_service import record_bulk_changes
+
+BULK_CHUNK_SIZE = 500
+CSV_FETCH_SIZE = 1000
+CSV_HEADER = ("Lizenznummer", "Kategorie", "Klasse")
+
+EVENT_CHECK_STATUSES = (
+    TkaEventCheckStatus.PENDING,
+    TkaEventCheckStatus.ISSUE,
+    TkaEventCheckStatus.CLASS_CHANGED,
+    TkaEventCheckStatus.IN_EXPORT,
+)
 
 CATEGORY_CODE_MAP = {
     "S": "Small",
@@ -29,97 +49,291 @@ CATEGORY_CODE_MAP = {
 }
 
 
+def tka_fingerprint(license_no, category_code, class_level) -> str:
+    """Fingerprint of the data the TKA checks for a dog."""
+    return hashlib.sha256(f"{license_no};{category_code};{class_level}".encode("utf-8")).hexdigest()
+
+
 def build_master_check_batch(created_by_user_id=None) -> TkaExportBatch:
+    """Export CH dogs whose checked data changed since their last OK.
+
+    PENDING dogs are always exported. OK dogs are re-exported when their
+    fingerprint no longer matches the confirmed one. ISSUE dogs with unchanged
+    data wait TKA_ISSUE_RETRY_HOURS before they are sent again.
+    """
+    now = datetime.utcnow()
+    retry_after = now - timedelta(hours=current_app.config["TKA_ISSUE_RETRY_HOURS"])
     batch = TkaExportBatch(export_type=TkaExportType.MASTER_CHECK, created_by_user_id=created_by_user_id)
-    dogs = Dog.query.filter(
-        Dog.license_kind == LicenseKind.CH,
-        Dog.tka_master_status.in_([TkaMasterStatus.PENDING, TkaMasterStatus.ISSUE]),
-    ).all()
-
-    for dog in dogs:
-        registration = (
-            Registration.query.filter_by(dog_id=dog.id)
-            .order_by(desc(Registration.created_at))
-            .first()
-        )
-        category_code = dog.tka_category_confirmed
-        class_level = None
-        if registration:
-            category_code = category_code or registration.category_code
-            class_level = registration.class_level
+    db.session.add(batch)
+    db.session.flush()
 
-        if not category_code:
-            dog.tka_master_status = TkaMasterStatus.ISSUE
-            dog.tka_issue_message = "Kategorie fehlt"
-            continue
-        if class_level is None:
-            dog.tka_master_status = TkaMasterStatus.ISSUE
-            dog.tka_issue_message = "Klasse fehlt"
-            continue
+    latest = _latest_registration_subquery()
+    dogs = (
+        db.session.query(
+            Dog.id,
+            Dog.license_no,
+            Dog.tka_master_status,
+            Dog.tka_category_confirmed,
+            Dog.tka_checked_fingerprint,
+            Dog.tka_exported_fingerprint,
+            Dog.tka_exported_at,
+            latest.c.category_code,
+            latest.c.class_level,
+        )
+        .outerjoin(latest, and_(latest.c.dog_id == Dog.id, latest.c.row_no == 1))
+        .filter(
+            Dog.license_kind == LicenseKind.CH,
+            Dog.tka_master_status.in_(
+                [TkaMasterStatus.PENDING, TkaMasterStatus.ISSUE, TkaMasterStatus.OK]
+            ),
+        )
+        .order_by(Dog.id)
+        .all()
+    )
 
-        row = TkaExportRow(
-            dog_id=dog.id,
-            license_no=dog.license_no,
-            category_code=category_code,
-            class_level=class_level,
+    export_rows = []
+    exported_dogs = []
+    baselines = []
+    issues = defaultdict(list)
+    for (
+        dog_id,
+        license_no,
+        status,
+        category_confirmed,
+        checked_fingerprint,
+        exported_fingerprint,
+        exported_at,
+        latest_category,
+        latest_class,
+    ) in dogs:
+        category_code = category_confirmed or latest_category
+        if status == TkaMasterStatus.OK:
+            if not category_code or latest_class is None:
+                continue
+            fingerprint = tka_fingerprint(license_no, category_code, latest_class)
+            if checked_fingerprint is None:
+                baselines.append({"id": dog_id, "tka_checked_fingerprint": fingerprint})
+                continue
+            if fingerprint == checked_fingerprint:
+                continue
+        else:
+            if not category_code:
+                issues["Kategorie fehlt"].append(dog_id)
+                continue
+            if latest_class is None:
+                issues["Klasse fehlt"].append(dog_id)
+                continue
+            fingerprint = tka_fingerprint(license_no, category_code, latest_class)
+            if (
+                status == TkaMasterStatus.ISSUE
+                and fingerprint == exported_fingerprint
+                and exported_at is not None
+                and exported_at > retry_after
+            ):
+                continue
+        export_rows.append(
+            {
+                "batch_id": batch.id,
+                "dog_id": dog_id,
+                "license_no": license_no,
+                "category_code": category_code,
+                "class_level": latest_class,
+            }
+        )
+        exported_dogs.append(
+            {
+                "id": dog_id,
+                "tka_master_status": TkaMasterStatus.IN_EXPORT,
+                "tka_issue_message": None,
+                "tka_exported_fingerprint": fingerprint,
+                "tka_exported_at": now,
+            }
         )
-        batch.rows.append(row)
-        dog.tka_master_status = TkaMasterStatus.IN_EXPORT
-        dog.tka_issue_message = None
 
-    db.session.add(batch)
-    db.session.flush()
+    if export_rows:
+        db.session.execute(insert(TkaExportRow), export_rows)
+        db.session.execute(update(Dog), exported_dogs)
+    if baselines:
+        db.session.execute(update(Dog), baselines)
+    for message, dog_ids in issues.items():
+        _bulk_update_by_ids(
+            Dog, dog_ids, {"tka_master_status": TkaMasterStatus.ISSUE, "tka_issue_message": message}
+        )
     return batch
 
 
+def _latest_registration_subquery():
+    row_no = (
+        func.row_number()
+        .over(
+            partition_by=Registration.dog_id,
+            order_by=(Registration.created_at.desc(), Registration.id.desc()),
+        )
+        .label("row_no")
+    )
+    return db.session.query(
+        Registration.dog_id,
+        Registration.category_code,
+        Registration.class_level,
+        row_no,
+    ).subquery()
+
+
+def _bulk_update_by_ids(model, ids, values, chunk_size=BULK_CHUNK_SIZE):
+    ids = list(ids)
+    for start in range(0, len(ids), chunk_size):
+        db.session.execute(
+            update(model)
+            .where(model.id.in_(ids[start : start + chunk_size]))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+
 def build_event_check_batch(event_id: int, created_by_user_id=None) -> TkaExportBatch:
     batch = TkaExportBatch(
         export_type=TkaExportType.EVENT_CHECK,
         event_id=event_id,
         created_by_user_id=created_by_user_id,
     )
+    db.session.add(batch)
+    db.session.flush()
+
     registrations = (
-        Registration.query.join(Dog, Registration.dog_id == Dog.id)
+        db.session.query(
+            Registration.id,
+            Registration.dog_id,
+            Dog.license_no,
+            Registration.category_code,
+            Registration.class_level,
+        )
+        .join(Dog, Registration.dog_id == Dog.id)
         .filter(
             Registration.event_id == event_id,
             Dog.license_kind == LicenseKind.CH,
             Registration.status == RegistrationStatus.SUBMITTED,
-            Registration.tka_event_check_status.in_(
-                [
-                    TkaEventCheckStatus.PENDING,
-                    TkaEventCheckStatus.ISSUE,
-                    TkaEventCheckStatus.CLASS_CHANGED,
-                    TkaEventCheckStatus.IN_EXPORT,
-                ]
-            ),
+            Registration.tka_event_check_status.in_(EVENT_CHECK_STATUSES),
         )
+        .order_by(Registration.id)
         .all()
     )
-
-    for registration in registrations:
-        row = TkaExportRow(
-            registration_id=registration.id,
-            dog_id=registration.dog_id,
-            license_no=registration.dog.license_no,
-            category_code=registration.category_code,
-            class_level=registration.class_level,
+    if registrations:
+        db.session.execute(
+            insert(TkaExportRow),
+            [
+                {
+                    "batch_id": batch.id,
+                    "registration_id": registration_id,
+                    "dog_id": dog_id,
+                    "license_no": license_no,
+                    "category_code": category_code,
+                    "class_level": class_level,
+                }
+                for registration_id, dog_id, license_no, category_code, class_level in registrations
+            ],
         )
-        batch.rows.append(row)
-        registration.tka_event_check_status = TkaEventCheckStatus.IN_EXPORT
-        registration.tka_issue_message = None
-        registration.tka_issue_type = None
 
+    registration_ids = [registration[0] for registration in registrations]
+    _bulk_update_by_ids(
+        Registration,
+        registration_ids,
+        {
+            "tka_event_check_status": TkaEventCheckStatus.IN_EXPORT,
+            "tka_issue_message": None,
+            "tka_issue_type": None,
+        },
+    )
+    record_bulk_changes(db.session, Registration, registration_ids)
+    return batch
+
+
+def build_multi_event_check_batch(event_ids, created_by_user_id=None) -> TkaExportBatch:
+    """Build one event-check batch for several events with one row per license, category and class."""
+    event_ids = sorted(set(event_ids))
+    found_ids = {event_id for (event_id,) in db.session.query(Event.id).filter(Event.id.in_(event_ids))}
+    missing = [event_id for event_id in event_ids if event_id not in found_ids]
+    if missing:
+        raise ValueError(f"Event not found: {', '.join(str(event_id) for event_id in missing)}")
+
+    batch = TkaExportBatch(
+        export_type=TkaExportType.MULTI_EVENT_CHECK,
+        created_by_user_id=created_by_user_id,
+        event_links=[TkaExportBatchEvent(event_id=event_id) for event_id in event_ids],
+    )
     db.session.add(batch)
     db.session.flush()
+
+    registrations = (
+        db.session.query(
+            Registration.id,
+            Registration.dog_id,
+            Dog.license_no,
+            Registration.category_code,
+            Registration.class_level,
+        )
+        .join(Dog, Registration.dog_id == Dog.id)
+        .filter(
+            Registration.event_id.in_(event_ids),
+            Dog.license_kind == LicenseKind.CH,
+            Registration.status == RegistrationStatus.SUBMITTED,
+            Registration.tka_event_check_status.in_(EVENT_CHECK_STATUSES),
+        )
+        .order_by(Registration.id)
+        .all()
+    )
+
+    export_rows = {}
+    for registration_id, dog_id, license_no, category_code, class_level in registrations:
+        export_rows.setdefault(
+            (license_no, category_code, class_level),
+            {
+                "batch_id": batch.id,
+                "registration_id": registration_id,
+                "dog_id": dog_id,
+                "license_no": license_no,
+                "category_code": category_code,
+                "class_level": class_level,
+            },
+        )
+    if export_rows:
+        db.session.execute(insert(TkaExportRow), list(export_rows.values()))
+
+    registration_ids = [registration[0] for registration in registrations]
+    _bulk_update_by_ids(
+        Registration,
+        registration_ids,
+        {
+            "tka_event_check_status": TkaEventCheckStatus.IN_EXPORT,
+            "tka_issue_message": None,
+            "tka_issue_type": None,
+        },
+    )
+    record_bulk_changes(db.session, Registration, registration_ids)
     return batch
 
 
 def render_batch_to_csv(batch_id: int) -> str:
-    batch = TkaExportBatch.query.get(batch_id)
-    lines = ["Lizenznummer;Kategorie;Klasse"]
-    for row in batch.rows:
-        lines.append(f"{row.license_no};{row.category_code};{row.class_level}")
-    return "\n".join(lines) + "\n"
+    return "".join(iter_batch_csv(batch_id))
+
+
+def iter_batch_csv(batch_id: int, fetch_size: int = CSV_FETCH_SIZE):
+    """Yield the TKAMO CSV for a batch in chunks of ``fetch_size`` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";", lineterminator="\n")
+    writer.writerow(CSV_HEADER)
+    yield buffer.getvalue()
+
+    statement = (
+        select(TkaExportRow.license_no, TkaExportRow.category_code, TkaExportRow.class_level)
+        .where(TkaExportRow.batch_id == batch_id)
+        .order_by(TkaExportRow.id)
+        .execution_options(yield_per=fetch_size)
+    )
+    for rows in db.session.execute(statement).partitions():
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
 
 
 def _decode_code(code: str):
@@ -133,125 +347,323 @@ def _decode_code(code: str):
     return category, class_level
 
 
+MISMATCH_START = "Falsche Klasse oder Kategorie"
+MISMATCH_MAX_LINES = 6
+
+_MISMATCH_START_RE = re.compile(re.escape(MISMATCH_START), re.IGNORECASE)
+_MISMATCH_RE = re.compile(
+    r"Falsche Klasse oder Kategorie.*?Lizenz\s*(\d+).*?Import:\s*([A-Z]\d).*?System:\s*([A-Z]\d)",
+    re.IGNORECASE | re.DOTALL,
+)
+_UNKNOWN_RE = re.compile(r"unbekannt|nicht bekannt|nicht vorhanden", re.IGNORECASE)
+_INVALID_RE = re.compile(r"ung\u00fcltig|Oldies|Oldie", re.IGNORECASE)
+_LICENSE_RE = re.compile(r"\b(\d+)\b")
+
+
 def parse_tka_text(raw_text: str):
-    findings = []
     if not raw_text:
-        return findings
+        return []
+    findings = list(iter_tka_findings(io.StringIO(raw_text, newline="")))
+    # Mismatch findings come first so they take precedence when applied.
+    findings.sort(key=lambda finding: finding["finding_kind"] != TkaFindingKind.CLASS_OR_CATEGORY_MISMATCH)
+    return findings
 
-    mismatch_pattern = re.compile(
-        r"Falsche Klasse oder Kategorie.*?Lizenz\s*(\d+).*?Import:\s*([A-Z]\d).*?System:\s*([A-Z]\d)",
-        re.IGNORECASE | re.DOTALL,
-    )
 
-    remaining_text = raw_text
-    for match in mismatch_pattern.finditer(raw_text):
-        license_no, import_code, system_code = match.groups()
-        import_category, import_class = _decode_code(import_code)
-        system_category, system_class = _decode_code(system_code)
-        findings.append(
-            {
-                "finding_kind": TkaFindingKind.CLASS_OR_CATEGORY_MISMATCH,
-                "license_no": license_no,
-                "import_category_code": import_category,
-                "import_class_level": import_class,
-                "system_category_code": system_category,
-                "system_class_level": system_class,
-                "raw_message": match.group(0).strip(),
-            }
-        )
-        remaining_text = remaining_text.replace(match.group(0), "")
+def iter_tka_findings(lines):
+    """Yield findings from an iterable of TKAMO response lines in a single pass.
+
+    Mismatch messages may span several lines; they are buffered until the
+    system code is seen, or released as plain lines after MISMATCH_MAX_LINES.
+    Each finding carries ``raw_offset``/``raw_length``, the character span of
+    its message in the concatenated input lines.
+    """
+    block = []
+    position = 0
+    for raw_line in lines:
+        pending = []
+        line, offset = _strip_span(raw_line, position)
+        position += len(raw_line)
+        if line:
+            pending.append((line, offset))
+        while pending:
+            line, offset = pending.pop()
+            if not block:
+                start = _MISMATCH_START_RE.search(line)
+                if start is None:
+                    yield from _iter_line_findings(line, offset)
+                    continue
+                prefix = line[: start.start()].rstrip()
+                if prefix:
+                    yield from _iter_line_findings(prefix, offset)
+                line, offset = line[start.start() :], offset + start.start()
+            block.append((line, offset))
+            text = "\n".join(part for part, _ in block)
+            match = _MISMATCH_RE.match(text)
+            if match:
+                line_start = len(text) - len(line)
+                end = offset + match.end() - line_start
+                yield _mismatch_finding(match, block[0][1], end)
+                block = []
+                rest, rest_offset = _strip_span(line[match.end() - line_start :], end)
+                if rest:
+                    pending.append((rest, rest_offset))
+            elif len(block) > 1 and (len(block) >= MISMATCH_MAX_LINES or _MISMATCH_START_RE.search(line)):
+                released, block = block[:-1], []
+                for part, part_offset in released:
+                    yield from _iter_line_findings(part, part_offset)
+                pending.append((line, offset))
+    for part, part_offset in block:
+        yield from _iter_line_findings(part, part_offset)
+
+
+def _strip_span(text: str, offset: int):
+    stripped = text.lstrip()
+    return stripped.rstrip(), offset + len(text) - len(stripped)
+
+
+def _mismatch_finding(match, start, end):
+    license_no, import_code, system_code = match.groups()
+    import_category, import_class = _decode_code(import_code)
+    system_category, system_class = _decode_code(system_code)
+    return {
+        "finding_kind": TkaFindingKind.CLASS_OR_CATEGORY_MISMATCH,
+        "license_no": license_no,
+        "import_category_code": import_category,
+        "import_class_level": import_class,
+        "system_category_code": system_category,
+        "system_class_level": system_class,
+        "raw_message": match.group(0).strip(),
+        "raw_offset": start,
+        "raw_length": end - start,
+    }
 
-    lines = [line.strip() for line in re.split(r"\r?\n", remaining_text) if line.strip()]
-    for line in lines:
-        if "Lizenz" in line and re.search(r"unbekannt|nicht bekannt|nicht vorhanden", line, re.IGNORECASE):
-            license_no = _extract_license(line)
-            findings.append(
-                {
-                    "finding_kind": TkaFindingKind.LICENSE_UNKNOWN,
-                    "license_no": license_no,
-                    "raw_message": line,
-                }
-            )
-            continue
-        if re.search(r"ung\u00fcltig|Oldies|Oldie", line, re.IGNORECASE):
-            license_no = _extract_license(line)
-            if license_no:
-                findings.append(
-                    {
-                        "finding_kind": TkaFindingKind.LICENSE_INVALID,
-                        "license_no": license_no,
-                        "raw_message": line,
-                    }
-                )
-            else:
-                findings.append(
-                    {
-                        "finding_kind": TkaFindingKind.UNKNOWN_FORMAT,
-                        "license_no": None,
-                        "raw_message": line,
-                    }
-                )
-            continue
-        if "Lizenz" in line:
-            findings.append(
-                {
-                    "finding_kind": TkaFindingKind.UNKNOWN_FORMAT,
-                    "license_no": _extract_license(line),
-                    "raw_message": line,
-                }
-            )
 
-    return findings
+def _iter_line_findings(line: str, offset: int):
+    span = {"raw_message": line, "raw_offset": offset, "raw_length": len(line)}
+    if "Lizenz" in line and _UNKNOWN_RE.search(line):
+        yield {
+            "finding_kind": TkaFindingKind.LICENSE_UNKNOWN,
+            "license_no": _extract_license(line),
+            **span,
+        }
+        return
+    if _INVALID_RE.search(line):
+        license_no = _extract_license(line)
+        if license_no:
+            yield {
+                "finding_kind": TkaFindingKind.LICENSE_INVALID,
+                "license_no": license_no,
+                **span,
+            }
+        else:
+            yield {
+                "finding_kind": TkaFindingKind.UNKNOWN_FORMAT,
+                "license_no": None,
+                **span,
+            }
+        return
+    if "Lizenz" in line:
+        yield {
+            "finding_kind": TkaFindingKind.UNKNOWN_FORMAT,
+            "license_no": _extract_license(line),
+            **span,
+        }
 
 
 def _extract_license(text: str):
-    match = re.search(r"\b(\d+)\b", text)
+    match = _LICENSE_RE.search(text)
     if match:
         return match.group(1)
     return None
 
 
-def apply_tka_import(batch_id: int, raw_text: str, imported_by_user_id=None) -> TkaImport:
+def apply_tka_import(batch_id: int, raw_text: str, imported_by_user_id=None, metrics=None) -> TkaImport:
+    """Store a TKAMO response and apply its findings to the batch's dogs or registrations.
+
+    Pass a dict as ``metrics`` to receive per-phase timings (parse, match, apply)
+    in milliseconds together with finding and row counts.
+    """
+    started = time.perf_counter()
     batch = TkaExportBatch.query.get(batch_id)
     tka_import = TkaImport(
         batch_id=batch_id,
         imported_by_user_id=imported_by_user_id,
-        raw_text=raw_text,
+        raw_blob_sha256=store_blob(raw_text.encode("utf-8")) if raw_text else None,
     )
     db.session.add(tka_import)
+    db.session.flush()
 
     parsed = parse_tka_text(raw_text)
     findings_by_license = defaultdict(list)
-
+    finding_rows = []
     for finding in parsed:
-        finding_row = TkaFinding(
-            tka_import=tka_import,
-            license_no=finding.get("license_no"),
-            finding_kind=finding["finding_kind"],
-            issue_type=_finding_to_issue_type(finding["finding_kind"]),
-            import_category_code=finding.get("import_category_code"),
-            import_class_level=finding.get("import_class_level"),
-            system_category_code=finding.get("system_category_code"),
-            system_class_level=finding.get("system_class_level"),
-            raw_message=finding.get("raw_message"),
-            message=finding.get("raw_message"),
+        finding_rows.append(
+            {
+                "tka_import_id": tka_import.id,
+                "license_no": finding.get("license_no"),
+                "finding_kind": finding["finding_kind"],
+                "issue_type": _finding_to_issue_type(finding["finding_kind"]),
+                "import_category_code": finding.get("import_category_code"),
+                "import_class_level": finding.get("import_class_level"),
+                "system_category_code": finding.get("system_category_code"),
+                "system_class_level": finding.get("system_class_level"),
+                "raw_offset": finding["raw_offset"],
+                "raw_length": finding["raw_length"],
+            }
         )
-        db.session.add(finding_row)
         if finding.get("license_no"):
             findings_by_license[finding["license_no"]].append(finding)
+    if finding_rows:
+        db.session.execute(insert(TkaFinding), finding_rows)
+    parsed_at = time.perf_counter()
 
-    for row in batch.rows:
-        if row.license_no is None:
-            continue
-        if batch.export_type == TkaExportType.MASTER_CHECK:
-            _apply_master_row(row, findings_by_license.get(row.license_no, []))
-        if batch.export_type == TkaExportType.EVENT_CHECK:
-            _apply_event_row(row, findings_by_license.get(row.license_no, []))
+    model, targets = _import_targets(batch)
 
+    now = datetime.utcnow()
+    updates = defaultdict(list)
+    for target_id, license_no, license_kind in targets:
+        if license_no is None or license_kind == LicenseKind.FOREIGN:
+            continue
+        findings = findings_by_license.get(license_no, [])
+        if model is Dog:
+            values = _master_row_values(findings, now)
+        else:
+            values = _event_row_values(findings)
+        updates[tuple(sorted(values.items()))].append(target_id)
+    matched_at = time.perf_counter()
+
+    for values, target_ids in updates.items():
+        _bulk_update_by_ids(model, target_ids, dict(values))
+    if model is Dog and any(dict(values)["tka_master_status"] == TkaMasterStatus.OK for values in updates):
+        _confirm_checked_fingerprints(batch)
+    if model is Registration:
+        record_bulk_changes(
+            db.session, Registration, [target_id for ids in updates.values() for target_id in ids]
+        )
     db.session.commit()
+    applied_at = time.perf_counter()
+
+    if metrics is not None:
+        metrics.update(
+            {
+                "parse_ms": round((parsed_at - started) * 1000, 2),
+                "match_ms": round((matched_at - parsed_at) * 1000, 2),
+                "apply_ms": round((applied_at - matched_at) * 1000, 2),
+                "findings": len(parsed),
+                "rows": len(targets),
+                "updates": len(updates),
+            }
+        )
     return tka_import
 
 
+def _confirm_checked_fingerprints(batch):
+    """Store the fingerprint of the data TKA confirmed for the batch's OK dogs.
+
+    Uses the category after the import, so a corrected mismatch is not
+    exported again by the next master check.
+    """
+    rows = (
+        db.session.query(
+            Dog.id, Dog.license_no, Dog.tka_category_confirmed, TkaExportRow.category_code, TkaExportRow.class_level
+        )
+        .join(Dog, TkaExportRow.dog_id == Dog.id)
+        .filter(TkaExportRow.batch_id == batch.id, Dog.tka_master_status == TkaMasterStatus.OK)
+    )
+    fingerprints = [
+        {
+            "id": dog_id,
+            "tka_checked_fingerprint": tka_fingerprint(
+                license_no, category_confirmed or category_code, class_level
+            ),
+        }
+        for dog_id, license_no, category_confirmed, category_code, class_level in rows
+    ]
+    if fingerprints:
+        db.session.execute(update(Dog), fingerprints)
+
+
+def _import_targets(batch):
+    """Return the model a batch's findings apply to and its (id, license, license kind) targets."""
+    if batch.export_type == TkaExportType.MASTER_CHECK:
+        query = (
+            db.session.query(Dog.id, TkaExportRow.license_no, Dog.license_kind)
+            .join(Dog, TkaExportRow.dog_id == Dog.id)
+            .filter(TkaExportRow.batch_id == batch.id)
+        )
+        return Dog, query.all()
+    if batch.export_type == TkaExportType.MULTI_EVENT_CHECK:
+        # Rows are deduplicated, so fan out to every registration with the same
+        # license, category and class in the batch's events.
+        query = (
+            db.session.query(Registration.id, TkaExportRow.license_no, Dog.license_kind)
+            .select_from(TkaExportRow)
+            .join(Dog, Dog.license_no == TkaExportRow.license_no)
+            .join(
+                Registration,
+                and_(
+                    Registration.dog_id == Dog.id,
+                    Registration.category_code == TkaExportRow.category_code,
+                    Registration.class_level == TkaExportRow.class_level,
+                ),
+            )
+            .join(
+                TkaExportBatchEvent,
+                and_(
+                    TkaExportBatchEvent.batch_id == TkaExportRow.batch_id,
+                    TkaExportBatchEvent.event_id == Registration.event_id,
+                ),
+            )
+            .filter(
+                TkaExportRow.batch_id == batch.id,
+                Registration.status == RegistrationStatus.SUBMITTED,
+            )
+        )
+        return Registration, query.all()
+    query = (
+        db.session.query(Registration.id, TkaExportRow.license_no, Dog.license_kind)
+        .join(Registration, TkaExportRow.registration_id == Registration.id)
+        .join(Dog, Registration.dog_id == Dog.id)
+        .filter(TkaExportRow.batch_id == batch.id)
+    )
+    return Registration, query.all()
+
+
+def load_tka_import_text(tka_import: TkaImport) -> str:
+    if tka_import.raw_blob_sha256:
+        return load_blob(tka_import.raw_blob_sha256).decode("utf-8")
+    return tka_import.raw_text or ""
+
+
+def tka_finding_message(finding: TkaFinding, raw_text: str):
+    if finding.raw_offset is not None:
+        return raw_text[finding.raw_offset : finding.raw_offset + finding.raw_length]
+    return finding.raw_message
+
+
+def describe_tka_import(import_id: int):
+    tka_import = TkaImport.query.get(import_id)
+    if not tka_import:
+        raise ValueError("Import not found")
+    raw_text = load_tka_import_text(tka_import)
+    findings = TkaFinding.query.filter_by(tka_import_id=tka_import.id).order_by(TkaFinding.id)
+    return {
+        "import_id": tka_import.id,
+        "batch_id": tka_import.batch_id,
+        "imported_at": tka_import.imported_at.isoformat(),
+        "raw_blob_sha256": tka_import.raw_blob_sha256,
+        "findings": [
+            {
+                "license_no": finding.license_no,
+                "finding_kind": finding.finding_kind.value,
+                "issue_type": finding.issue_type.value,
+                "message": tka_finding_message(finding, raw_text),
+            }
+            for finding in findings
+        ],
+    }
+
+
 def _finding_to_issue_type(finding_kind: TkaFindingKind) -> TkaIssueType:
     mapping = {
         TkaFindingKind.CLASS_OR_CATEGORY_MISMATCH: TkaIssueType.DATA_MISMATCH,
@@ -262,64 +674,55 @@ def _finding_to_issue_type(finding_kind: TkaFindingKind) -> TkaIssueType:
     return mapping[finding_kind]
 
 
-def _apply_master_row(row: TkaExportRow, findings):
-    dog = Dog.query.get(row.dog_id)
-    if not dog or dog.license_kind == LicenseKind.FOREIGN:
-        return
-    now = datetime.utcnow()
+def _master_row_values(findings, now):
     if not findings:
-        dog.tka_master_status = TkaMasterStatus.OK
-        dog.tka_master_checked_at = now
-        dog.tka_issue_message = None
-        return
+        return {
+            "tka_master_status": TkaMasterStatus.OK,
+            "tka_master_checked_at": now,
+            "tka_issue_message": None,
+        }
     finding = findings[0]
     if finding["finding_kind"] == TkaFindingKind.CLASS_OR_CATEGORY_MISMATCH:
+        values = {
+            "tka_master_status": TkaMasterStatus.OK,
+            "tka_master_checked_at": now,
+            "tka_issue_message": None,
+        }
         system_category = finding.get("system_category_code")
-        dog.tka_master_status = TkaMasterStatus.OK
-        dog.tka_master_checked_at = now
         if system_category:
-            dog.tka_category_confirmed = system_category
-        dog.tka_issue_message = None
-        return
+            values["tka_category_confirmed"] = system_category
+        return values
     if finding["finding_kind"] == TkaFindingKind.LICENSE_UNKNOWN:
-        dog.tka_master_status = TkaMasterStatus.ISSUE
-        dog.tka_issue_message = "Lizenz unbekannt"
+        message = "Lizenz unbekannt"
     elif finding["finding_kind"] == TkaFindingKind.LICENSE_INVALID:
-        dog.tka_master_status = TkaMasterStatus.ISSUE
-        dog.tka_issue_message = "Lizenz ung\u00fcltig/Oldies"
+        message = "Lizenz ung\u00fcltig/Oldies"
     else:
-        dog.tka_master_status = TkaMasterStatus.ISSUE
-        dog.tka_issue_message = "TKAMO Antwort unklar"
-    dog.tka_master_checked_at = now
+        message = "TKAMO Antwort unklar"
+    return {
+        "tka_master_status": TkaMasterStatus.ISSUE,
+        "tka_master_checked_at": now,
+        "tka_issue_message": message,
+    }
 
 
-def _apply_event_row(row: TkaExportRow, findings):
-    registration = Registration.query.get(row.registration_id)
-    if not registration or registration.dog.license_kind == LicenseKind.FOREIGN:
-        return
+def _event_row_values(findings):
     if not findings:
-        registration.tka_event_check_status = TkaEventCheckStatus.OK
-        registration.tka_issue_type = None
-        registration.tka_issue_message = None
-        return
+        return {
+            "tka_event_check_status": TkaEventCheckStatus.OK,
+            "tka_issue_type": None,
+            "tka_issue_message": None,
+        }
     finding = findings[0]
     if finding["finding_kind"] == TkaFindingKind.CLASS_OR_CATEGORY_MISMATCH:
-        registration.verified_class_level = finding.get("system_class_level")
-        registration.verified_category_code = finding.get("system_category_code")
-        registration.tka_event_check_status = TkaEventCheckStatus.CLASS_CHANGED
-        registration.tka_issue_type = TkaIssueType.DATA_MISMATCH
-        registration.tka_issue_message = finding.get("raw_message")
-        return
-    if finding["finding_kind"] == TkaFindingKind.LICENSE_UNKNOWN:
-        registration.tka_event_check_status = TkaEventCheckStatus.ISSUE
-        registration.tka_issue_type = TkaIssueType.LICENSE_UNKNOWN
-        registration.tka_issue_message = finding.get("raw_message")
-        return
-    if finding["finding_kind"] == TkaFindingKind.LICENSE_INVALID:
-        registration.tka_event_check_status = TkaEventCheckStatus.ISSUE
-        registration.tka_issue_type = TkaIssueType.LICENSE_INVALID
-        registration.tka_issue_message = finding.get("raw_message")
-        return
-    registration.tka_event_check_status = TkaEventCheckStatus.ISSUE
-    registration.tka_issue_type = TkaIssueType.PARSER_UNKNOWN_FORMAT
-    registration.tka_issue_message = finding.get("raw_message")
+        return {
+            "verified_class_level": finding.get("system_class_level"),
+            "verified_category_code": finding.get("system_category_code"),
+            "tka_event_check_status": TkaEventCheckStatus.CLASS_CHANGED,
+            "tka_issue_type": TkaIssueType.DATA_MISMATCH,
+            "tka_issue_message": finding.get("raw_message"),
+        }
+    return {
+        "tka_event_check_status": TkaEventCheckStatus.ISSUE,
+        "tka_issue_type": _finding_to_issue_type(finding["finding_kind"]),
+        "tka_issue_message": finding.get("raw_message"),
+    }
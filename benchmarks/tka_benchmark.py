@@ -0,0 +1,167 @@
+"""Throughput and peak-memory benchmark for the TKAMO parser and import.
+
+Run from the repository root:
+
+    python -m benchmarks.tka_benchmark --sizes 10000,50000
+
+Every run appends one JSON line per size to benchmarks/history/tka.jsonl so
+results can be compared over time.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+DEFAULT_SIZES = (10000, 50000)
+DEFAULT_HISTORY = os.path.join(os.path.dirname(__file__), "history", "tka.jsonl")
+
+
+def _time(func):
+    started = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - started
+
+
+def _peak_memory(func):
+    """Peak traced allocation of ``func``; measured apart from timing since tracing slows it down."""
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def _git_revision():
+    try:
+        return (
+            subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL)
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _seed_master_batch(size):
+    from app.extensions import db
+    from app.models import Dog, LicenseKind, TkaMasterStatus
+    from app.services.tka_service import build_master_check_batch
+
+    db.session.execute(
+        Dog.__table__.insert(),
+        [
+            {
+                "name": f"Dog{index}",
+                "license_no": str(100000 + index),
+                "license_kind": LicenseKind.CH,
+                "tka_master_status": TkaMasterStatus.PENDING,
+            }
+            for index in range(size)
+        ],
+    )
+    batch = build_master_check_batch()
+    db.session.commit()
+    return batch.id
+
+
+def run_size(app, size, seed):
+    from app.extensions import db
+    from benchmarks.tka_corpus import generate_tka_corpus
+    from app.services.tka_service import apply_tka_import, parse_tka_text
+
+    license_nos = [str(100000 + index) for index in range(size)]
+    raw_text, _ = generate_tka_corpus(license_nos, seed=seed)
+    raw_bytes = len(raw_text.encode("utf-8"))
+    line_count = raw_text.count("\n") + 1
+
+    findings, parse_seconds = _time(lambda: parse_tka_text(raw_text))
+    parse_peak = _peak_memory(lambda: parse_tka_text(raw_text))
+
+    metrics = {}
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        batch_id = _seed_master_batch(size)
+        _, apply_seconds = _time(lambda: apply_tka_import(batch_id=batch_id, raw_text=raw_text, metrics=metrics))
+        db.session.remove()
+
+        # The import changes the batch's dogs, so the memory run gets a fresh database.
+        db.drop_all()
+        db.create_all()
+        batch_id = _seed_master_batch(size)
+        apply_peak = _peak_memory(lambda: apply_tka_import(batch_id=batch_id, raw_text=raw_text))
+        db.session.remove()
+
+    return {
+        "size": size,
+        "seed": seed,
+        "bytes": raw_bytes,
+        "lines": line_count,
+        "findings": len(findings),
+        "parse_seconds": round(parse_seconds, 4),
+        "parse_lines_per_second": round(line_count / parse_seconds) if parse_seconds else None,
+        "parse_mb_per_second": round(raw_bytes / 1e6 / parse_seconds, 2) if parse_seconds else None,
+        "parse_peak_kb": round(parse_peak / 1024),
+        "apply_seconds": round(apply_seconds, 4),
+        "apply_rows_per_second": round(size / apply_seconds) if apply_seconds else None,
+        "apply_peak_kb": round(apply_peak / 1024),
+        "apply_metrics": metrics,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="comma separated license counts",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON lines file to append to")
+    parser.add_argument("--no-history", action="store_true", help="only print the results")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp_dir, 'benchmark.db')}"
+        os.environ["BLOB_STORAGE_DIR"] = os.path.join(tmp_dir, "blobs")
+        from app import create_app
+
+        app = create_app()
+        recorded_at = datetime.utcnow().isoformat(timespec="seconds") + "Z"
+        revision = _git_revision()
+        results = []
+        for size in (int(value) for value in args.sizes.split(",") if value.strip()):
+            result = run_size(app, size, args.seed)
+            result.update(
+                {
+                    "recorded_at": recorded_at,
+                    "revision": revision,
+                    "python": platform.python_version(),
+                }
+            )
+            results.append(result)
+            print(
+                f"{size:>8} licenses  parse {result['parse_seconds']:.3f}s "
+                f"({result['parse_lines_per_second']} lines/s, peak {result['parse_peak_kb']} KB)  "
+                f"apply {result['apply_seconds']:.3f}s "
+                f"({result['apply_rows_per_second']} rows/s, peak {result['apply_peak_kb']} KB)"
+            )
+
+    if not args.no_history:
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        with open(args.history, "a", encoding="utf-8") as handle:
+            for result in results:
+                handle.write(json.dumps(result, sort_keys=True) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
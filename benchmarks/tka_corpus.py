@@ -0,0 +1,79 @@
+import random
+
+from app.models import TkaFindingKind
+
+DEFAULT_CORPUS_MIX = {
+    "ok": 0.85,
+    "mismatch": 0.06,
+    "unknown": 0.04,
+    "invalid": 0.03,
+    "unknown_format": 0.02,
+}
+CORPUS_FINDING_KINDS = {
+    "ok": None,
+    "mismatch": TkaFindingKind.CLASS_OR_CATEGORY_MISMATCH,
+    "unknown": TkaFindingKind.LICENSE_UNKNOWN,
+    "invalid": TkaFindingKind.LICENSE_INVALID,
+    "unknown_format": TkaFindingKind.UNKNOWN_FORMAT,
+}
+CORPUS_CATEGORY_CODES = ("S", "M", "I", "L")
+CORPUS_DOG_NAMES = ("Rex", "Luna", "Pac-Man", "Bella", "Nala", "Sky", "Flash", "Kira")
+
+UNKNOWN_TEMPLATES = (
+    "Lizenz {license_no} unbekannt",
+    "Lizenz {license_no} ist nicht bekannt",
+    "Lizenz {license_no} nicht vorhanden ({dog})",
+)
+INVALID_TEMPLATES = (
+    "Lizenz {license_no} ungültig",
+    "Lizenz {license_no} {dog}: Oldies",
+    "{license_no} {dog} ist ein Oldie",
+)
+UNKNOWN_FORMAT_TEMPLATES = (
+    "Lizenz {license_no}: Fehler bei der Verarbeitung",
+    "Lizenz {license_no} {dog} konnte nicht geprüft werden",
+)
+
+
+def generate_tka_corpus(license_nos, mix=None, seed=None, multiline_ratio=0.5):
+    """Build a synthetic TKAMO response for the given licenses.
+
+    ``mix`` maps "ok", "mismatch", "unknown", "invalid" and "unknown_format" to
+    weights. Returns the response text and the expected finding kind per
+    license (None for licenses without a message).
+    """
+    mix = mix or DEFAULT_CORPUS_MIX
+    unknown_keys = set(mix) - set(CORPUS_FINDING_KINDS)
+    if unknown_keys:
+        raise ValueError(f"Unknown corpus mix keys: {', '.join(sorted(unknown_keys))}")
+    rng = random.Random(seed)
+    keys = list(mix)
+    weights = [mix[key] for key in keys]
+
+    lines = ["TKAMO Prüfung", ""]
+    expected = {}
+    for line_no, license_no in enumerate(license_nos, start=1):
+        key = rng.choices(keys, weights)[0]
+        expected[str(license_no)] = CORPUS_FINDING_KINDS[key]
+        if key == "ok":
+            continue
+        dog = rng.choice(CORPUS_DOG_NAMES)
+        if key == "mismatch":
+            category = rng.choice(CORPUS_CATEGORY_CODES)
+            import_class = rng.randint(1, 3)
+            system_class = rng.choice([level for level in (1, 2, 3) if level != import_class])
+            parts = [
+                f"Falsche Klasse oder Kategorie auf Zeile {line_no}, Lizenz {license_no} {dog}.",
+                f"Klasse im Import: {category}{import_class}.",
+                f"Klasse im System: {category}{system_class}",
+            ]
+            separator = "\n" if rng.random() < multiline_ratio else " "
+            lines.append(separator.join(parts))
+            continue
+        templates = {
+            "unknown": UNKNOWN_TEMPLATES,
+            "invalid": INVALID_TEMPLATES,
+            "unknown_format": UNKNOWN_FORMAT_TEMPLATES,
+        }[key]
+        lines.append(rng.choice(templates).format(license_no=license_no, dog=dog))
+    return "\n".join(lines), expected
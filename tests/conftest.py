@@ -2,6 +2,7 @@ import os
 import sys
 
 import pytest
+from sqlalchemy import event as sa_event
 
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -11,11 +12,13 @@ from app.extensions import db  # noqa: E402
 
 
 @pytest.fixture()
-def app():
+def app(tmp_path):
     app = create_app()
     app.config.update(
         TESTING=True,
         SQLALCHEMY_DATABASE_URI="sqlite:///:memory:",
+        EXCHANGE_EXPORT_DIR=str(tmp_path / "exports"),
+        BLOB_STORAGE_DIR=str(tmp_path / "blobs"),
     )
     with app.app_context():
         db.drop_all()
@@ -23,3 +26,23 @@ def app():
         yield app
         db.session.remove()
         db.drop_all()
+
+
+@pytest.fixture()
+def count_queries(app):
+    """Run ``func`` and return its result with the number of SQL statements executed."""
+
+    def _count_queries(func):
+        statements = []
+
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        sa_event.listen(db.engine, "before_cursor_execute", _before_cursor_execute)
+        try:
+            result = func()
+        finally:
+            sa_event.remove(db.engine, "before_cursor_execute", _before_cursor_execute)
+        return result, len(statements)
+
+    return _count_queries
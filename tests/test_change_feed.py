@@ -0,0 +1,169 @@
+from app.extensions import db
+from app.models import (
+    Dog,
+    Event,
+    LicenseKind,
+    Person,
+    Registration,
+    RegistrationStatus,
+    ScheduleBlock,
+    StartNumber,
+    TkaEventCheckStatus,
+)
+from app.services.schedule_service import add_block, auto_generate_blocks_from_registrations
+from app.services.tka_service import apply_tka_import, build_event_check_batch
+
+
+HEADERS = {"X-Api-Key": "dev-live-key"}
+
+
+def _setup_event():
+    event = Event(name="Change Feed Event", external_id="evt-changes")
+    person = Person(first_name="Max", last_name="Muster")
+    dog = Dog(name="Rex", license_no="12345", license_kind=LicenseKind.CH)
+    registration = Registration(
+        event=event,
+        dog=dog,
+        handler=person,
+        status=RegistrationStatus.SUBMITTED,
+        class_level=1,
+        category_code="Large",
+    )
+    db.session.add_all([event, person, dog, registration])
+    db.session.commit()
+    return event, registration
+
+
+def test_change_feed_lists_initial_entities(app):
+    with app.app_context():
+        _, registration = _setup_event()
+        client = app.test_client()
+
+        response = client.get("/api/events/evt-changes/changes?since=0", headers=HEADERS)
+        assert response.status_code == 200
+        data = response.get_json()
+        entities = {change["entity"] for change in data["changes"]}
+        assert entities == {"registration", "dog", "person"}
+        registration_change = next(c for c in data["changes"] if c["entity"] == "registration")
+        assert registration_change["key"] == registration.external_id
+        assert registration_change["data"]["dog_external_id"] == registration.dog.external_id
+        assert data["version"] == max(change["version"] for change in data["changes"])
+
+
+def test_change_feed_returns_only_newer_deltas(app):
+    with app.app_context():
+        event, registration = _setup_event()
+        client = app.test_client()
+        version = client.get("/api/events/evt-changes/changes", headers=HEADERS).get_json()["version"]
+
+        registration.class_level = 2
+        db.session.add(StartNumber(event_id=event.id, registration_id=registration.id, start_no=7))
+        db.session.commit()
+
+        data = client.get(
+            f"/api/events/evt-changes/changes?since={version}", headers=HEADERS
+        ).get_json()
+        changes = {change["entity"]: change for change in data["changes"]}
+        assert set(changes) == {"registration", "start_number"}
+        assert changes["registration"]["data"]["class_level"] == 2
+        assert changes["start_number"]["data"] == {
+            "registration_external_id": registration.external_id,
+            "start_no": 7,
+        }
+        assert all(change["version"] > version for change in data["changes"])
+
+        data = client.get(
+            f"/api/events/evt-changes/changes?since={data['version']}", headers=HEADERS
+        ).get_json()
+        assert data["changes"] == []
+
+
+def test_change_feed_records_deletes(app):
+    with app.app_context():
+        event, registration = _setup_event()
+        entry = StartNumber(event_id=event.id, registration_id=registration.id, start_no=3)
+        db.session.add(entry)
+        db.session.commit()
+        client = app.test_client()
+        version = client.get("/api/events/evt-changes/changes", headers=HEADERS).get_json()["version"]
+
+        db.session.delete(entry)
+        db.session.commit()
+
+        data = client.get(
+            f"/api/events/evt-changes/changes?since={version}", headers=HEADERS
+        ).get_json()
+        assert [(c["entity"], c["op"], c["key"]) for c in data["changes"]] == [
+            ("start_number", "delete", registration.external_id)
+        ]
+
+
+def test_change_feed_requires_api_key(app):
+    client = app.test_client()
+    response = client.get("/api/events/evt-changes/changes")
+    assert response.status_code == 403
+
+
+def test_change_feed_records_bulk_tka_event_check(app):
+    with app.app_context():
+        event, registration = _setup_event()
+        batch = build_event_check_batch(event.id)
+        db.session.commit()
+        client = app.test_client()
+        version = client.get("/api/events/evt-changes/changes", headers=HEADERS).get_json()["version"]
+        content_version = event.export_content_version
+
+        apply_tka_import(batch_id=batch.id, raw_text="Lizenz 12345 unbekannt")
+
+        data = client.get(
+            f"/api/events/evt-changes/changes?since={version}", headers=HEADERS
+        ).get_json()
+        assert [change["entity"] for change in data["changes"]] == ["registration"]
+        assert data["changes"][0]["data"]["tka_event_check_status"] == TkaEventCheckStatus.ISSUE.value
+        assert db.session.get(Event, event.id).export_content_version > content_version
+
+
+def test_change_feed_records_blocks_replaced_by_auto_generate(app):
+    with app.app_context():
+        event, _ = _setup_event()
+        add_block(event.id, {"ring": "Ring 1", "category_code": "Small", "class_level": 3})
+        old_block_id = ScheduleBlock.query.filter_by(event_id=event.id).one().id
+        client = app.test_client()
+        version = client.get("/api/events/evt-changes/changes", headers=HEADERS).get_json()["version"]
+
+        auto_generate_blocks_from_registrations(event.id)
+
+        data = client.get(
+            f"/api/events/evt-changes/changes?since={version}", headers=HEADERS
+        ).get_json()
+        changes = {(change["entity"], change["op"], change["key"]) for change in data["changes"]}
+        assert ("schedule_block", "delete", str(old_block_id)) in changes
+        new_block = ScheduleBlock.query.filter_by(event_id=event.id).one()
+        assert ("schedule_block", "upsert", str(new_block.id)) in changes
+
+
+def test_change_feed_versions_are_per_event_sequences(app):
+    with app.app_context():
+        event, registration = _setup_event()
+        other = Event(name="Other Event", external_id="evt-other")
+        db.session.add(other)
+        db.session.commit()
+        db.session.add(StartNumber(event_id=event.id, registration_id=registration.id, start_no=1))
+        db.session.add(
+            Registration(
+                event=other,
+                dog=registration.dog,
+                status=RegistrationStatus.SUBMITTED,
+                class_level=1,
+                category_code="Large",
+            )
+        )
+        db.session.commit()
+        client = app.test_client()
+
+        for target in (event, other):
+            data = client.get(f"/api/events/{target.external_id}/changes", headers=HEADERS).get_json()
+            versions = [change["version"] for change in data["changes"]]
+            assert versions == list(range(1, len(versions) + 1))
+            db.session.refresh(target)
+            assert target.change_feed_version == data["version"]
@@ -0,0 +1,126 @@
+import io
+import json
+import time
+import zipfile
+
+from app.extensions import db
+from app.models import (
+    Dog,
+    Event,
+    LicenseKind,
+    Person,
+    Registration,
+    RegistrationStatus,
+    StartNumber,
+)
+from app.services.exchange_service import build_event_export_zip
+
+
+def _seed_event(size, with_external_ids=True):
+    event = Event(name=f"Benchmark Event {size}", external_id=f"evt-bench-{size}")
+    db.session.add(event)
+    db.session.flush()
+    offset = event.id * 100000
+    db.session.execute(
+        Person.__table__.insert(),
+        [
+            {
+                "id": offset + index,
+                "first_name": f"First{index}",
+                "last_name": f"Last{index}",
+                "external_id": f"person-{offset + index}" if with_external_ids else None,
+            }
+            for index in range(size)
+        ],
+    )
+    db.session.execute(
+        Dog.__table__.insert(),
+        [
+            {
+                "id": offset + index,
+                "name": f"Dog{index}",
+                "license_no": str(offset + index),
+                "license_kind": LicenseKind.CH,
+                "external_id": f"dog-{offset + index}" if with_external_ids else None,
+            }
+            for index in range(size)
+        ],
+    )
+    db.session.execute(
+        Registration.__table__.insert(),
+        [
+            {
+                "id": offset + index,
+                "event_id": event.id,
+                "dog_id": offset + index,
+                "handler_id": offset + index,
+                "status": RegistrationStatus.SUBMITTED,
+                "class_level": index % 3 + 1,
+                "category_code": "Large",
+                "external_id": f"reg-{offset + index}" if with_external_ids else None,
+            }
+            for index in range(size)
+        ],
+    )
+    db.session.execute(
+        StartNumber.__table__.insert(),
+        [
+            {"event_id": event.id, "registration_id": offset + index, "start_no": size - index}
+            for index in range(size)
+        ],
+    )
+    db.session.commit()
+    return event.id
+
+
+def _timed_export(event_id):
+    timings = []
+    for _ in range(3):
+        db.session.expire_all()
+        started = time.perf_counter()
+        build_event_export_zip(event_id)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def test_event_export_query_count_is_constant(app, count_queries):
+    with app.app_context():
+        small_event_id = _seed_event(50)
+        large_event_id = _seed_event(5000)
+
+        db.session.expire_all()
+        _, small_queries = count_queries(lambda: build_event_export_zip(small_event_id))
+        db.session.expire_all()
+        (zip_bytes, _, _), large_queries = count_queries(lambda: build_event_export_zip(large_event_id))
+
+        assert large_queries == small_queries
+        assert large_queries <= 5
+        with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zip_file:
+            registrations_payload = json.loads(zip_file.read("registrations.json"))
+            start_numbers_payload = json.loads(zip_file.read("start_numbers.json"))
+        assert len(registrations_payload) == 5000
+        assert all(entry["registration_external_id"] for entry in start_numbers_payload["numbers"])
+
+
+def test_event_export_assigns_missing_external_ids_in_bulk(app, count_queries):
+    with app.app_context():
+        event_id = _seed_event(2000, with_external_ids=False)
+
+        db.session.expire_all()
+        _, queries = count_queries(lambda: build_event_export_zip(event_id))
+
+        assert queries <= 8
+        assert Registration.query.filter(Registration.external_id.is_(None)).count() == 0
+        assert Dog.query.filter(Dog.external_id.is_(None)).count() == 0
+        assert Person.query.filter(Person.external_id.is_(None)).count() == 0
+
+
+def test_event_export_scales_linearly(app):
+    with app.app_context():
+        small_event_id = _seed_event(1000)
+        large_event_id = _seed_event(5000)
+
+        small = _timed_export(small_event_id)
+        large = _timed_export(large_event_id)
+
+        assert large < small * 5 * 2
@@ -1,9 +1,23 @@
+import hashlib
 import io
 import json
+import os
 import zipfile
 
 from app.extensions import db
-from app.models import Dog, Event, LicenseKind, Person, Registration, RegistrationStatus, Result
+from app.models import (
+    Dog,
+    Event,
+    ExchangeExportLog,
+    LicenseKind,
+    Person,
+    Registration,
+    RegistrationStatus,
+    Result,
+    ScheduleBlock,
+    StartNumber,
+)
+from app.services.exchange_service import build_event_export_zip, get_cached_event_export, stream_event_export_zip
 
 
 def _build_results_zip(event_external_id: str):
@@ -123,3 +137,277 @@ def test_resultexport_import_creates_results_rows(app):
         )
         assert response.status_code == 200
         assert Result.query.count() == 1
+
+
+def _setup_export_event():
+    event = Event(name="Cached Export Event")
+    person = Person(first_name="Max", last_name="Muster")
+    dog = Dog(name="Rex", license_no="12345", license_kind=LicenseKind.CH)
+    registration = Registration(
+        event=event,
+        dog=dog,
+        handler=person,
+        status=RegistrationStatus.SUBMITTED,
+        class_level=1,
+        category_code="Large",
+    )
+    db.session.add_all([event, person, dog, registration])
+    db.session.commit()
+    return event, registration
+
+
+def test_event_export_is_cached_with_etag(app):
+    with app.app_context():
+        event, _ = _setup_export_event()
+        client = app.test_client()
+        url = f"/admin/exchange/events/{event.id}/export?key=dev-admin-key"
+
+        first = client.get(url)
+        assert first.status_code == 200
+        assert first.is_streamed
+        etag = hashlib.sha256(first.data).hexdigest()
+        export_log = ExchangeExportLog.query.filter_by(event_id=event.id).one()
+        assert export_log.sha256 == etag
+
+        second = client.get(url)
+        assert second.headers["ETag"].strip('"') == etag
+        assert second.data == first.data
+        assert ExchangeExportLog.query.filter_by(event_id=event.id).count() == 1
+
+        not_modified = client.get(url, headers={"If-None-Match": f'"{etag}"'})
+        assert not_modified.status_code == 304
+
+
+def test_event_export_rebuilt_after_registration_change(app):
+    with app.app_context():
+        event, registration = _setup_export_event()
+        client = app.test_client()
+        url = f"/admin/exchange/events/{event.id}/export?key=dev-admin-key"
+
+        assert client.get(url).data
+        etag = client.get(url).headers["ETag"]
+        old_path = ExchangeExportLog.query.filter_by(event_id=event.id).one().file_path
+        registration.class_level = 2
+        db.session.commit()
+
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert hashlib.sha256(response.data).hexdigest() != etag.strip('"')
+        # The superseded version's file is pruned; its log stays as history.
+        old_log, export_log = ExchangeExportLog.query.filter_by(event_id=event.id).order_by(ExchangeExportLog.id)
+        assert old_log.file_path is None
+        assert not os.path.exists(old_path)
+        assert export_log.content_version == event.export_content_version
+        assert os.path.exists(export_log.file_path)
+
+
+def test_content_version_bump_ignores_stale_in_memory_value(app):
+    with app.app_context():
+        event, registration = _setup_export_event()
+        version = event.export_content_version
+        # Another writer bumps the version after this session loaded the event.
+        db.session.execute(
+            Event.__table__.update().where(Event.id == event.id).values(export_content_version=version + 1)
+        )
+
+        registration.class_level = 2
+        db.session.commit()
+        assert event.export_content_version == version + 2
+
+
+def test_streamed_export_matches_built_zip(app):
+    with app.app_context():
+        event, _ = _setup_export_event()
+        chunks, filename, digest = stream_event_export_zip(event.id)
+        zip_bytes = b"".join(chunks)
+        assert filename == f"event_export_{event.external_id}.zip"
+        assert digest.hexdigest() == hashlib.sha256(zip_bytes).hexdigest()
+        with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zip_file:
+            assert zip_file.testzip() is None
+            registrations_payload = json.loads(zip_file.read("registrations.json"))
+        assert registrations_payload[0]["category_code"] == "Large"
+
+
+def test_bulk_export_bundles_events(app):
+    with app.app_context():
+        event_ids = []
+        for index in range(3):
+            event = Event(name=f"Bulk Event {index}", external_id=f"evt-bulk-{index}")
+            dog = Dog(name=f"Dog {index}", license_no=str(1000 + index), license_kind=LicenseKind.CH)
+            registration = Registration(
+                event=event,
+                dog=dog,
+                status=RegistrationStatus.SUBMITTED,
+                class_level=1,
+                category_code="Large",
+            )
+            db.session.add_all([event, dog, registration])
+            db.session.commit()
+            event_ids.append(event.id)
+
+        client = app.test_client()
+        response = client.post(
+            "/admin/exchange/events/export?key=dev-admin-key",
+            json={"event_ids": event_ids},
+        )
+        assert response.status_code == 200
+        with zipfile.ZipFile(io.BytesIO(response.data)) as bundle:
+            manifest = json.loads(bundle.read("manifest.json"))
+            assert manifest["schema"] == "agility.exchange.bulkexport.v1"
+            assert [entry["event_external_id"] for entry in manifest["events"]] == [
+                "evt-bulk-0",
+                "evt-bulk-1",
+                "evt-bulk-2",
+            ]
+            for entry in manifest["events"]:
+                event_zip_bytes = bundle.read(entry["file"])
+                assert hashlib.sha256(event_zip_bytes).hexdigest() == entry["sha256"]
+        for event_id in event_ids:
+            assert ExchangeExportLog.query.filter_by(
+                event_id=event_id, export_type="BULK_EVENT_EXPORT"
+            ).count() == 1
+
+
+def test_bulk_export_unknown_event_returns_404(app):
+    client = app.test_client()
+    response = client.post("/admin/exchange/events/export?key=dev-admin-key", json={"event_ids": [999]})
+    assert response.status_code == 404
+
+
+def test_bulk_export_rejects_malformed_event_ids(app):
+    client = app.test_client()
+    url = "/admin/exchange/events/export?key=dev-admin-key"
+    for payload in ({"event_ids": "abc"}, {"event_ids": 5}, {"event_ids": []}, {"event_ids": ["1"]}, [1]):
+        assert client.post(url, json=payload).status_code == 400
+
+
+def test_bulk_export_reuses_bundle_until_an_event_changes(app):
+    with app.app_context():
+        event, registration = _setup_export_event()
+        client = app.test_client()
+        url = "/admin/exchange/events/export?key=dev-admin-key"
+        bulk_dir = os.path.join(app.config["EXCHANGE_EXPORT_DIR"], "bulk")
+
+        first = client.post(url, json={"event_ids": [event.id]})
+        second = client.post(url, json={"event_ids": [event.id]})
+        assert first.data == second.data
+        assert len(os.listdir(bulk_dir)) == 1
+
+        registration.class_level = 2
+        db.session.commit()
+        third = client.post(url, json={"event_ids": [event.id]})
+        assert third.data != first.data
+        assert len(os.listdir(bulk_dir)) == 1
+        logs = ExchangeExportLog.query.filter_by(event_id=event.id, export_type="BULK_EVENT_EXPORT").order_by(
+            ExchangeExportLog.id
+        )
+        assert [log.file_path is None for log in logs] == [True, True, False]
+
+
+def test_ring_export_contains_only_ring_slice(app):
+    with app.app_context():
+        event = Event(name="Ring Event", external_id="evt-rings")
+        registrations = []
+        for index, (category_code, class_level) in enumerate(
+            [("Large", 1), ("Large", 2), ("Small", 1)]
+        ):
+            dog = Dog(name=f"Dog {index}", license_no=str(2000 + index), license_kind=LicenseKind.CH)
+            registrations.append(
+                Registration(
+                    event=event,
+                    dog=dog,
+                    status=RegistrationStatus.SUBMITTED,
+                    class_level=class_level,
+                    category_code=category_code,
+                )
+            )
+        db.session.add_all([event, *registrations])
+        db.session.commit()
+        for ring, category_code, class_level in [
+            ("Ring 1", "Large", 1),
+            ("Ring 1", "Small", 1),
+            ("Ring 2", "Large", 2),
+        ]:
+            db.session.add(
+                ScheduleBlock(
+                    event_id=event.id,
+                    ring=ring,
+                    discipline="Agility",
+                    category_code=category_code,
+                    class_level=class_level,
+                )
+            )
+        for start_no, registration in enumerate(registrations, start=1):
+            db.session.add(StartNumber(event_id=event.id, registration_id=registration.id, start_no=start_no))
+        db.session.commit()
+
+        client = app.test_client()
+        url = f"/admin/exchange/events/{event.id}/export?key=dev-admin-key&ring=Ring+2"
+        response = client.get(url)
+        assert response.status_code == 200
+        assert "event_export_evt-rings_ring-2.zip" in response.headers["Content-Disposition"]
+        with zipfile.ZipFile(io.BytesIO(response.data)) as zip_file:
+            manifest = json.loads(zip_file.read("manifest.json"))
+            schedule_payload = json.loads(zip_file.read("schedule.json"))
+            registrations_payload = json.loads(zip_file.read("registrations.json"))
+            start_numbers_payload = json.loads(zip_file.read("start_numbers.json"))
+            entities_payload = json.loads(zip_file.read("entities.json"))
+        assert manifest["filter"] == {"ring": "Ring 2"}
+        assert [block["ring"] for block in schedule_payload["blocks"]] == ["Ring 2"]
+        assert [reg["external_id"] for reg in registrations_payload] == [registrations[1].external_id]
+        assert [entry["start_no"] for entry in start_numbers_payload["numbers"]] == [2]
+        assert [dog["external_id"] for dog in entities_payload["dogs"]] == [registrations[1].dog.external_id]
+
+        full = client.get(f"/admin/exchange/events/{event.id}/export?key=dev-admin-key")
+        assert len(json.loads(zipfile.ZipFile(io.BytesIO(full.data)).read("registrations.json"))) == 3
+        cached = client.get(url)
+        assert cached.headers["ETag"].strip('"') == hashlib.sha256(response.data).hexdigest()
+        slice_logs = ExchangeExportLog.query.filter_by(event_id=event.id, slice_key="ring=Ring+2").count()
+        assert slice_logs == 1
+
+
+def test_canonical_export_is_deterministic(app):
+    with app.app_context():
+        event, _ = _setup_export_event()
+
+        first, _, first_sha = build_event_export_zip(event.id, canonical=True)
+        second, _, second_sha = build_event_export_zip(event.id, canonical=True)
+
+        assert first == second
+        assert first_sha == second_sha
+        with zipfile.ZipFile(io.BytesIO(first)) as zip_file:
+            manifest = json.loads(zip_file.read("manifest.json"))
+            assert all(info.date_time == (1980, 1, 1, 0, 0, 0) for info in zip_file.infolist())
+        assert "generated_at" not in manifest
+
+
+def test_canonical_export_reuses_unchanged_artifact(app, count_queries):
+    with app.app_context():
+        event, registration = _setup_export_event()
+        client = app.test_client()
+        url = f"/admin/exchange/events/{event.id}/export?key=dev-admin-key&canonical=1"
+        first = client.get(url)
+        sha256 = hashlib.sha256(first.data).hexdigest()
+        first_path = ExchangeExportLog.query.filter_by(event_id=event.id).one().file_path
+
+        registration.class_level = 2
+        db.session.commit()
+        registration.class_level = 1
+        db.session.commit()
+
+        # Unchanged content rebuilds to the same bytes and the same file.
+        response = client.get(url, headers={"If-None-Match": f'"{sha256}"'})
+        assert hashlib.sha256(response.data).hexdigest() == sha256
+        old_log, export_log = ExchangeExportLog.query.filter_by(event_id=event.id, slice_key="canonical=1").order_by(
+            ExchangeExportLog.id
+        )
+        assert old_log.file_path is None
+        assert export_log.sha256 == sha256
+        assert export_log.content_version == event.export_content_version
+        assert export_log.file_path == first_path
+        assert os.path.exists(export_log.file_path)
+
+        assert client.get(url, headers={"If-None-Match": f'"{sha256}"'}).status_code == 304
+        cached, queries = count_queries(lambda: get_cached_event_export(event.id, canonical=True))
+        assert cached.id == export_log.id
+        assert queries <= 2
@@ -0,0 +1,122 @@
+from datetime import datetime
+
+from app.extensions import db
+from app.models import Dog, Event, LicenseKind, LiveUpdate, Registration, RegistrationStatus
+from app.services.schedule_service import add_block
+from app.services.schedule_timing_service import set_timing_rules
+
+LIVE_HEADERS = {"X-Api-Key": "dev-live-key"}
+
+
+def _setup_live_event():
+    event = Event(
+        name="Live Event",
+        external_id="evt-live",
+        starts_at=datetime(2026, 5, 10),
+        is_published=True,
+        schedule_public=True,
+    )
+    db.session.add(event)
+    license_no = 70000
+    for (category_code, class_level), count in {("Large", 1): 20, ("Large", 2): 5, ("Small", 1): 10}.items():
+        for index in range(count):
+            license_no += 1
+            db.session.add(
+                Registration(
+                    event=event,
+                    dog=Dog(name=f"Dog{license_no}", license_no=str(license_no), license_kind=LicenseKind.CH),
+                    status=RegistrationStatus.SUBMITTED,
+                    category_code=category_code,
+                    class_level=class_level,
+                )
+            )
+    db.session.commit()
+    set_timing_rules(event.id, {"seconds_per_run": 60, "course_walk_minutes": 10})
+    for ring, category_code, class_level in (
+        ("Ring 1", "Large", 1),
+        ("Ring 1", "Large", 2),
+        ("Ring 1", "Small", 1),
+        ("Ring 2", "Small", 1),
+    ):
+        add_block(event.id, {"ring": ring, "category_code": category_code, "class_level": class_level})
+    return event
+
+
+def _post_progress(client, sequence_no, sent_at, **context):
+    payload = {
+        "schema": "agility.exchange.liveupdate.v1",
+        "event_external_id": "evt-live",
+        "source": {"device": "ring-1", "system": "AgilitySoftware", "version": "1.0"},
+        "sequence_no": sequence_no,
+        "sent_at": sent_at,
+        "context": context,
+    }
+    return client.post("/api/liveupdate", json=payload, headers=LIVE_HEADERS)
+
+
+def _projected(client, event_id):
+    payload = client.get(f"/events/{event_id}/schedule.json").get_json()
+    return [
+        (block["ring"], block["projected_start_at"][11:16], block["projected_end_at"][11:16], block["status"])
+        for block in payload["blocks"]
+    ]
+
+
+def test_live_updates_project_remaining_blocks(app):
+    with app.app_context():
+        event = _setup_live_event()
+        client = app.test_client()
+
+        response = _post_progress(
+            client, 1, "2026-05-10T08:20:00", ring="Ring 1", category_code="Large", class_level=1, completed_runs=5
+        )
+        assert response.get_json()["projected_blocks"] == 3
+        assert _projected(client, event.id) == [
+            ("Ring 1", "08:05", "08:35", "running"),
+            ("Ring 1", "08:35", "08:50", "planned"),
+            ("Ring 1", "08:50", "09:10", "planned"),
+            ("Ring 2", "08:00", "08:20", "planned"),
+        ]
+
+        _post_progress(client, 2, "2026-05-10T08:40:00", ring="Ring 1", category_code="Large", class_level=2)
+        assert _projected(client, event.id)[:3] == [
+            ("Ring 1", "08:05", "08:40", "finished"),
+            ("Ring 1", "08:40", "08:55", "running"),
+            ("Ring 1", "08:55", "09:15", "planned"),
+        ]
+        blocks = client.get(f"/events/{event.id}/schedule.json").get_json()["blocks"]
+        assert blocks[2]["planned_start_at"][11:16] == "08:45"
+        assert blocks[2]["delay_minutes"] == 10
+
+        # A retried update is stored once and not applied again.
+        response = _post_progress(client, 2, "2026-05-10T08:40:00", ring="Ring 1", category_code="Large", class_level=2)
+        assert response.get_json()["stored"] is False
+        assert "projected_blocks" not in response.get_json()
+
+
+def test_live_update_without_block_context_is_ignored(app):
+    with app.app_context():
+        event = _setup_live_event()
+        client = app.test_client()
+        response = _post_progress(client, 1, "2026-05-10T08:20:00")
+        assert response.get_json()["projected_blocks"] == 0
+        response = _post_progress(
+            client, 2, "2026-05-10T08:20:00", ring="Ring 1", category_code="Large", class_level=1, completed_runs="x"
+        )
+        assert response.get_json()["projection_error"] == "Invalid completed_runs"
+        assert all(block[3] == "planned" for block in _projected(client, event.id))
+
+
+def test_live_update_rejects_unknown_block_ids(app):
+    with app.app_context():
+        _setup_live_event()
+        other = Event(name="Other Event", external_id="evt-other")
+        db.session.add(other)
+        db.session.commit()
+        other_block = add_block(other.id, {"ring": "Ring 1", "category_code": "Large", "class_level": 1})
+        client = app.test_client()
+
+        for sequence_no, block_id in enumerate(("abc", 9999, other_block.id, True), start=1):
+            response = _post_progress(client, sequence_no, "2026-05-10T08:20:00", schedule_block_id=block_id)
+            assert response.status_code == 400
+        assert LiveUpdate.query.count() == 0
@@ -3,16 +3,23 @@ import io
 import json
 import zipfile
 
+import pytest
+
 from app.extensions import db
-from app.models import Event, Registration, RegistrationStatus, ScheduleBlock
+from app.models import Dog, Event, LicenseKind, Registration, RegistrationStatus, ScheduleBlock
 from app.services.exchange_service import build_event_export_zip
 from app.services.schedule_service import (
     add_block,
     auto_generate_blocks_from_registrations,
+    balance_rings,
     delete_block,
     list_blocks,
+    move_block,
+    move_block_after,
+    reorder_blocks,
     update_block,
 )
+from app.services.schedule_timing_service import recompute_event_schedule, set_timing_rules
 
 
 def test_add_update_delete_block(app):
@@ -93,3 +100,229 @@ def test_export_includes_schedule_json(app):
         with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zip_file:
             payload = json.loads(zip_file.read("schedule.json"))
         assert payload["blocks"]
+
+
+def _setup_timed_event(counts):
+    event = Event(name="Timed Event", starts_at=datetime(2026, 5, 10))
+    db.session.add(event)
+    license_no = 5000
+    for (category_code, class_level), count in counts.items():
+        for index in range(count):
+            license_no += 1
+            dog = Dog(
+                name=f"{category_code}{class_level}-{index}",
+                license_no=str(license_no),
+                license_kind=LicenseKind.CH,
+            )
+            db.session.add(
+                Registration(
+                    event=event,
+                    dog=dog,
+                    status=RegistrationStatus.SUBMITTED,
+                    category_code=category_code,
+                    class_level=class_level,
+                )
+            )
+    db.session.commit()
+    set_timing_rules(
+        event.id,
+        {"seconds_per_run": 60, "course_walk_minutes": 10, "breaks": [{"start": "08:30", "minutes": 30}]},
+    )
+    return event
+
+
+def _times(event_id):
+    return [(block.start_at.strftime("%H:%M"), block.end_at.strftime("%H:%M")) for block in list_blocks(event_id)]
+
+
+def test_schedule_times_follow_starters_and_breaks(app):
+    with app.app_context():
+        event = _setup_timed_event({("Large", 1): 20, ("Large", 2): 5, ("Small", 1): 10})
+        auto_generate_blocks_from_registrations(event.id)
+        # Large 1: 10 min walk + 20 runs, then the 08:30 break before the next block.
+        assert _times(event.id) == [("08:00", "08:30"), ("09:00", "09:15"), ("09:15", "09:35")]
+
+
+def test_schedule_times_recompute_downstream_blocks(app):
+    with app.app_context():
+        event = _setup_timed_event({("Large", 1): 20, ("Large", 2): 5, ("Small", 1): 10})
+        auto_generate_blocks_from_registrations(event.id)
+        first, second, third = list_blocks(event.id)
+
+        move_block(third.id, "up")
+        assert _times(event.id) == [("08:00", "08:30"), ("09:00", "09:20"), ("09:20", "09:35")]
+
+        update_block(first.id, {"start_at": datetime(2026, 5, 10, 8, 10)})
+        assert ScheduleBlock.query.get(first.id).fixed_start_at == datetime(2026, 5, 10, 8, 10)
+        assert _times(event.id) == [("08:10", "08:40"), ("09:10", "09:30"), ("09:30", "09:45")]
+
+        add_block(event.id, {"ring": "Ring 1", "category_code": "Large", "class_level": 1})
+        assert _times(event.id)[-1] == ("09:45", "10:15")
+
+        add_block(event.id, {"ring": "Ring 2", "category_code": "Small", "class_level": 1})
+        ring_two = [block for block in list_blocks(event.id) if block.ring == "Ring 2"]
+        assert ring_two[0].start_at == datetime(2026, 5, 10, 8, 0)
+
+
+def test_incremental_recompute_matches_full_with_chained_breaks(app):
+    with app.app_context():
+        event = _setup_timed_event({("Large", 1): 3, ("Large", 2): 5, ("Small", 1): 10, ("Small", 2): 4})
+        set_timing_rules(
+            event.id,
+            {
+                "seconds_per_run": 60,
+                "course_walk_minutes": 10,
+                "breaks": [{"start": "09:00", "minutes": 30}, {"start": "10:30", "minutes": 15}],
+            },
+        )
+        auto_generate_blocks_from_registrations(event.id)
+        first, _, third, fourth = list_blocks(event.id)
+        update_block(first.id, {"start_at": datetime(2026, 5, 10, 10, 0)})
+
+        # Both breaks are taken back to back after the pinned block ends at 10:13.
+        move_block(fourth.id, "up")
+        incremental = _times(event.id)
+        assert incremental == [("10:00", "10:13"), ("10:58", "11:13"), ("11:13", "11:27"), ("11:27", "11:47")]
+
+        recompute_event_schedule(event.id)
+        db.session.commit()
+        assert _times(event.id) == incremental
+
+
+def test_refresh_counts_registrations_added_after_generation(app):
+    with app.app_context():
+        event = _setup_timed_event({("Large", 1): 20, ("Large", 2): 5})
+        auto_generate_blocks_from_registrations(event.id)
+        first, _ = list_blocks(event.id)
+        for index in range(5):
+            db.session.add(
+                Registration(
+                    event=event,
+                    dog=Dog(name=f"Late{index}", license_no=str(5900 + index), license_kind=LicenseKind.CH),
+                    status=RegistrationStatus.SUBMITTED,
+                    category_code="Large",
+                    class_level=1,
+                )
+            )
+        db.session.commit()
+        # Block times are a snapshot until the schedule is refreshed.
+        assert ScheduleBlock.query.get(first.id).starter_count == 20
+
+        client = app.test_client()
+        response = client.post(f"/admin/events/{event.id}/schedule/refresh?key=dev-admin-key")
+        assert response.status_code == 302
+        assert ScheduleBlock.query.get(first.id).starter_count == 25
+        assert _times(event.id) == [("08:00", "08:35"), ("09:05", "09:20")]
+
+        db.session.add(
+            Registration(
+                event=event,
+                dog=Dog(name="Later", license_no="5950", license_kind=LicenseKind.CH),
+                status=RegistrationStatus.SUBMITTED,
+                category_code="Large",
+                class_level=1,
+            )
+        )
+        db.session.commit()
+        client.post(f"/admin/events/{event.id}/schedule/lock?key=dev-admin-key")
+        assert ScheduleBlock.query.get(first.id).starter_count == 26
+        response = client.post(f"/admin/events/{event.id}/schedule/refresh?key=dev-admin-key")
+        assert response.status_code == 400
+
+
+def test_balance_rings_keeps_class_order_and_evens_out_finish(app):
+    with app.app_context():
+        event = _setup_timed_event(
+            {
+                ("Large", 2): 5,
+                ("Large", 1): 20,
+                ("Small", 1): 10,
+                ("Small", 2): 30,
+                ("Medium", 1): 20,
+            }
+        )
+        set_timing_rules(event.id, {"seconds_per_run": 60, "course_walk_minutes": 10})
+        auto_generate_blocks_from_registrations(event.id, ring_count=2)
+
+        rings = {}
+        for block in list_blocks(event.id):
+            rings.setdefault(block.ring, []).append(block)
+        assert [(b.category_code, b.class_level) for b in rings["Ring 1"]] == [("Small", 1), ("Small", 2)]
+        assert [(b.category_code, b.class_level) for b in rings["Ring 2"]] == [
+            ("Large", 1),
+            ("Large", 2),
+            ("Medium", 1),
+        ]
+        assert max(block.end_at for block in list_blocks(event.id)) == datetime(2026, 5, 10, 9, 15)
+
+        balance_rings(event.id, 3)
+        finish_by_ring = {}
+        for block in list_blocks(event.id):
+            finish_by_ring[block.ring] = max(finish_by_ring.get(block.ring, block.end_at), block.end_at)
+        assert len(finish_by_ring) == 3
+        assert max(finish_by_ring.values()) == datetime(2026, 5, 10, 9, 0)
+
+
+def test_auto_generate_stores_starter_counts(app):
+    with app.app_context():
+        event = _setup_timed_event({("Large", 1): 3, ("Small", 2): 2})
+        auto_generate_blocks_from_registrations(event.id)
+        blocks = list_blocks(event.id)
+        assert [(b.category_code, b.class_level, b.starter_count) for b in blocks] == [
+            ("Large", 1, 3),
+            ("Small", 2, 2),
+        ]
+
+        block = add_block(event.id, {"ring": "Ring 2", "category_code": "Large", "class_level": 1})
+        assert block.starter_count == 3
+        update_block(block.id, {"category_code": "Medium"})
+        assert ScheduleBlock.query.get(block.id).starter_count == 0
+
+
+def test_move_block_after_uses_fractional_sort_key(app):
+    with app.app_context():
+        event = _setup_timed_event({("Large", 1): 1, ("Large", 2): 1, ("Small", 1): 1})
+        auto_generate_blocks_from_registrations(event.id)
+        first, second, third = list_blocks(event.id)
+
+        move_block_after(third.id, first.id)
+        assert [block.id for block in list_blocks(event.id)] == [first.id, third.id, second.id]
+        assert ScheduleBlock.query.get(third.id).sort_index == 1.5
+        assert ScheduleBlock.query.get(second.id).sort_index == 2
+
+        # Each move halves the gap behind the first block until it has to renumber.
+        for index in range(60):
+            move_block_after(third.id if index % 2 else second.id, first.id)
+        assert [block.id for block in list_blocks(event.id)] == [first.id, third.id, second.id]
+        assert 1 < ScheduleBlock.query.get(third.id).sort_index < 2
+
+
+def test_reorder_blocks_applies_full_order(app):
+    with app.app_context():
+        event = _setup_timed_event({("Large", 1): 20, ("Large", 2): 5, ("Small", 1): 10})
+        auto_generate_blocks_from_registrations(event.id)
+        first, second, third = list_blocks(event.id)
+
+        result = reorder_blocks(event.id, [third.id, first.id, second.id])
+        assert result["updated"] == 3
+        assert [block.id for block in list_blocks(event.id)] == [third.id, first.id, second.id]
+        assert _times(event.id) == [("08:00", "08:20"), ("08:20", "08:50"), ("09:20", "09:35")]
+
+        with pytest.raises(ValueError, match="every block"):
+            reorder_blocks(event.id, [third.id, first.id])
+
+
+def test_reorder_endpoint(app):
+    with app.app_context():
+        event = _setup_timed_event({("Large", 1): 1, ("Small", 1): 1})
+        auto_generate_blocks_from_registrations(event.id)
+        first, second = list_blocks(event.id)
+        client = app.test_client()
+
+        url = f"/admin/events/{event.id}/schedule/reorder?key=dev-admin-key"
+        response = client.post(url, json={"block_ids": [second.id, first.id]})
+        assert response.status_code == 200
+        assert response.get_json()["updated"] == 2
+
+        response = client.post(url, json={"block_ids": [second.id]})
+        assert response.status_code == 400
@@ -0,0 +1,93 @@
+import time
+from datetime import datetime
+
+from app.extensions import db
+from app.models import Dog, Event, LicenseKind, Person, Registration, RegistrationStatus, StartNumber
+from app.services.schedule_conflict_service import find_handler_conflicts
+from app.services.schedule_service import add_block
+from app.services.schedule_timing_service import set_timing_rules
+
+
+def _registration(event, handler, name, license_no, category_code, class_level):
+    return Registration(
+        event=event,
+        dog=Dog(name=name, license_no=license_no, license_kind=LicenseKind.CH),
+        handler=handler,
+        status=RegistrationStatus.SUBMITTED,
+        category_code=category_code,
+        class_level=class_level,
+    )
+
+
+def _setup_two_rings():
+    event = Event(name="Two Rings", starts_at=datetime(2026, 5, 10))
+    anna = Person(first_name="Anna", last_name="Muster")
+    bert = Person(first_name="Bert", last_name="Beispiel")
+    rex = _registration(event, anna, "Rex", "10001", "Large", 1)
+    luna = _registration(event, anna, "Luna", "10002", "Small", 1)
+    sky = _registration(event, bert, "Sky", "10003", "Small", 1)
+    db.session.add_all([event, rex, luna, sky])
+    db.session.commit()
+    set_timing_rules(event.id, {"seconds_per_run": 60, "course_walk_minutes": 0})
+    add_block(event.id, {"ring": "Ring 1", "category_code": "Large", "class_level": 1})
+    add_block(event.id, {"ring": "Ring 2", "category_code": "Small", "class_level": 1})
+    return event, luna, sky
+
+
+def test_conflict_found_for_handler_in_two_rings(app):
+    with app.app_context():
+        event, luna, sky = _setup_two_rings()
+
+        conflicts = find_handler_conflicts(event.id)
+        assert len(conflicts) == 1
+        assert conflicts[0]["handler_name"] == "Anna Muster"
+        assert {run["dog_name"] for run in conflicts[0]["runs"]} == {"Rex", "Luna"}
+
+        db.session.add_all(
+            [
+                StartNumber(event_id=event.id, registration_id=sky.id, start_no=1),
+                StartNumber(event_id=event.id, registration_id=luna.id, start_no=2),
+            ]
+        )
+        db.session.commit()
+        assert find_handler_conflicts(event.id) == []
+        assert len(find_handler_conflicts(event.id, buffer_minutes=1)) == 1
+
+
+def test_conflicts_endpoint_returns_json(app):
+    with app.app_context():
+        event, _, _ = _setup_two_rings()
+        client = app.test_client()
+        response = client.get(f"/admin/events/{event.id}/schedule/conflicts?key=dev-admin-key")
+        assert response.status_code == 200
+        payload = response.get_json()
+        assert payload["conflicts"][0]["runs"][0]["start_at"] == "2026-05-10T08:00"
+
+
+def test_conflict_detection_scales_to_thousands_of_starters(app):
+    with app.app_context():
+        event = Event(name="Big Weekend", starts_at=datetime(2026, 5, 10))
+        db.session.add(event)
+        handlers = [Person(first_name=f"Handler{index}", last_name="Test") for index in range(1500)]
+        combos = [(category, level) for category in ("Small", "Medium", "Large") for level in (1, 2)]
+        registrations = []
+        for index in range(3000):
+            category_code, class_level = combos[index % len(combos)]
+            registrations.append(
+                _registration(
+                    event, handlers[index // 2], f"Dog{index}", str(200000 + index), category_code, class_level
+                )
+            )
+        db.session.add_all(registrations)
+        db.session.commit()
+        for ring, (category_code, class_level) in enumerate(combos):
+            add_block(
+                event.id,
+                {"ring": f"Ring {ring % 3 + 1}", "category_code": category_code, "class_level": class_level},
+            )
+
+        started = time.perf_counter()
+        conflicts = find_handler_conflicts(event.id)
+        elapsed = time.perf_counter() - started
+        assert conflicts
+        assert elapsed < 2
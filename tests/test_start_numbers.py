@@ -1,12 +1,28 @@
 import io
 import json
+import random
+import time
 import zipfile
+from types import SimpleNamespace
 
 from app.extensions import db
-from app.models import Event, Registration, RegistrationStatus, StartNumber
+from app.models import (
+    ChangeLogEntry,
+    Dog,
+    Event,
+    LicenseKind,
+    Person,
+    Registration,
+    RegistrationStatus,
+    StartNumber,
+)
 from app.services.exchange_service import build_event_export_zip
 from app.services.start_number_service import (
+    find_handler_spacing_violations,
     generate_start_numbers,
+    order_with_handler_spacing,
+    regenerate_start_numbers,
+    reorder_start_numbers,
     set_start_number_manual,
 )
 
@@ -93,3 +109,237 @@ def test_export_includes_start_numbers_json(app):
             payload = json.loads(zip_file.read("start_numbers.json"))
         assert payload["event_external_id"]
         assert payload["numbers"]
+
+
+def _setup_handler_event(dogs_per_handler, class_level=1, category_codes=("Large",)):
+    event = Event(name="Handler Spacing Event")
+    db.session.add(event)
+    registrations = []
+    for handler_index, dog_count in enumerate(dogs_per_handler):
+        handler = Person(first_name=f"Handler{handler_index}", last_name="Test")
+        for dog_index in range(dog_count):
+            dog = Dog(
+                name=f"Dog{handler_index}-{dog_index}",
+                license_no=f"{handler_index + 1}{dog_index:03d}",
+                license_kind=LicenseKind.CH,
+            )
+            registrations.append(
+                Registration(
+                    event=event,
+                    dog=dog,
+                    handler=handler,
+                    status=RegistrationStatus.SUBMITTED,
+                    class_level=class_level,
+                    category_code=category_codes[(handler_index + dog_index) % len(category_codes)],
+                )
+            )
+    db.session.add_all(registrations)
+    db.session.commit()
+    return event, registrations
+
+
+def test_handler_spacing_keeps_handler_dogs_apart(app):
+    with app.app_context():
+        event, registrations = _setup_handler_event([3, 2, 1, 1, 1, 1, 1])
+        violations = generate_start_numbers(
+            event_id=event.id, mode="HANDLER_SPACING", seed=9, min_gap=3
+        )
+        assert violations == []
+        handler_by_registration = {reg.id: reg.handler_id for reg in registrations}
+        positions = {}
+        for entry in StartNumber.query.filter_by(event_id=event.id):
+            positions.setdefault(handler_by_registration[entry.registration_id], []).append(entry.start_no)
+        for start_nos in positions.values():
+            start_nos.sort()
+            assert all(b - a >= 3 for a, b in zip(start_nos, start_nos[1:]))
+        rule_set = json.loads(db.session.get(Event, event.id).start_numbers_rule_set)
+        assert rule_set["mode"] == "HANDLER_SPACING"
+        assert rule_set["min_gap"] == 3
+        assert rule_set["violations"] == []
+
+
+def test_handler_spacing_reports_unresolvable_conflicts(app):
+    with app.app_context():
+        event, registrations = _setup_handler_event([4, 1])
+        violations = generate_start_numbers(
+            event_id=event.id, mode="HANDLER_SPACING", seed=1, min_gap=3
+        )
+        assert violations
+        assert {violation["handler_id"] for violation in violations} == {registrations[0].handler_id}
+        rule_set = json.loads(db.session.get(Event, event.id).start_numbers_rule_set)
+        assert rule_set["violations"] == violations
+
+
+def test_handler_spacing_route_rejects_invalid_gap(app):
+    with app.app_context():
+        event, _ = _setup_handler_event([2, 1])
+        response = app.test_client().post(
+            f"/admin/events/{event.id}/startnumbers/generate?key=dev-admin-key",
+            data={"mode": "HANDLER_SPACING", "seed": "1", "min_gap": "0"},
+        )
+        assert response.status_code == 400
+        assert b"min_gap must be at least 1" in response.data
+        assert db.session.get(Event, event.id).start_numbers_rule_set is None
+
+
+def test_handler_spacing_orders_1000_starters_quickly():
+    rng = random.Random(4)
+    registrations = []
+    for index in range(1000):
+        registrations.append(
+            SimpleNamespace(
+                id=index,
+                handler_id=rng.randrange(350),
+                category_code=rng.choice(["Small", "Medium", "Large"]),
+                class_level=rng.randint(1, 3),
+            )
+        )
+    started = time.perf_counter()
+    ordered = order_with_handler_spacing(registrations, 3, random.Random(1))
+    assert time.perf_counter() - started < 0.5
+    assert sorted(registration.id for registration in ordered) == list(range(1000))
+    blocks = [(registration.category_code, registration.class_level) for registration in ordered]
+    assert blocks == sorted(blocks)
+    assert find_handler_spacing_violations(ordered, 3) == []
+
+
+def _numbers_by_registration(event_id):
+    return {
+        entry.registration_id: entry.start_no for entry in StartNumber.query.filter_by(event_id=event_id)
+    }
+
+
+def test_generate_numbers_by_range_and_regenerate(app):
+    with app.app_context():
+        event, registrations = _setup_handler_event([1] * 10, category_codes=("Large", "Small"))
+        generate_start_numbers(
+            event_id=event.id,
+            mode="RANDOM",
+            ranges=[{"category_code": "Large", "class_level": 1, "start": 100}],
+        )
+        numbers = _numbers_by_registration(event.id)
+        large = sorted(numbers[reg.id] for reg in registrations if reg.category_code == "Large")
+        small = sorted(numbers[reg.id] for reg in registrations if reg.category_code == "Small")
+        assert large == [100, 101, 102, 103, 104]
+        assert small == [1, 2, 3, 4, 5]
+
+        rule_set = json.loads(db.session.get(Event, event.id).start_numbers_rule_set)
+        assert isinstance(rule_set["seed"], int)
+        assert rule_set["ranges"] == [{"category_code": "Large", "class_level": 1, "start": 100}]
+        assert ChangeLogEntry.query.filter_by(event_id=event.id, entity_type="start_number").count() == 10
+
+        regenerate_start_numbers(event.id)
+        assert _numbers_by_registration(event.id) == numbers
+
+
+def test_generate_uses_private_random_state(app):
+    with app.app_context():
+        event, _ = _setup_handler_event([1] * 5)
+        random.seed(123)
+        expected = random.random()
+        random.seed(123)
+        generate_start_numbers(event_id=event.id, mode="RANDOM", seed=7)
+        assert random.random() == expected
+
+
+def test_generate_rejects_overlapping_ranges(app):
+    with app.app_context():
+        event, _ = _setup_handler_event([1] * 4, category_codes=("Large", "Small"))
+        try:
+            generate_start_numbers(
+                event_id=event.id,
+                mode="RANDOM",
+                seed=1,
+                ranges=[
+                    {"category_code": "Large", "start": 10},
+                    {"category_code": "Small", "start": 11},
+                ],
+            )
+        except ValueError as exc:
+            assert "overlap" in str(exc)
+        else:
+            assert False, "Expected ValueError for overlapping ranges"
+
+
+def test_generate_routes_reject_invalid_input(app):
+    with app.app_context():
+        event, _ = _setup_handler_event([1] * 4, category_codes=("Large", "Small"))
+        client = app.test_client()
+        base_url = f"/admin/events/{event.id}/startnumbers"
+
+        response = client.post(f"{base_url}/regenerate?key=dev-admin-key")
+        assert response.status_code == 400
+        assert b"No start number rule set stored" in response.data
+
+        response = client.post(
+            f"{base_url}/generate?key=dev-admin-key",
+            data={"mode": "RANDOM", "seed": "1", "ranges": "Large=100, Small=101"},
+        )
+        assert response.status_code == 400
+        assert b"overlap" in response.data
+        assert StartNumber.query.filter_by(event_id=event.id).count() == 0
+
+
+def test_reorder_swaps_numbers_atomically(app):
+    with app.app_context():
+        event, registrations = _setup_handler_event([1] * 4)
+        generate_start_numbers(event_id=event.id, mode="RANDOM", seed=2)
+        numbers = _numbers_by_registration(event.id)
+        first, second, third, fourth = registrations
+        client = app.test_client()
+
+        response = client.post(
+            f"/admin/events/{event.id}/startnumbers/reorder?key=dev-admin-key",
+            json={
+                "numbers": {
+                    str(first.id): numbers[second.id],
+                    str(second.id): numbers[third.id],
+                    str(third.id): numbers[first.id],
+                }
+            },
+        )
+        assert response.status_code == 200
+        assert response.get_json() == {"event_id": event.id, "updated": 3, "created": 0}
+        db.session.expire_all()
+        reordered = _numbers_by_registration(event.id)
+        assert reordered[first.id] == numbers[second.id]
+        assert reordered[second.id] == numbers[third.id]
+        assert reordered[third.id] == numbers[first.id]
+        assert reordered[fourth.id] == numbers[fourth.id]
+
+
+def test_reorder_query_count_does_not_grow_with_moved_rows(app, count_queries):
+    with app.app_context():
+        event, registrations = _setup_handler_event([1] * 200)
+        generate_start_numbers(event_id=event.id, mode="RANDOM", seed=2)
+        numbers = _numbers_by_registration(event.id)
+        reversed_numbers = dict(zip(numbers, reversed(list(numbers.values()))))
+        db.session.expire_all()
+
+        result, queries = count_queries(lambda: reorder_start_numbers(event.id, reversed_numbers))
+        assert result["updated"] == 200
+        assert queries <= 20
+        db.session.expire_all()
+        assert _numbers_by_registration(event.id) == reversed_numbers
+
+
+def test_reorder_rejects_conflicts_and_locked_events(app):
+    with app.app_context():
+        event, registrations = _setup_handler_event([1] * 3)
+        generate_start_numbers(event_id=event.id, mode="RANDOM", seed=2)
+        numbers = _numbers_by_registration(event.id)
+        first, second, _ = registrations
+        url = f"/admin/events/{event.id}/startnumbers/reorder?key=dev-admin-key"
+        client = app.test_client()
+
+        response = client.post(url, json={"numbers": {str(first.id): numbers[second.id]}})
+        assert response.status_code == 400
+        assert "already in use" in response.get_json()["error"]
+        assert _numbers_by_registration(event.id) == numbers
+
+        event.start_numbers_locked = True
+        db.session.commit()
+        response = client.post(url, json={"numbers": {str(first.id): 50}})
+        assert response.status_code == 400
+        assert "locked" in response.get_json()["error"]
+        assert _numbers_by_registration(event.id) == numbers
@@ -0,0 +1,146 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.extensions import db
+from app.models import (
+    Dog,
+    Event,
+    LicenseKind,
+    LiveUpdate,
+    Person,
+    Registration,
+    RegistrationStatus,
+    StartNumber,
+    StartOrderEntry,
+)
+from app.services.live_schedule_service import apply_live_progress
+from app.services.schedule_service import add_block, delete_block
+from app.services.schedule_timing_service import set_timing_rules
+from app.services.start_number_service import reorder_start_numbers
+from app.services.start_time_service import estimate_start_times
+
+
+def _registration(event, name, license_no, category_code, handler=None):
+    return Registration(
+        event=event,
+        dog=Dog(name=name, license_no=license_no, license_kind=LicenseKind.CH),
+        handler=handler,
+        status=RegistrationStatus.SUBMITTED,
+        category_code=category_code,
+        class_level=1,
+    )
+
+
+def _setup_event():
+    event = Event(
+        name="Start Times",
+        external_id="evt-times",
+        starts_at=datetime(2026, 5, 10),
+        is_published=True,
+        startlist_public=True,
+    )
+    anna = Person(first_name="Anna", last_name="Muster")
+    registrations = [
+        _registration(event, "Ace", "80001", "Large"),
+        _registration(event, "Bolt", "80002", "Large"),
+        _registration(event, "Rex", "80003", "Large", anna),
+        _registration(event, "Luna", "80004", "Small", anna),
+        _registration(event, "Kira", "80005", "Small"),
+    ]
+    db.session.add_all(registrations)
+    db.session.commit()
+    db.session.add_all(
+        StartNumber(event_id=event.id, registration_id=registration.id, start_no=start_no)
+        for registration, start_no in zip(registrations, (1, 2, 3, 4, 5))
+    )
+    db.session.commit()
+    set_timing_rules(event.id, {"seconds_per_run": 60, "course_walk_minutes": 10})
+    add_block(event.id, {"ring": "Ring 1", "category_code": "Large", "class_level": 1})
+    add_block(event.id, {"ring": "Ring 2", "category_code": "Small", "class_level": 1})
+    return event, anna, registrations
+
+
+def _times(entries):
+    return [(entry["dog_name"], entry["estimated_start_at"][11:16], entry["status"]) for entry in entries]
+
+
+def test_start_times_use_precomputed_order(app):
+    with app.app_context():
+        event, anna, registrations = _setup_event()
+
+        assert _times(estimate_start_times(event.id, handler_id=anna.id)) == [
+            ("Luna", "08:10", "planned"),
+            ("Rex", "08:12", "planned"),
+        ]
+        assert StartOrderEntry.query.filter_by(event_id=event.id).count() == 5
+        assert event.start_order_version == event.export_content_version
+        entry_ids = {entry.id for entry in StartOrderEntry.query.filter_by(event_id=event.id)}
+        estimate_start_times(event.id, handler_id=anna.id)
+        assert {entry.id for entry in StartOrderEntry.query.filter_by(event_id=event.id)} == entry_ids
+
+        ace, _, rex, _, _ = registrations
+        reorder_start_numbers(event.id, {rex.id: 1, ace.id: 3})
+        assert _times(estimate_start_times(event.id, dog_id=rex.dog_id)) == [("Rex", "08:10", "planned")]
+
+
+def test_start_times_skip_registrations_changed_after_build(app):
+    with app.app_context():
+        event, anna, registrations = _setup_event()
+        registrations[3].status = RegistrationStatus.CANCELLED
+        db.session.commit()
+        assert event.start_order_version != event.export_content_version
+
+        assert _times(estimate_start_times(event.id, handler_id=anna.id)) == [("Rex", "08:12", "planned")]
+        assert StartOrderEntry.query.filter_by(registration_id=registrations[3].id).count() == 1
+
+
+def test_start_times_survive_deleted_block(app):
+    with app.app_context():
+        db.session.execute(text("PRAGMA foreign_keys=ON"))
+        event, anna, _ = _setup_event()
+        entries = estimate_start_times(event.id, handler_id=anna.id)
+        small_block_id = next(entry["block_id"] for entry in entries if entry["dog_name"] == "Luna")
+
+        delete_block(small_block_id)
+
+        assert _times(estimate_start_times(event.id, handler_id=anna.id)) == [("Rex", "08:12", "planned")]
+        assert StartOrderEntry.query.filter_by(block_id=small_block_id).count() == 0
+
+
+def test_start_times_follow_ring_progress(app):
+    with app.app_context():
+        event, anna, _ = _setup_event()
+        record = LiveUpdate(
+            event_id=event.id,
+            event_external_id=event.external_id,
+            source_system="AgilitySoftware",
+            source_device="ring-1",
+            sequence_no=1,
+            sent_at=datetime(2026, 5, 10, 8, 20),
+            payload_json=json.dumps(
+                {"context": {"ring": "Ring 1", "category_code": "Large", "class_level": 1, "completed_runs": 1}}
+            ),
+        )
+        db.session.add(record)
+        db.session.commit()
+        apply_live_progress(record)
+
+        assert _times(estimate_start_times(event.id, handler_id=anna.id)) == [
+            ("Luna", "08:10", "planned"),
+            ("Rex", "08:21", "running"),
+        ]
+
+
+def test_start_times_endpoint(app):
+    with app.app_context():
+        event, anna, _ = _setup_event()
+        client = app.test_client()
+
+        response = client.get(f"/events/{event.id}/start-times?handler={anna.external_id}")
+        assert response.status_code == 200
+        assert [entry["dog_name"] for entry in response.get_json()["entries"]] == ["Luna", "Rex"]
+
+        assert client.get(f"/events/{event.id}/start-times").status_code == 400
+        assert client.get(f"/events/{event.id}/start-times?handler=unknown").status_code == 404
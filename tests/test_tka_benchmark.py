@@ -0,0 +1,213 @@
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import (
+    Dog,
+    Event,
+    LicenseKind,
+    Person,
+    Registration,
+    RegistrationStatus,
+    TkaEventCheckStatus,
+    TkaExportRow,
+    TkaMasterStatus,
+)
+from app.services.tka_service import (
+    apply_tka_import,
+    build_event_check_batch,
+    build_master_check_batch,
+    iter_batch_csv,
+)
+
+
+def _seed_dogs(size):
+    event = Event(name="TKA Benchmark Event")
+    db.session.add(event)
+    db.session.flush()
+    created_at = datetime(2026, 1, 1)
+    db.session.execute(
+        Dog.__table__.insert(),
+        [
+            {
+                "id": index + 1,
+                "name": f"Dog{index}",
+                "license_no": str(100000 + index),
+                "license_kind": LicenseKind.CH,
+                "tka_master_status": TkaMasterStatus.PENDING,
+            }
+            for index in range(size)
+        ],
+    )
+    registrations = []
+    for index in range(size):
+        if index % 10 == 0:
+            continue
+        registrations.append(
+            {
+                "event_id": event.id,
+                "dog_id": index + 1,
+                "status": RegistrationStatus.SUBMITTED,
+                "class_level": 1,
+                "category_code": "Small",
+                "created_at": created_at,
+            }
+        )
+        if index % 2 == 0:
+            registrations.append(
+                {
+                    "event_id": event.id,
+                    "dog_id": index + 1,
+                    "status": RegistrationStatus.SUBMITTED,
+                    "class_level": 2,
+                    "category_code": "Large",
+                    "created_at": created_at + timedelta(days=1),
+                }
+            )
+    db.session.execute(Registration.__table__.insert(), registrations)
+    db.session.commit()
+
+
+def test_master_check_batch_is_set_based_at_50k_dogs(app, count_queries):
+    with app.app_context():
+        size = 50000
+        _seed_dogs(size)
+
+        started = time.perf_counter()
+        batch, queries = count_queries(lambda: build_master_check_batch())
+        db.session.commit()
+        elapsed = time.perf_counter() - started
+
+        assert queries <= 15
+        assert elapsed < 30
+        assert TkaExportRow.query.filter_by(batch_id=batch.id).count() == size - size // 10
+        assert Dog.query.filter_by(tka_master_status=TkaMasterStatus.IN_EXPORT).count() == size - size // 10
+        issue_dog = db.session.get(Dog, 1)
+        assert issue_dog.tka_master_status == TkaMasterStatus.ISSUE
+        assert issue_dog.tka_issue_message == "Kategorie fehlt"
+        latest_row = TkaExportRow.query.filter_by(batch_id=batch.id, dog_id=3).one()
+        assert (latest_row.category_code, latest_row.class_level) == ("Large", 2)
+        older_row = TkaExportRow.query.filter_by(batch_id=batch.id, dog_id=2).one()
+        assert (older_row.category_code, older_row.class_level) == ("Small", 1)
+
+
+def test_master_import_apply_is_set_based_at_50k_dogs(app, count_queries):
+    with app.app_context():
+        size = 50000
+        _seed_dogs(size)
+        batch = build_master_check_batch()
+        db.session.commit()
+
+        raw_text = "\n".join(
+            f"Lizenz {100000 + index} unbekannt" for index in range(1, size, 100)
+        )
+        metrics = {}
+        started = time.perf_counter()
+        _, queries = count_queries(
+            lambda: apply_tka_import(batch_id=batch.id, raw_text=raw_text, metrics=metrics)
+        )
+        elapsed = time.perf_counter() - started
+
+        assert queries <= 250
+        assert elapsed < 30
+        assert set(metrics) >= {"parse_ms", "match_ms", "apply_ms"}
+        assert metrics["rows"] == size - size // 10
+        issue_dog = db.session.get(Dog, 2)
+        assert issue_dog.tka_master_status == TkaMasterStatus.ISSUE
+        assert issue_dog.tka_issue_message == "Lizenz unbekannt"
+        ok_dog = db.session.get(Dog, 3)
+        assert ok_dog.tka_master_status == TkaMasterStatus.OK
+        assert ok_dog.tka_master_checked_at is not None
+
+
+def _seed_event_registrations(size):
+    event = Event(name="TKA Event Check Benchmark", external_id="evt-tka-bench")
+    db.session.add(event)
+    db.session.flush()
+    db.session.execute(
+        Dog.__table__.insert(),
+        [
+            {
+                "id": index + 1,
+                "name": f"Dog{index}",
+                "license_no": str(300000 + index),
+                "license_kind": LicenseKind.CH,
+                "external_id": f"dog-{index}",
+            }
+            for index in range(size)
+        ],
+    )
+    db.session.execute(
+        Person.__table__.insert(),
+        [
+            {
+                "id": index + 1,
+                "first_name": f"Handler{index}",
+                "last_name": "Test",
+                "external_id": f"person-{index}",
+                "created_at": datetime(2026, 1, 1),
+            }
+            for index in range(size)
+        ],
+    )
+    db.session.execute(
+        Registration.__table__.insert(),
+        [
+            {
+                "event_id": event.id,
+                "dog_id": index + 1,
+                "handler_id": index + 1,
+                "external_id": f"reg-{index}",
+                "status": RegistrationStatus.SUBMITTED,
+                "class_level": 1,
+                "category_code": "Small",
+                "created_at": datetime(2026, 1, 1),
+            }
+            for index in range(size)
+        ],
+    )
+    db.session.commit()
+    return event.id
+
+
+def test_event_check_export_and_import_query_count_is_bounded(app, count_queries):
+    with app.app_context():
+        size = 2000
+        event_id = _seed_event_registrations(size)
+
+        batch, build_queries = count_queries(lambda: build_event_check_batch(event_id))
+        db.session.commit()
+        raw_text = "\n".join(f"Lizenz {300000 + index} unbekannt" for index in range(0, size, 100))
+        _, import_queries = count_queries(lambda: apply_tka_import(batch_id=batch.id, raw_text=raw_text))
+
+        assert build_queries <= 25
+        assert import_queries <= 60
+        registration = Registration.query.filter_by(external_id="reg-100").one()
+        assert registration.tka_event_check_status == TkaEventCheckStatus.ISSUE
+
+
+def test_master_export_streams_csv_in_flat_memory(app):
+    with app.app_context():
+        size = 50000
+        _seed_dogs(size)
+        client = app.test_client()
+
+        response = client.get("/admin/tka/master/export?key=dev-admin-key", buffered=False)
+        assert response.status_code == 200
+        assert response.is_streamed
+        batch_id = int(response.headers["X-Tka-Batch-Id"])
+        lines = response.get_data(as_text=True).splitlines()
+        assert lines[0] == "Lizenznummer;Kategorie;Klasse"
+        assert len(lines) == size - size // 10 + 1
+        assert "100002;Large;2" in lines
+        assert TkaExportRow.query.filter_by(batch_id=batch_id).count() == size - size // 10
+
+        tracemalloc.start()
+        chunks = 0
+        for _ in iter_batch_csv(batch_id, fetch_size=1000):
+            chunks += 1
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert chunks > 40
+        assert peak < 2 * 1024 * 1024
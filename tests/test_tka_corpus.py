@@ -0,0 +1,83 @@
+import pytest
+
+from app.extensions import db
+from app.models import (
+    Dog,
+    Event,
+    LicenseKind,
+    Registration,
+    RegistrationStatus,
+    TkaExportRow,
+    TkaFindingKind,
+    TkaMasterStatus,
+)
+from app.services.tka_service import apply_tka_import, build_master_check_batch, parse_tka_text
+from benchmarks.tka_corpus import generate_tka_corpus
+
+
+def test_corpus_findings_match_expected_kinds():
+    license_nos = [str(200000 + index) for index in range(5000)]
+    raw_text, expected = generate_tka_corpus(license_nos, seed=7)
+
+    findings = parse_tka_text(raw_text)
+    parsed = {finding["license_no"]: finding["finding_kind"] for finding in findings}
+    assert len(parsed) == len(findings)
+    assert parsed == {license_no: kind for license_no, kind in expected.items() if kind is not None}
+    assert set(expected.values()) == {
+        None,
+        TkaFindingKind.CLASS_OR_CATEGORY_MISMATCH,
+        TkaFindingKind.LICENSE_UNKNOWN,
+        TkaFindingKind.LICENSE_INVALID,
+        TkaFindingKind.UNKNOWN_FORMAT,
+    }
+
+
+def test_corpus_is_deterministic_per_seed():
+    license_nos = [str(index) for index in range(1000, 1200)]
+    assert generate_tka_corpus(license_nos, seed=3) == generate_tka_corpus(license_nos, seed=3)
+    assert generate_tka_corpus(license_nos, seed=3) != generate_tka_corpus(license_nos, seed=4)
+
+
+def test_corpus_rejects_unknown_mix_keys():
+    with pytest.raises(ValueError):
+        generate_tka_corpus(["1"], mix={"ok": 1, "typo": 1})
+
+
+def test_corpus_import_updates_master_status(app):
+    with app.app_context():
+        event = Event(name="Corpus Event")
+        dogs = [
+            Dog(name=f"Dog{index}", license_no=str(300000 + index), license_kind=LicenseKind.CH)
+            for index in range(100)
+        ]
+        db.session.add_all(dogs)
+        db.session.add(event)
+        db.session.flush()
+        db.session.add_all(
+            Registration(
+                event_id=event.id,
+                dog=dog,
+                status=RegistrationStatus.SUBMITTED,
+                class_level=1,
+                category_code="Large",
+            )
+            for dog in dogs
+        )
+        db.session.commit()
+        batch = build_master_check_batch()
+        db.session.commit()
+
+        raw_text, expected = generate_tka_corpus(
+            [dog.license_no for dog in dogs], mix={"ok": 1, "unknown": 1}, seed=11
+        )
+        apply_tka_import(batch_id=batch.id, raw_text=raw_text)
+
+        exported = Dog.query.join(TkaExportRow, TkaExportRow.dog_id == Dog.id).filter(
+            TkaExportRow.batch_id == batch.id
+        )
+        assert exported.count() == 100
+        for dog in exported:
+            if expected[dog.license_no] is None:
+                assert dog.tka_master_status == TkaMasterStatus.OK
+            else:
+                assert dog.tka_master_status == TkaMasterStatus.ISSUE
@@ -0,0 +1,103 @@
+from app.extensions import db
+from app.models import (
+    Dog,
+    Event,
+    LicenseKind,
+    Registration,
+    RegistrationStatus,
+    TkaExportRow,
+    TkaMasterStatus,
+)
+from app.services.tka_service import apply_tka_import, build_master_check_batch
+
+
+def _setup_dogs():
+    event = Event(name="Master Check Event")
+    dogs = [
+        Dog(name="Rex", license_no="11111", license_kind=LicenseKind.CH),
+        Dog(name="Luna", license_no="22222", license_kind=LicenseKind.CH),
+    ]
+    registrations = [
+        Registration(
+            event=event,
+            dog=dog,
+            status=RegistrationStatus.SUBMITTED,
+            class_level=1,
+            category_code="Large",
+        )
+        for dog in dogs
+    ]
+    db.session.add_all([event, *dogs, *registrations])
+    db.session.commit()
+    return dogs, registrations
+
+
+def _batch_licenses():
+    batch = build_master_check_batch()
+    db.session.commit()
+    rows = TkaExportRow.query.filter_by(batch_id=batch.id).order_by(TkaExportRow.id)
+    return batch, [row.license_no for row in rows]
+
+
+def test_master_check_only_resends_changed_dogs(app):
+    with app.app_context():
+        dogs, registrations = _setup_dogs()
+        batch, licenses = _batch_licenses()
+        assert licenses == ["11111", "22222"]
+
+        apply_tka_import(batch_id=batch.id, raw_text="")
+        assert {dog.tka_master_status for dog in Dog.query} == {TkaMasterStatus.OK}
+        assert all(dog.tka_checked_fingerprint for dog in Dog.query)
+
+        _, licenses = _batch_licenses()
+        assert licenses == []
+
+        registrations[1].class_level = 2
+        db.session.commit()
+        _, licenses = _batch_licenses()
+        assert licenses == ["22222"]
+        assert db.session.get(Dog, dogs[1].id).tka_master_status == TkaMasterStatus.IN_EXPORT
+        assert db.session.get(Dog, dogs[0].id).tka_master_status == TkaMasterStatus.OK
+
+
+def test_master_check_skips_dogs_confirmed_by_a_mismatch(app):
+    with app.app_context():
+        dogs, _ = _setup_dogs()
+        batch, _ = _batch_licenses()
+
+        apply_tka_import(
+            batch_id=batch.id,
+            raw_text="Falsche Klasse oder Kategorie, Lizenz 11111 Rex. Klasse im Import: L1. Klasse im System: M1",
+        )
+        assert db.session.get(Dog, dogs[0].id).tka_category_confirmed == "Medium"
+        assert {dog.tka_master_status for dog in Dog.query} == {TkaMasterStatus.OK}
+
+        _, licenses = _batch_licenses()
+        assert licenses == []
+
+
+def test_master_check_throttles_unchanged_issue_dogs(app):
+    with app.app_context():
+        dogs, registrations = _setup_dogs()
+        batch, _ = _batch_licenses()
+        apply_tka_import(batch_id=batch.id, raw_text="Lizenz 11111 unbekannt")
+        assert db.session.get(Dog, dogs[0].id).tka_master_status == TkaMasterStatus.ISSUE
+
+        _, licenses = _batch_licenses()
+        assert licenses == []
+
+        app.config["TKA_ISSUE_RETRY_HOURS"] = 0
+        _, licenses = _batch_licenses()
+        assert licenses == ["11111"]
+
+
+def test_master_check_resends_changed_issue_dogs_immediately(app):
+    with app.app_context():
+        dogs, registrations = _setup_dogs()
+        batch, _ = _batch_licenses()
+        apply_tka_import(batch_id=batch.id, raw_text="Lizenz 11111 unbekannt")
+
+        registrations[0].category_code = "Small"
+        db.session.commit()
+        _, licenses = _batch_licenses()
+        assert licenses == ["11111"]
@@ -0,0 +1,109 @@
+from app.extensions import db
+from app.models import (
+    Dog,
+    Event,
+    LicenseKind,
+    Registration,
+    RegistrationStatus,
+    TkaEventCheckStatus,
+    TkaExportRow,
+)
+
+ADMIN = "?key=dev-admin-key"
+
+
+def _registration(event, dog, class_level=1, category_code="Large"):
+    return Registration(
+        event=event,
+        dog=dog,
+        status=RegistrationStatus.SUBMITTED,
+        class_level=class_level,
+        category_code=category_code,
+    )
+
+
+def _setup_events():
+    first = Event(name="Samstag")
+    second = Event(name="Sonntag")
+    other = Event(name="Nicht im Batch")
+    rex = Dog(name="Rex", license_no="11111", license_kind=LicenseKind.CH)
+    luna = Dog(name="Luna", license_no="22222", license_kind=LicenseKind.CH)
+    foreign = Dog(name="Bella", license_no="DEU-1", license_kind=LicenseKind.FOREIGN)
+    registrations = [
+        _registration(first, rex),
+        _registration(second, rex),
+        _registration(second, luna, class_level=2),
+        _registration(first, luna, class_level=3),
+        _registration(first, foreign),
+        _registration(other, rex),
+    ]
+    db.session.add_all([first, second, other, rex, luna, foreign, *registrations])
+    db.session.commit()
+    return (first, second, other), registrations
+
+
+def test_multi_event_export_deduplicates_rows(app):
+    with app.app_context():
+        (first, second, other), registrations = _setup_events()
+        client = app.test_client()
+
+        response = client.post(
+            f"/admin/tka/events/export{ADMIN}", json={"event_ids": [first.id, second.id]}
+        )
+        assert response.status_code == 200
+        lines = response.get_data(as_text=True).splitlines()
+        assert lines == [
+            "Lizenznummer;Kategorie;Klasse",
+            "11111;Large;1",
+            "22222;Large;2",
+            "22222;Large;3",
+        ]
+        batch_id = int(response.headers["X-Tka-Batch-Id"])
+        assert TkaExportRow.query.filter_by(batch_id=batch_id).count() == 3
+        statuses = [db.session.get(Registration, r.id).tka_event_check_status for r in registrations]
+        assert statuses[:4] == [TkaEventCheckStatus.IN_EXPORT] * 4
+        assert statuses[5] == TkaEventCheckStatus.PENDING
+
+
+def test_multi_event_import_fans_out_to_all_events(app):
+    with app.app_context():
+        (first, second, other), registrations = _setup_events()
+        client = app.test_client()
+        response = client.post(
+            f"/admin/tka/events/export{ADMIN}", data={"event_id": [first.id, second.id]}
+        )
+        batch_id = int(response.headers["X-Tka-Batch-Id"])
+
+        raw_text = (
+            "Falsche Klasse oder Kategorie, Lizenz 11111 Rex. "
+            "Klasse im Import: L1. Klasse im System: L2\n"
+            "Lizenz 22222 ungültig"
+        )
+        response = client.post(f"/admin/tka/events/import{ADMIN}", data={"raw_text": raw_text})
+        assert response.status_code == 200
+        assert response.get_json()["batch_id"] == batch_id
+        assert response.get_json()["metrics"]["rows"] == 4
+
+        rex_first, rex_second, luna_second, luna_first, _, rex_other = [
+            db.session.get(Registration, registration.id) for registration in registrations
+        ]
+        for registration in (rex_first, rex_second):
+            assert registration.tka_event_check_status == TkaEventCheckStatus.CLASS_CHANGED
+            assert registration.verified_class_level == 2
+        for registration in (luna_first, luna_second):
+            assert registration.tka_event_check_status == TkaEventCheckStatus.ISSUE
+        assert rex_other.tka_event_check_status == TkaEventCheckStatus.PENDING
+
+
+def test_multi_event_export_rejects_unknown_events(app):
+    with app.app_context():
+        client = app.test_client()
+        assert client.post(f"/admin/tka/events/export{ADMIN}", json={}).status_code == 400
+        assert client.post(f"/admin/tka/events/export{ADMIN}", json={"event_ids": [999]}).status_code == 404
+
+
+def test_multi_event_export_rejects_malformed_event_ids(app):
+    client = app.test_client()
+    url = f"/admin/tka/events/export{ADMIN}"
+    for payload in ({"event_ids": "abc"}, {"event_ids": 5}, {"event_ids": [1.5]}, {"event_ids": [None]}):
+        assert client.post(url, json=payload).status_code == 400
@@ -1,3 +1,7 @@
+import io
+import time
+from pathlib import Path
+
 import pytest
 from app.models import (
     Dog,
@@ -10,7 +14,9 @@ from app.models import (
     TkaExportType,
 )
 from app.extensions import db
-from app.services.tka_service import apply_tka_import, parse_tka_text
+from app.models import TkaFinding, TkaImport
+from app.services.blob_service import load_blob
+from app.services.tka_service import apply_tka_import, iter_tka_findings, parse_tka_text
 
 
 def test_parse_class_mismatch_single_line():
@@ -55,6 +61,46 @@ def test_parse_invalid_oldies_keywords():
     assert findings[0]["finding_kind"].value == "LICENSE_INVALID"
 
 
+def test_parse_keeps_mismatches_first():
+    text = (
+        "Lizenz 11111 unbekannt\n"
+        "Falsche Klasse oder Kategorie auf Zeile 2, Lizenz 22222 Rex.\n"
+        "Klasse im Import: S1.\n"
+        "Klasse im System: S2\n"
+        "Lizenz 33333 Oldies"
+    )
+    findings = parse_tka_text(text)
+    assert [finding["license_no"] for finding in findings] == ["22222", "11111", "33333"]
+    assert findings[0]["raw_message"].endswith("Klasse im System: S2")
+
+
+def test_iter_findings_streams_lines():
+    stream = io.StringIO(
+        "Lizenz 11111 unbekannt\n"
+        "Falsche Klasse oder Kategorie, Lizenz 22222 Rex.\n"
+        "Lizenz 33333 ???\n"
+    )
+    findings = iter_tka_findings(stream)
+    assert next(findings)["license_no"] == "11111"
+    assert [(finding["finding_kind"].value, finding["license_no"]) for finding in findings] == [
+        ("UNKNOWN_FORMAT", "22222"),
+        ("UNKNOWN_FORMAT", "33333"),
+    ]
+
+
+def test_parse_long_response_is_linear():
+    text = "\n".join(
+        f"Falsche Klasse oder Kategorie auf Zeile {index}, Lizenz {100000 + index} Rex. "
+        "Klasse im Import: L1. Klasse im System: L2"
+        for index in range(20000)
+    )
+    started = time.perf_counter()
+    findings = parse_tka_text(text)
+    assert time.perf_counter() - started < 5
+    assert len(findings) == 20000
+    assert findings[-1]["license_no"] == "119999"
+
+
 def test_apply_ok_when_no_finding(app):
     with app.app_context():
         dog = Dog(name="Rex", license_no="12345", license_kind=LicenseKind.CH)
@@ -83,3 +129,45 @@ def test_apply_ok_when_no_finding(app):
 
         assert registration.tka_event_check_status == TkaEventCheckStatus.OK
         assert registration.tka_issue_message is None
+
+
+def test_import_stores_raw_text_as_compressed_blob(app):
+    with app.app_context():
+        dog = Dog(name="Rex", license_no="12345", license_kind=LicenseKind.CH)
+        batch = TkaExportBatch(export_type=TkaExportType.MASTER_CHECK)
+        batch.rows.append(
+            TkaExportRow(dog=dog, license_no=dog.license_no, category_code="Large", class_level=1)
+        )
+        db.session.add_all([dog, batch])
+        db.session.commit()
+        raw_text = (
+            "TKAMO Prüfung\r\n"
+            "  Falsche Klasse oder Kategorie auf Zeile 1, Lizenz 12345 Rex.\r\n"
+            "Klasse im Import: L1.\r\n"
+            "Klasse im System: L2\r\n"
+            "Lizenz 99999 unbekannt\r\n"
+        )
+
+        client = app.test_client()
+        response = client.post(
+            "/admin/tka/master/import?key=dev-admin-key",
+            data={"batch_id": batch.id, "raw_text": raw_text},
+        )
+        assert response.status_code == 200
+        tka_import = db.session.get(TkaImport, response.get_json()["import_id"])
+        assert tka_import.raw_text is None
+        assert load_blob(tka_import.raw_blob_sha256).decode("utf-8") == raw_text
+        blob_files = list(Path(app.config["BLOB_STORAGE_DIR"]).rglob("*.gz"))
+        assert len(blob_files) == 1
+        assert all(finding.raw_message is None for finding in TkaFinding.query)
+
+        again = apply_tka_import(batch_id=batch.id, raw_text=raw_text)
+        assert again.raw_blob_sha256 == tka_import.raw_blob_sha256
+
+        data = client.get(f"/admin/tka/imports/{tka_import.id}?key=dev-admin-key").get_json()
+        assert [finding["message"] for finding in data["findings"]] == [
+            "Falsche Klasse oder Kategorie auf Zeile 1, Lizenz 12345 Rex.\r\n"
+            "Klasse im Import: L1.\r\n"
+            "Klasse im System: L2",
+            "Lizenz 99999 unbekannt",
+        ]